@@ -0,0 +1,147 @@
+import logging
+import os
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from dotenv import load_dotenv
+
+import metrics
+from api_scheduler import PRIORITY_PLAYERS, get_scheduler
+
+load_dotenv()
+
+RAPIDAPI_KEY = os.getenv("RAPIDAPI_KEY")
+RAPIDAPI_HOST = os.getenv("RAPIDAPI_HOST", "api-football-v1.p.rapidapi.com")
+API_TIMEOUT = float(os.getenv("API_TIMEOUT", "30"))
+API_POOL_SIZE = int(os.getenv("API_POOL_SIZE", "10"))
+# e.g. http://127.0.0.1:8080/v3 to run against mock_api_server.py instead of RapidAPI
+API_BASE_URL = os.getenv("API_BASE_URL")
+
+
+class EndpointStats:
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.seconds = 0.0
+        self.wire_bytes = 0
+        self.body_bytes = 0
+
+
+class ApiClient:
+    """
+    Shared API-Football client used by every fetch script.
+
+    One requests.Session keeps TLS connections alive and pooled across calls,
+    asks for gzip/deflate bodies, and retries transport failures (resets,
+    connect timeouts). HTTP-level retries on 429/5xx and pacing are left to
+    the RequestScheduler so they count against the same budget.
+    """
+
+    def __init__(self, host=RAPIDAPI_HOST, api_key=RAPIDAPI_KEY, timeout=API_TIMEOUT,
+                 pool_size=API_POOL_SIZE, scheduler=None, base_url=API_BASE_URL):
+        self.base_url = (base_url or f"https://{host}/v3").rstrip("/")
+        self.timeout = timeout
+        self.scheduler = scheduler or get_scheduler()
+
+        self.session = requests.Session()
+        self.session.headers.update({
+            "X-RapidAPI-Key": api_key,
+            "X-RapidAPI-Host": host,
+            "Accept": "application/json",
+            "Accept-Encoding": "gzip, deflate",
+            "Connection": "keep-alive",
+        })
+        transport_retries = Retry(total=3, connect=3, read=2, status=0,
+                                  backoff_factor=0.5, allowed_methods=["GET"])
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size,
+                              max_retries=transport_retries)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self._stats = {}
+        self._stats_lock = threading.Lock()
+        # Called as hook(endpoint, params, response) for every 200 response
+        self.response_hooks = []
+
+    def _send(self, endpoint, params):
+        url = f"{self.base_url}/{endpoint.lstrip('/')}"
+        started = time.perf_counter()
+        try:
+            response = self.session.get(url, params=params, timeout=self.timeout)
+            body = response.content
+        except requests.exceptions.RequestException:
+            self._record(endpoint, time.perf_counter() - started, 0, 0, error=True)
+            metrics.inc("api_requests_total", endpoint=endpoint, status="error")
+            raise
+
+        wire_bytes = response.headers.get("Content-Length")
+        if wire_bytes is not None and wire_bytes.isdigit():
+            wire_bytes = int(wire_bytes)
+        else:
+            # urllib3 tracks the raw (still compressed) bytes read off the socket
+            tell = getattr(response.raw, "tell", None)
+            wire_bytes = tell() if tell else len(body)
+        seconds = time.perf_counter() - started
+        self._record(endpoint, seconds, wire_bytes, len(body), error=response.status_code != 200)
+        metrics.inc("api_requests_total", endpoint=endpoint, status=str(response.status_code))
+        metrics.observe("api_request_duration_seconds", seconds, endpoint=endpoint)
+        if response.status_code == 200:
+            for hook in self.response_hooks:
+                hook(endpoint, params, response)
+        return response
+
+    def _record(self, endpoint, seconds, wire_bytes, body_bytes, error=False):
+        with self._stats_lock:
+            stats = self._stats.setdefault(endpoint, EndpointStats())
+            stats.requests += 1
+            stats.seconds += seconds
+            stats.wire_bytes += wire_bytes
+            stats.body_bytes += body_bytes
+            if error:
+                stats.errors += 1
+
+    def get(self, endpoint, params=None, priority=PRIORITY_PLAYERS):
+        """GET `endpoint` (e.g. "fixtures") through the shared scheduler."""
+        return self.scheduler.execute(lambda: self._send(endpoint, params),
+                                      priority=priority,
+                                      description=f"GET /{endpoint} {params}")
+
+    def stats(self):
+        with self._stats_lock:
+            return dict(self._stats)
+
+    def stats_summary(self):
+        lines = [f"{'Endpoint':<22}{'Requests':>10}{'Errors':>8}{'Avg ms':>10}{'Wire KB':>12}{'Body KB':>12}"]
+        for endpoint, s in sorted(self.stats().items()):
+            avg_ms = s.seconds / s.requests * 1000 if s.requests else 0.0
+            lines.append(f"{endpoint:<22}{s.requests:>10}{s.errors:>8}{avg_ms:>10.1f}"
+                         f"{s.wire_bytes / 1024:>12.1f}{s.body_bytes / 1024:>12.1f}")
+        return "\n".join(lines)
+
+    def close(self):
+        self.session.close()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """Process-wide client so every fetch shares one connection pool."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = ApiClient()
+        return _client
+
+
+def log_stats_summary():
+    if _client is None:
+        return
+    summary = _client.stats_summary()
+    logging.info("API request summary:\n" + summary)
+    print("\nAPI request summary:")
+    print(summary)
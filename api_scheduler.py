@@ -0,0 +1,227 @@
+import heapq
+import itertools
+import logging
+import os
+import random
+import threading
+import time
+
+import requests
+from dotenv import load_dotenv
+
+import metrics
+
+load_dotenv()
+
+# Per-minute pacing and daily quota defaults; the live values are learned
+# from the rate-limit headers RapidAPI returns with every response.
+RATE_LIMIT_PER_MINUTE = int(os.getenv("RATE_LIMIT_PER_MINUTE", "30"))
+DAILY_QUOTA = int(os.getenv("DAILY_QUOTA", "0"))  # 0 = unknown until the first response
+DAILY_QUOTA_RESERVE = int(os.getenv("DAILY_QUOTA_RESERVE", "10"))
+MAX_RETRIES = int(os.getenv("API_MAX_RETRIES", "5"))
+
+# Lower numbers are served first when several callers wait for a token.
+PRIORITY_FIXTURES = 0
+PRIORITY_TEAMS = 1
+PRIORITY_PLAYERS = 2
+PRIORITY_LINEUPS = 3
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class QuotaExhausted(Exception):
+    """Raised when the daily budget would dip into the configured reserve."""
+
+
+def _header_int(response_headers, *names):
+    for name in names:
+        value = response_headers.get(name)
+        if value is None:
+            continue
+        try:
+            return int(float(value))
+        except ValueError:
+            continue
+    return None
+
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously at `rate_per_minute`.
+    The per-minute headers shrink or grow the bucket so we never run ahead of
+    what the API says is left in the current window.
+    """
+
+    def __init__(self, rate_per_minute, capacity=None):
+        self.rate_per_minute = rate_per_minute
+        self.capacity = capacity or rate_per_minute
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self.updated
+        self.updated = now
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.rate_per_minute / 60.0)
+
+    def wait_time(self):
+        """Seconds until one token is available (0 if one is available now)."""
+        self._refill()
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) * 60.0 / self.rate_per_minute
+
+    def take(self):
+        self._refill()
+        self.tokens -= 1
+
+    def update_from_headers(self, response_headers):
+        limit = _header_int(response_headers, "X-RateLimit-Limit")
+        remaining = _header_int(response_headers, "X-RateLimit-Remaining")
+        if limit and limit > 0:
+            self.rate_per_minute = limit
+            self.capacity = limit
+        if remaining is not None:
+            self._refill()
+            self.tokens = min(self.tokens, float(remaining))
+
+    def pause(self, seconds):
+        """Drain the bucket so nothing is sent for roughly `seconds`."""
+        self._refill()
+        self.tokens = min(self.tokens, -seconds * self.rate_per_minute / 60.0)
+
+
+class DailyBudget:
+    """
+    Tracks the daily request quota and refuses to spend the reserve, so a long
+    backfill stops cleanly instead of running into hard 429s for the rest of the day.
+    """
+
+    def __init__(self, limit=DAILY_QUOTA, reserve=DAILY_QUOTA_RESERVE):
+        self.limit = limit or None
+        self.remaining = limit or None
+        self.reserve = reserve
+        self.spent = 0
+
+    def check(self):
+        if self.remaining is not None and self.remaining <= self.reserve:
+            raise QuotaExhausted(
+                f"Daily API quota nearly exhausted ({self.remaining} left, reserve {self.reserve}).")
+
+    def record(self, response_headers):
+        self.spent += 1
+        limit = _header_int(response_headers, "x-ratelimit-requests-limit")
+        remaining = _header_int(response_headers, "x-ratelimit-requests-remaining")
+        if limit:
+            self.limit = limit
+        if remaining is not None:
+            self.remaining = remaining
+        elif self.remaining is not None:
+            self.remaining -= 1
+
+    def requests_left(self):
+        """Requests that may still be sent today, or None if the quota is unknown."""
+        if self.remaining is None:
+            return None
+        return max(0, self.remaining - self.reserve)
+
+
+class RequestScheduler:
+    """
+    Central gate for every API call made by the fetch scripts.
+
+    Callers block in `execute` until it is their turn: waiting requests are
+    served by priority (fixtures before teams before players before lineups),
+    paced by the token bucket and checked against the daily budget. Responses
+    with 429/5xx are retried with full-jitter exponential backoff.
+    """
+
+    def __init__(self, bucket=None, budget=None, max_retries=MAX_RETRIES,
+                 backoff_base=1.0, backoff_cap=60.0):
+        self.bucket = bucket or TokenBucket(RATE_LIMIT_PER_MINUTE)
+        self.budget = budget or DailyBudget()
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self._cond = threading.Condition()
+        self._waiting = []
+        self._seq = itertools.count()
+
+    def _acquire(self, priority):
+        ticket = (priority, next(self._seq))
+        with self._cond:
+            heapq.heappush(self._waiting, ticket)
+            try:
+                while True:
+                    if self._waiting[0] == ticket:
+                        self.budget.check()
+                        delay = self.bucket.wait_time()
+                        if delay <= 0:
+                            self.bucket.take()
+                            return
+                        self._cond.wait(delay)
+                    else:
+                        self._cond.wait()
+            finally:
+                self._waiting.remove(ticket)
+                heapq.heapify(self._waiting)
+                self._cond.notify_all()
+
+    def _backoff(self, attempt, response=None):
+        retry_after = None
+        if response is not None:
+            retry_after = _header_int(response.headers, "Retry-After")
+        if retry_after is not None:
+            return retry_after + random.uniform(0, 1)
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+
+    def _observe(self, response):
+        with self._cond:
+            self.bucket.update_from_headers(response.headers)
+            self.budget.record(response.headers)
+            if self.budget.remaining is not None:
+                metrics.set_gauge("api_quota_remaining", self.budget.remaining)
+
+    def execute(self, send, priority=PRIORITY_PLAYERS, description="request"):
+        """
+        Run `send()` (a zero-argument callable returning a requests.Response)
+        under the scheduler and return the final response.
+        """
+        attempt = 0
+        while True:
+            self._acquire(priority)
+            try:
+                response = send()
+            except requests.exceptions.RequestException as e:
+                if attempt >= self.max_retries:
+                    raise
+                delay = self._backoff(attempt)
+                logging.warning(f"{description} failed ({e}); retrying in {delay:.1f}s")
+                time.sleep(delay)
+                attempt += 1
+                continue
+
+            self._observe(response)
+            if response.status_code not in RETRY_STATUS_CODES or attempt >= self.max_retries:
+                return response
+
+            delay = self._backoff(attempt, response)
+            logging.warning(f"{description} returned {response.status_code}; retrying in {delay:.1f}s")
+            if response.status_code == 429:
+                with self._cond:
+                    self.bucket.pause(delay)
+            time.sleep(delay)
+            attempt += 1
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler():
+    """Process-wide scheduler shared by every fetch script."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = RequestScheduler()
+        return _scheduler
@@ -0,0 +1,171 @@
+"""
+Answer many CLI questions in one run.
+
+Each line of the input file is a JSON query spec such as
+
+    {"query": "roster", "team": "Arsenal", "season": 2023}
+    {"query": "player_matches", "player": "Saka", "season": 2023}
+
+Specs are spread over a process pool, each worker holding its own read-only
+connection, and run through the same lookups and queries as the cli.py views.
+One JSON result per spec is written to the output file in input order, while
+later specs are still being answered.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+from dotenv import load_dotenv
+
+import cli
+from db_config import connect
+from partitions import connect_partitioned
+
+load_dotenv()
+
+DB_FILE = os.getenv("DB_FILE", "soccer_management.db")
+PARTITION_DIR = os.getenv("PARTITION_DIR")
+
+MATCH_COLUMNS = ["Match_ID", "Home_Team", "Away_Team", "Date", "Home_Score", "Away_Score",
+                 "Year_Start", "Year_End"]
+
+
+def player_matches(conn, player, season):
+    """`player` is a Player_ID or a name; a name must identify one player."""
+    if isinstance(player, int) or str(player).isdigit():
+        return cli.player_season_matches(conn, int(player), season)
+    players = cli.find_players(conn, player)
+    exact = [p for p in players if p[1].lower() == str(player).lower()]
+    if len(players) == 1 or len(exact) == 1:
+        return cli.player_season_matches(conn, (exact or players)[0][0], season)
+    if not players:
+        raise cli.NotFound(f"No players found with name containing '{player}'.")
+    raise cli.NotFound(f"'{player}' matches {len(players)} players; use the Player_ID instead.")
+
+
+# query name: (function, spec fields passed as arguments, result columns)
+QUERIES = {
+    "season_fixtures": (cli.season_fixtures, ["season"], MATCH_COLUMNS),
+    "league_fixtures": (cli.league_fixtures, ["league", "season"], MATCH_COLUMNS),
+    "team_fixtures": (cli.team_fixtures, ["team", "season"], MATCH_COLUMNS),
+    "league_teams": (cli.league_teams, ["league", "season"], ["Team_Name"]),
+    "roster": (cli.team_roster, ["team", "season"], ["Player_Name", "Position"]),
+    "player_matches": (player_matches, ["player", "season"],
+                       ["Match_ID", "Home_Team", "Away_Team", "Date", "Home_Score", "Away_Score",
+                        "Minutes_Played", "Goals", "Assists"]),
+    "form": (cli.league_form, ["league", "season"],
+             ["Team_Name", "Played", "Points", "Goal_Difference", "Form", "Points_Last_5", "PPG_Last_5",
+              "PPG_Last_10", "Goals_For_Last_5", "Goals_Against_Last_5", "Home_Form", "Away_Form"]),
+}
+
+# The worker's connection, opened once by init_worker
+_conn = None
+
+
+def init_worker(db_file, partition_dir):
+    global _conn
+    _conn = connect_partitioned(partition_dir) if partition_dir else connect(db_file, read_only=True)
+
+
+def run_spec(item):
+    """
+    Answer one (line number, JSON text) spec; returns (result as a JSON line,
+    failed). A spec that cannot be answered becomes an "error" result.
+    """
+    line_number, text = item
+    result = {"line": line_number}
+    try:
+        spec = json.loads(text)
+        if not isinstance(spec, dict):
+            raise ValueError(f"Expected a JSON object, got {type(spec).__name__}")
+        result["query"] = spec.get("query")
+        if "id" in spec:
+            result["id"] = spec["id"]
+        if spec.get("query") not in QUERIES:
+            raise ValueError(f"Unknown query '{spec.get('query')}'; expected one of {', '.join(QUERIES)}")
+        function, fields, columns = QUERIES[spec["query"]]
+        missing = [field for field in fields if field not in spec]
+        if missing:
+            raise ValueError(f"Missing field(s): {', '.join(missing)}")
+        args = [int(spec[field]) if field == "season" else spec[field] for field in fields]
+        result["columns"] = columns
+        result["rows"] = [list(row) for row in function(_conn, *args)]
+    except (cli.NotFound, ValueError, TypeError) as e:
+        result["error"] = str(e)
+    except Exception as e:
+        # Anything else (e.g. sqlite3.Error) fails this spec only, never the whole batch
+        result["error"] = f"{type(e).__name__}: {e}"
+    if "error" in result:
+        result.pop("columns", None)
+    return json.dumps(result), "error" in result
+
+
+def read_specs(path):
+    """(line number, text) for every non-blank line."""
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            if line.strip():
+                yield line_number, line
+
+
+def run_batch(input_path, output_path, workers, chunksize, db_file=DB_FILE, partition_dir=PARTITION_DIR):
+    """Returns (queries answered, errors, seconds)."""
+    started = time.perf_counter()
+    count = errors = 0
+    with multiprocessing.Pool(workers, initializer=init_worker, initargs=(db_file, partition_dir)) as pool, \
+            open(output_path, "w", encoding="utf-8") as out:
+        # imap hands results back in input order as soon as each one is ready
+        for line, failed in pool.imap(run_spec, read_specs(input_path), chunksize=chunksize):
+            out.write(line + "\n")
+            count += 1
+            errors += failed
+    return count, errors, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a JSONL file of CLI queries across a process pool.")
+    parser.add_argument("input", help="JSONL query specs, one per line")
+    parser.add_argument("--output", default="batch_results.jsonl", help="Where to write results (JSONL)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Worker processes (default: cores)")
+    parser.add_argument("--chunksize", type=int, default=32, help="Specs handed to a worker at a time")
+    parser.add_argument("--scaling", action="store_true",
+                        help="Time the batch with 1, 2, 4, ... workers up to --workers, discarding results")
+    args = parser.parse_args()
+
+    if not PARTITION_DIR and not os.path.exists(DB_FILE):
+        print(f"Database not found: {DB_FILE}")
+        sys.exit(1)
+    if not os.path.exists(args.input):
+        print(f"Input file not found: {args.input}")
+        sys.exit(1)
+    if next(read_specs(args.input), None) is None:
+        print(f"No query specs in {args.input}.")
+        sys.exit(1)
+
+    if args.scaling:
+        counts = [1]
+        while counts[-1] * 2 < args.workers:
+            counts.append(counts[-1] * 2)
+        if counts[-1] != args.workers:
+            counts.append(args.workers)
+        base_rate = None
+        print(f"{'Workers':>8}{'Queries/s':>12}{'Speedup':>10}")
+        for workers in counts:
+            count, _, seconds = run_batch(args.input, os.devnull, workers, args.chunksize)
+            rate = count / seconds if seconds else 0.0
+            if base_rate is None:
+                base_rate = rate
+            speedup = f"{rate / base_rate:>9.1f}x" if base_rate else f"{'-':>10}"
+            print(f"{workers:>8}{rate:>12.0f}{speedup}")
+        return
+
+    count, errors, seconds = run_batch(args.input, args.output, args.workers, args.chunksize)
+    print(f"Answered {count} queries in {seconds:.2f}s with {args.workers} workers: "
+          f"{count / seconds if seconds else 0:.0f} queries/s, {errors} error(s). Results: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+import functools
+import json
+import os
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+COMPETITIONS_FILE = os.getenv(
+    "COMPETITIONS_FILE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "competitions.json"))
+
+# Competitions up to this priority are fetched by fetch_data_other.py and
+# ingest_parallel.py; the planner works through the whole catalog.
+CATALOG_MAX_PRIORITY = int(os.getenv("CATALOG_MAX_PRIORITY", "1"))
+
+
+def load_catalog(path=COMPETITIONS_FILE, max_priority=None):
+    """
+    Enabled competitions from the catalog file, most important first, with
+    defaults filled in: seasons (the file's default_seasons), priority (9),
+    type ("league"), fetch_players (true for leagues) and a display name
+    that is unique across the catalog.
+    """
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    default_seasons = data.get("default_seasons", [])
+
+    competitions = []
+    for entry in data.get("competitions", []):
+        if not entry.get("enabled", True):
+            continue
+        competition = {
+            "id": int(entry["id"]),
+            "name": entry["name"],
+            "country": entry.get("country"),
+            "type": entry.get("type", "league"),
+            "priority": int(entry.get("priority", 9)),
+            "seasons": sorted(entry.get("seasons", default_seasons)),
+        }
+        competition["fetch_players"] = entry.get("fetch_players", competition["type"] == "league")
+        competitions.append(competition)
+
+    competitions.sort(key=lambda c: c["priority"])
+    # Several countries share league names (Serie A, Bundesliga, ...); the
+    # highest-priority one keeps the plain name, the others get their country
+    seen_names = set()
+    for c in competitions:
+        if c["name"] in seen_names and c["country"]:
+            c["name"] = f"{c['name']} ({c['country']})"
+        seen_names.add(c["name"])
+
+    if max_priority is not None:
+        competitions = [c for c in competitions if c["priority"] <= max_priority]
+    return competitions
+
+
+def competition_names(competitions):
+    """League_ID -> display name, used when writing League rows."""
+    return {c["id"]: c["name"] for c in competitions}
+
+
+@functools.lru_cache(maxsize=None)
+def cup_ids(path=COMPETITIONS_FILE):
+    """
+    League_IDs of every cup in the catalog, enabled or not. Their team lists
+    must not replace a club's domestic League_ID.
+    """
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    return frozenset(int(entry["id"]) for entry in data.get("competitions", [])
+                     if entry.get("type", "league") == "cup")
@@ -0,0 +1,254 @@
+"""
+Query-plan regression check for the CLI.
+
+Every view in cli.py is driven with scripted input against a small database
+built from schema.sql plus migrations. The SQL each view issues is captured
+with a trace callback, run through EXPLAIN QUERY PLAN and compared with the
+plans checked in to query_plans.json. The check fails when a statement gains
+a SCAN of one of the large tables that its golden plan does not have, or when a
+view sorts for ORDER BY in a temp B-tree more often than ORDER_BY_SORTS allows.
+"""
+import argparse
+import builtins
+import contextlib
+import io
+import json
+import os
+import re
+import sqlite3
+import sys
+import tempfile
+
+import cli
+import similarity
+import teammates
+from migrations import apply_migrations
+from query_cache import clear_cache
+
+SCHEMA_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "schema.sql")
+GOLDEN_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "query_plans.json")
+
+# Tables that grow with every season fetched; scanning any of them makes a view slow
+LARGE_TABLES = {"Player", "Team_Player_Season", "Match", "Player_Match_Participation",
+                "Player_Transfer", "Raw_Payload", "Work_Item"}
+
+# Views whose ORDER BY no index can serve: (temp B-tree sorts allowed across all of
+# the view's statements, why). These are checked here rather than taken from
+# query_plans.json, so `--update` alone can never accept a new sort.
+ORDER_BY_SORTS = {
+    "view_team_roster_for_season": (1, "one squad, filtered on Team_Player_Season, ordered by Player_Name"),
+    "search_players_by_name": (1, "at most 50 LIKE matches ordered by Player_Name COLLATE NOCASE"),
+    "search_players_with_filters": (1, "at most 50 LIKE matches ordered by Player_Name COLLATE NOCASE"),
+    "view_team_transfers_for_season": (2, "one team's transfers in and out for a season, ordered by Player_Name"),
+    "view_league_form": (6, "one league-season: each Team_Match branch and three window passes sort "
+                            "by team and date, and the table is ordered by points"),
+}
+
+SQL_KEYWORDS = {"ON", "WHERE", "JOIN", "LEFT", "INNER", "CROSS", "GROUP", "ORDER", "LIMIT", "USING", "AS"}
+
+# (name, view function, answers to its prompts, runs only when)
+SCENARIOS = [
+    ("show_teams", cli.show_teams, [], None),
+    ("view_teams_in_league_season", cli.view_teams_in_league_season, ["Premier", "2023"], None),
+    ("view_team_roster_for_season", cli.view_team_roster_for_season, ["Arsenal", "2023"], None),
+    ("show_all_matches", cli.show_all_matches, [], None),
+    ("view_fixtures_for_season", cli.view_fixtures_for_season, ["2023"], None),
+    ("view_fixtures_for_league_season", cli.view_fixtures_for_league_season, ["Premier", "2023"], None),
+    ("view_fixtures_for_team_season", cli.view_fixtures_for_team_season, ["Arsenal", "2023"], None),
+    ("search_players_by_name", cli.search_players_by_name, ["Saka", "", "", "", ""], None),
+    ("search_players_by_id", cli.search_players_by_name, ["#1", "", "", "", ""], None),
+    ("search_players_with_filters", cli.search_players_by_name,
+     ["Saka", "Attacker", "Arsenal", "Premier", "2023"], None),
+    ("view_player_teams_last_5_seasons", cli.view_player_teams_last_5_seasons, ["Saka"], None),
+    ("view_player_current_team_2023_24", cli.view_player_current_team_2023_24, ["Saka"], None),
+    ("view_player_matches_in_season", cli.view_player_matches_in_season, ["Saka", "2023"], None),
+    ("view_team_transfers_for_season", cli.view_team_transfers_for_season, ["Arsenal", "2023"], None),
+    ("view_top_transfer_corridors", cli.view_top_transfer_corridors, [""], None),
+    ("view_top_transfer_corridors_season", cli.view_top_transfer_corridors, ["2023"], None),
+    ("view_similar_players", cli.view_similar_players, ["Saka"], lambda: similarity.np is not None),
+    ("view_league_form", cli.view_league_form, ["Premier", "2023"], None),
+    ("view_teammates", cli.view_teammates, ["Saka"], lambda: teammates.np is not None),
+    ("view_teammate_link", cli.view_teammate_link, ["Palmer", "Saka"], lambda: teammates.np is not None),
+]
+
+SEED_SQL = """
+    INSERT INTO League (League_ID, League_Name) VALUES (39, 'Premier League');
+    INSERT INTO Season (Season_ID, Year_Start, Year_End) VALUES (1, 2022, 2023), (2, 2023, 2024);
+    INSERT INTO Team (Team_ID, Team_Name, League_ID) VALUES (42, 'Arsenal', 39), (49, 'Chelsea', 39);
+    INSERT INTO Player (Player_ID, Player_Name, Position) VALUES
+        (1, 'Bukayo Saka', 'Attacker'), (2, 'Cole Palmer', 'Midfielder'), (3, 'Kai Havertz', 'Attacker');
+    INSERT INTO Team_Player_Season (Team_ID, Player_ID, Season_ID, League_ID) VALUES
+        (42, 1, 1, 39), (42, 1, 2, 39), (49, 2, 2, 39), (49, 3, 1, 39), (42, 3, 2, 39);
+    INSERT INTO Match (Match_ID, Home_Team_ID, Away_Team_ID, Date, Home_Score, Away_Score, Season_ID, League_ID)
+    VALUES (1001, 42, 49, '2023-10-21T16:30:00+00:00', 2, 2, 2, 39),
+           (1002, 49, 42, '2022-11-06T12:00:00+00:00', 0, 1, 1, 39);
+    INSERT INTO Player_Match_Participation (Match_ID, Player_ID, Minutes_Played, Goals, Assists, Season_ID) VALUES
+        (1001, 1, 90, 1, 0, 2), (1001, 2, 90, 1, 0, 2), (1001, 3, 70, 0, 1, 2), (1002, 1, 90, 0, 0, 1);
+    INSERT INTO Player_Transfer (Player_ID, From_Team_ID, To_Team_ID, From_Season_ID, To_Season_ID, Mid_Season)
+    VALUES (3, 49, 42, 1, 2, 0);
+"""
+
+
+def build_database():
+    conn = sqlite3.connect(":memory:")
+    with open(SCHEMA_FILE, encoding="utf-8") as f:
+        conn.executescript(f.read())
+    apply_migrations(conn)
+    conn.executescript(SEED_SQL)
+    return conn
+
+
+def normalize_sql(sql):
+    return " ".join(sql.split())
+
+
+def explain(conn, sql):
+    """The plan as one line per step, indented by depth."""
+    depth = {0: -1}
+    steps = []
+    for node_id, parent, _, detail in conn.execute(f"EXPLAIN QUERY PLAN {sql}"):
+        depth[node_id] = depth.get(parent, -1) + 1
+        steps.append("  " * depth[node_id] + detail)
+    return steps
+
+
+def capture(conn, view, answers):
+    """Run one view with scripted input; returns the distinct queries it issued, in order."""
+    statements = []
+    answers = iter(answers)
+
+    def trace(sql):
+        sql = normalize_sql(sql)
+        if sql.upper().startswith(("SELECT", "WITH")) and sql not in statements:
+            statements.append(sql)
+
+    clear_cache()
+    original_input = builtins.input
+    builtins.input = lambda prompt="": next(answers)
+    conn.set_trace_callback(trace)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            view(conn)
+    finally:
+        conn.set_trace_callback(None)
+        builtins.input = original_input
+    return statements
+
+
+def collect_plans(conn):
+    plans = {}
+    for name, view, answers, available in SCENARIOS:
+        if available is not None and not available():
+            print(f"Skipping {name}: requirements not installed.")
+            continue
+        plans[name] = [{"sql": sql, "plan": explain(conn, sql)} for sql in capture(conn, view, answers)]
+    return plans
+
+
+def table_aliases(sql):
+    aliases = {}
+    for table, alias in re.findall(r"\b(?:FROM|JOIN)\s+(\w+)(?:\s+(?:AS\s+)?(\w+))?", sql, re.IGNORECASE):
+        aliases[table] = table
+        if alias and alias.upper() not in SQL_KEYWORDS:
+            aliases[alias] = table
+    return aliases
+
+
+def bad_steps(sql, plan):
+    """Steps that scan a large table."""
+    aliases = table_aliases(sql)
+    found = set()
+    for step in plan:
+        step = step.strip()
+        scan = re.match(r"SCAN (\w+)", step)
+        if scan and aliases.get(scan.group(1), scan.group(1)) in LARGE_TABLES:
+            found.add(step)
+    return found
+
+
+def order_by_sorts(plan):
+    return sum(1 for step in plan if re.search(r"TEMP B-TREE FOR .*ORDER BY", step))
+
+
+def compare(plans, golden):
+    """(regressions, changes): messages for new bad steps and for any other plan difference."""
+    regressions = []
+    changes = []
+    for name, statements in plans.items():
+        allowed, _ = ORDER_BY_SORTS.get(name, (0, None))
+        sorts = sum(order_by_sorts(entry["plan"]) for entry in statements)
+        if sorts > allowed:
+            regressions.append(f"{name}: {sorts} temp B-tree sort(s) for ORDER BY, {allowed} allowed "
+                               f"by ORDER_BY_SORTS")
+        elif sorts < allowed:
+            changes.append(f"{name}: {sorts} temp B-tree sort(s) for ORDER BY; lower ORDER_BY_SORTS to {sorts}")
+        expected = {entry["sql"]: entry["plan"] for entry in golden.get(name, [])}
+        for entry in statements:
+            sql, plan = entry["sql"], entry["plan"]
+            old_plan = expected.pop(sql, None)
+            if old_plan is None:
+                changes.append(f"{name}: new statement: {sql[:100]}")
+                old_bad = set()
+            else:
+                if old_plan != plan:
+                    changes.append(f"{name}: plan changed for: {sql[:100]}")
+                old_bad = bad_steps(sql, old_plan)
+            for step in sorted(bad_steps(sql, plan) - old_bad):
+                regressions.append(f"{name}: {step}\n    in: {sql[:200]}")
+        for sql in expected:
+            changes.append(f"{name}: statement no longer issued: {sql[:100]}")
+    return regressions, changes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the CLI's query plans with query_plans.json.")
+    parser.add_argument("--update", action="store_true", help="Accept the current plans as the new golden file")
+    parser.add_argument("--golden", default=GOLDEN_FILE, help="Golden plan file (default: query_plans.json)")
+    args = parser.parse_args()
+
+    conn = build_database()
+    # The similarity and teammate views build their files in the working directory on first use
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            if similarity.np is not None:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    similarity.build(conn)
+            if teammates.np is not None:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    teammates.build(conn)
+            plans = collect_plans(conn)
+        finally:
+            os.chdir(cwd)
+    conn.close()
+
+    statement_count = sum(len(statements) for statements in plans.values())
+    if args.update:
+        with open(args.golden, "w", encoding="utf-8") as f:
+            json.dump(plans, f, indent=2)
+            f.write("\n")
+        print(f"Wrote {statement_count} plans for {len(plans)} views to {args.golden}.")
+        return
+
+    if not os.path.exists(args.golden):
+        print(f"{args.golden} not found; run with --update to create it.")
+        sys.exit(1)
+    with open(args.golden, encoding="utf-8") as f:
+        golden = json.load(f)
+
+    regressions, changes = compare(plans, golden)
+    for message in changes:
+        print(f"  [changed] {message}")
+    for message in regressions:
+        print(f"  [regression] {message}")
+    print(f"Checked {statement_count} statements from {len(plans)} views: "
+          f"{len(regressions)} regression(s), {len(changes)} other change(s).")
+    if regressions:
+        sys.exit(1)
+    if changes:
+        print("Review the changes and run with --update to accept them.")
+
+
+if __name__ == "__main__":
+    main()
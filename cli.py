@@ -1,27 +1,229 @@
+import argparse
 import sqlite3
 import sys
 import os
 from datetime import datetime
 from dotenv import load_dotenv
 
+from db_config import connect
+from partitions import connect_partitioned
+from query_cache import cached_fetchall, cached_fetchone
+import similarity
+import teammates
+from table_render import render
+from transfers import flow_graph, team_transfers
+
 load_dotenv()
 
 DB_FILE = os.getenv("DB_FILE", "soccer_management.db")
+PARTITION_DIR = os.getenv("PARTITION_DIR")
 
 def connect_to_db():
     try:
-        conn = sqlite3.connect(DB_FILE)
+        if PARTITION_DIR:
+            return connect_partitioned(PARTITION_DIR)
+        conn = connect(DB_FILE)
         return conn
-    except sqlite3.Error as e:
+    except (sqlite3.Error, RuntimeError) as e:
         print(f"Error connecting to the database: {e}")
         sys.exit(1)
 
 
+# Lookups and queries behind the views, without prompts or printing, so
+# batch_query.py can answer the same questions for many inputs at once.
+
+class NotFound(Exception):
+    """A team, league or season named in a query is not in the database."""
+
+
+def find_team_id(conn, team_name):
+    row = cached_fetchone(conn, "SELECT Team_ID FROM Team WHERE Team_Name LIKE ?",
+                          (f"%{team_name}%",))
+    if not row:
+        raise NotFound(f"No team found with the name '{team_name}'.")
+    return row[0]
+
+
+def find_league_id(conn, league_name):
+    row = cached_fetchone(conn, "SELECT League_ID FROM League WHERE League_Name LIKE ?",
+                          (f"%{league_name}%",))
+    if not row:
+        raise NotFound(f"No league found with name containing '{league_name}'.")
+    return row[0]
+
+
+def find_season_id(conn, start_year):
+    row = cached_fetchone(conn, "SELECT Season_ID FROM Season WHERE Year_Start=? AND Year_End=?",
+                          (start_year, start_year+1))
+    if not row:
+        raise NotFound(f"No season found for {start_year}/{start_year+1}.")
+    return row[0]
+
+
+def find_players(conn, player_name):
+    """(Player_ID, Player_Name) for every player whose name contains `player_name`."""
+    return cached_fetchall(conn, "SELECT Player_ID, Player_Name FROM Player WHERE Player_Name LIKE ?",
+                           (f"%{player_name}%",))
+
+
+def season_fixtures(conn, start_year):
+    query = """
+    SELECT
+        m.Match_ID,
+        th.Team_Name AS Home_Team_Name,
+        ta.Team_Name AS Away_Team_Name,
+        m.Date,
+        m.Home_Score,
+        m.Away_Score,
+        s.Year_Start,
+        s.Year_End
+    FROM Match m
+    JOIN Team th ON m.Home_Team_ID = th.Team_ID
+    JOIN Team ta ON m.Away_Team_ID = ta.Team_ID
+    JOIN Season s ON m.Season_ID = s.Season_ID
+    WHERE m.Season_ID = ?
+    """
+    # Filter on Season_ID directly so partitioned databases only read one season
+    return cached_fetchall(conn, query, (find_season_id(conn, start_year),))
+
+
+def team_fixtures(conn, team_name, start_year):
+    team_id = find_team_id(conn, team_name)
+    season_id = find_season_id(conn, start_year)
+    query = """
+    SELECT Match_ID, th.Team_Name AS Home_Team_Name, ta.Team_Name AS Away_Team_Name, Date, Home_Score, Away_Score, s.Year_Start, s.Year_End
+    FROM Match
+    JOIN Team th ON Match.Home_Team_ID = th.Team_ID
+    JOIN Team ta ON Match.Away_Team_ID = ta.Team_ID
+    JOIN Season s ON Match.Season_ID = s.Season_ID
+    WHERE (Home_Team_ID = ? OR Away_Team_ID = ?) AND Match.Season_ID = ?
+    """
+    return cached_fetchall(conn, query, (team_id, team_id, season_id))
+
+
+def league_fixtures(conn, league_name, start_year):
+    league_id = find_league_id(conn, league_name)
+    season_id = find_season_id(conn, start_year)
+    query = """
+    SELECT
+        m.Match_ID,
+        th.Team_Name AS Home_Team_Name,
+        ta.Team_Name AS Away_Team_Name,
+        m.Date,
+        m.Home_Score,
+        m.Away_Score,
+        s.Year_Start,
+        s.Year_End
+    FROM Match m
+    JOIN Team th ON m.Home_Team_ID = th.Team_ID
+    JOIN Team ta ON m.Away_Team_ID = ta.Team_ID
+    JOIN Season s ON m.Season_ID = s.Season_ID
+    WHERE m.League_ID = ? AND m.Season_ID = ?
+    ORDER BY m.Date DESC
+    """
+    return cached_fetchall(conn, query, (league_id, season_id))
+
+
+def league_teams(conn, league_name, start_year):
+    league_id = find_league_id(conn, league_name)
+    season_id = find_season_id(conn, start_year)
+    return cached_fetchall(conn, """
+        SELECT DISTINCT T.Team_Name
+        FROM Team_Player_Season TPS
+        JOIN Team T ON TPS.Team_ID = T.Team_ID
+        JOIN League L ON T.League_ID = L.League_ID
+        WHERE TPS.Season_ID = ? AND L.League_ID = ?
+    """, (season_id, league_id))
+
+
+def team_roster(conn, team_name, start_year):
+    team_id = find_team_id(conn, team_name)
+    season_id = find_season_id(conn, start_year)
+    query = """
+    SELECT p.Player_Name, p.Position
+    FROM Team_Player_Season tps
+    JOIN Player p ON tps.Player_ID = p.Player_ID
+    WHERE tps.Team_ID = ? AND tps.Season_ID = ?
+    ORDER BY p.Player_Name
+    """
+    return cached_fetchall(conn, query, (team_id, season_id))
+
+
+def player_season_matches(conn, player_id, start_year):
+    season_id = find_season_id(conn, start_year)
+    query = """
+    SELECT
+        m.Match_ID,
+        th.Team_Name AS Home_Team_Name,
+        ta.Team_Name AS Away_Team_Name,
+        m.Date,
+        m.Home_Score,
+        m.Away_Score,
+        pmp.Minutes_Played,
+        pmp.Goals,
+        pmp.Assists
+    FROM Player_Match_Participation pmp
+    JOIN Match m ON pmp.Match_ID = m.Match_ID
+    JOIN Team th ON m.Home_Team_ID = th.Team_ID
+    JOIN Team ta ON m.Away_Team_ID = ta.Team_ID
+    WHERE pmp.Player_ID = ?1 AND pmp.Season_ID = ?2 AND m.Season_ID = ?2
+    ORDER BY m.Date DESC
+    """
+    return cached_fetchall(conn, query, (player_id, season_id))
+
+
+def league_form(conn, league_name, start_year):
+    """
+    Form guide for every team in a league-season, most points in the last five
+    matches first. Form strings list results latest first.
+    """
+    league_id = find_league_id(conn, league_name)
+    season_id = find_season_id(conn, start_year)
+    # One pass over Team_Match: each team's matches are ranked newest first,
+    # overall and per venue, and the result strings are built by group_concat
+    # over a five-match window starting at each match.
+    query = """
+    WITH results AS (
+        SELECT Team_ID, Home, Goals_For, Goals_Against,
+               CASE WHEN Goals_For > Goals_Against THEN 3 WHEN Goals_For = Goals_Against THEN 1 ELSE 0 END AS Points,
+               CASE WHEN Goals_For > Goals_Against THEN 'W' WHEN Goals_For = Goals_Against THEN 'D' ELSE 'L' END AS Result,
+               Date, Match_ID
+        FROM Team_Match
+        WHERE League_ID = ? AND Season_ID = ?
+    ),
+    ranked AS (
+        SELECT *,
+               ROW_NUMBER() OVER latest AS Recent,
+               ROW_NUMBER() OVER venue_latest AS Venue_Recent,
+               group_concat(Result, '') OVER (latest ROWS BETWEEN CURRENT ROW AND 4 FOLLOWING) AS Last_5,
+               group_concat(Result, '') OVER (venue_latest ROWS BETWEEN CURRENT ROW AND 4 FOLLOWING) AS Venue_Last_5
+        FROM results
+        WINDOW latest AS (PARTITION BY Team_ID ORDER BY Date DESC, Match_ID DESC),
+               venue_latest AS (PARTITION BY Team_ID, Home ORDER BY Date DESC, Match_ID DESC)
+    )
+    SELECT t.Team_Name,
+           COUNT(*) AS Played,
+           SUM(Points) AS Points,
+           SUM(Goals_For) - SUM(Goals_Against) AS Goal_Difference,
+           MAX(CASE WHEN Recent = 1 THEN Last_5 END) AS Form,
+           SUM(Points) FILTER (WHERE Recent <= 5) AS Points_Last_5,
+           ROUND(AVG(Points) FILTER (WHERE Recent <= 5), 2) AS PPG_Last_5,
+           ROUND(AVG(Points) FILTER (WHERE Recent <= 10), 2) AS PPG_Last_10,
+           ROUND(AVG(Goals_For) FILTER (WHERE Recent <= 5), 2) AS Goals_For_Last_5,
+           ROUND(AVG(Goals_Against) FILTER (WHERE Recent <= 5), 2) AS Goals_Against_Last_5,
+           MAX(CASE WHEN Home = 1 AND Venue_Recent = 1 THEN Venue_Last_5 END) AS Home_Form,
+           MAX(CASE WHEN Home = 0 AND Venue_Recent = 1 THEN Venue_Last_5 END) AS Away_Form
+    FROM ranked
+    JOIN Team t ON ranked.Team_ID = t.Team_ID
+    GROUP BY ranked.Team_ID
+    ORDER BY Points_Last_5 DESC, Points DESC, Goal_Difference DESC, t.Team_Name
+    """
+    return cached_fetchall(conn, query, (league_id, season_id))
+
+
 def show_teams(conn):
     query = "SELECT Team_ID, Team_Name FROM Team"
-    cursor = conn.cursor()
-    cursor.execute(query)
-    teams = cursor.fetchall()
+    teams = cached_fetchall(conn, query)
     print("\nTeams:")
     for team in teams:
         print(f"ID: {team[0]}, Name: {team[1]}")
@@ -39,8 +241,6 @@ def search_players_by_name(conn):
         print("Search term cannot be empty.\n")
         return
 
-    cursor = conn.cursor()
-
     # Detect direct Player_ID queries using prefixes like #1234 or id:1234
     player_id_lookup = None
     if raw_input.lower().startswith("id:"):
@@ -128,8 +328,7 @@ def search_players_by_name(conn):
     FROM Player p
     {where_clause}
     """
-    cursor.execute(count_query, params)
-    total_matches = cursor.fetchone()[0]
+    total_matches = cached_fetchone(conn, count_query, params)[0]
 
     if total_matches == 0:
         print("\nNo players matched your search criteria.\n")
@@ -176,36 +375,10 @@ def search_players_by_name(conn):
     """
 
     query_params = params + [limit]
-    cursor.execute(search_query, query_params)
-    players = cursor.fetchall()
-
-    width_id = 10
-    width_name = 30
-    width_pos = 12
-    width_team = 45
-    width_league = 30
-
-    def truncate(value, width):
-        value = value or ""
-        return value if len(value) <= width else value[:width - 3] + "..."
-
-    print("\nPlayers Found:")
-    header = (f"{'Player ID':<{width_id}}"
-              f"{'Name':<{width_name}}"
-              f"{'Position':<{width_pos}}"
-              f"{'Teams':<{width_team}}"
-              f"{'Leagues':<{width_league}}")
-    print(header)
-    print("-" * (width_id + width_name + width_pos + width_team + width_league))
-
-    for player in players:
-        pid, name, position, teams, leagues = player
-        line = (f"{str(pid):<{width_id}}"
-                f"{truncate(name, width_name):<{width_name}}"
-                f"{truncate(position, width_pos):<{width_pos}}"
-                f"{truncate(teams, width_team):<{width_team}}"
-                f"{truncate(leagues, width_league):<{width_league}}")
-        print(line)
+    players = cached_fetchall(conn, search_query, query_params)
+
+    render(["Player ID", "Name", "Position", "Teams", "Leagues"], players,
+           title="Players Found:", max_widths=[10, 30, 12, 45, 30])
 
     if total_matches > limit:
         print(
@@ -230,50 +403,8 @@ def show_all_matches(conn):
     JOIN Team ta ON m.Away_Team_ID = ta.Team_ID
     JOIN Season s ON m.Season_ID = s.Season_ID
     """
-    cursor = conn.cursor()
-    cursor.execute(query)
-    matches = cursor.fetchall()
-
-    from datetime import datetime
-
-    width_id = 10
-    width_team = 35
-    width_date = 12
-    width_score = 7
-    width_season = 10
-
-    print("\nMatches:")
-    header = (f"{'Match ID':<{width_id}}"
-              f"{'Home Team':<{width_team}}"
-              f"{'Away Team':<{width_team}}"
-              f"{'Date':<{width_date}}"
-              f"{'Score':<{width_score}}"
-              f"{'Season':<{width_season}}")
-    print(header)
-    print("-" * (width_id + width_team*2 + width_date + width_score + width_season))
-
-    for match in matches:
-        match_id = match[0]
-        home_team = match[1]
-        away_team = match[2]
-        date_str = match[3]
-        dt = datetime.strptime(date_str, "%Y-%m-%dT%H:%M:%S%z")
-        date_only = dt.strftime("%Y-%m-%d")
-        home_score = match[4]
-        away_score = match[5]
-        year_start = match[6]
-        year_end = match[7]
-        season_str = f"{year_start}/{year_end}"
-        score_str = f"{home_score}-{away_score}"
-
-        line = (f"{str(match_id):<{width_id}}"
-                f"{home_team:<{width_team}}"
-                f"{away_team:<{width_team}}"
-                f"{date_only:<{width_date}}"
-                f"{score_str:<{width_score}}"
-                f"{season_str:<{width_season}}")
-        print(line)
-    print()
+    matches = cached_fetchall(conn, query)
+    print_formatted_matches(matches)
 
 
 def view_fixtures_for_season(conn):
@@ -284,25 +415,10 @@ def view_fixtures_for_season(conn):
         return
     start_year = int(start_year)
 
-    query = """
-    SELECT 
-        m.Match_ID, 
-        th.Team_Name AS Home_Team_Name, 
-        ta.Team_Name AS Away_Team_Name, 
-        m.Date, 
-        m.Home_Score, 
-        m.Away_Score,
-        s.Year_Start,
-        s.Year_End
-    FROM Match m
-    JOIN Team th ON m.Home_Team_ID = th.Team_ID
-    JOIN Team ta ON m.Away_Team_ID = ta.Team_ID
-    JOIN Season s ON m.Season_ID = s.Season_ID
-    WHERE s.Year_Start = ? AND s.Year_End = ?
-    """
-    cursor = conn.cursor()
-    cursor.execute(query, (start_year, start_year+1))
-    matches = cursor.fetchall()
+    try:
+        matches = season_fixtures(conn, start_year)
+    except NotFound:
+        matches = []
 
     if matches:
         print_formatted_matches(matches)
@@ -322,35 +438,11 @@ def view_fixtures_for_team_season(conn):
 
     start_year = int(start_year)
 
-    # Get Team_ID
-    c = conn.cursor()
-    c.execute("SELECT Team_ID FROM Team WHERE Team_Name LIKE ?",
-              (f"%{team_name}%",))
-    row = c.fetchone()
-    if not row:
-        print(f"No team found with the name '{team_name}'")
-        return
-    team_id = row[0]
-
-    # Get Season_ID
-    c.execute("SELECT Season_ID FROM Season WHERE Year_Start=? AND Year_End=?",
-              (start_year, start_year+1))
-    srow = c.fetchone()
-    if not srow:
-        print(f"No season found for {start_year}/{start_year+1}.")
+    try:
+        matches = team_fixtures(conn, team_name, start_year)
+    except NotFound as e:
+        print(e)
         return
-    season_id = srow[0]
-
-    query = """
-    SELECT Match_ID, th.Team_Name AS Home_Team_Name, ta.Team_Name AS Away_Team_Name, Date, Home_Score, Away_Score, s.Year_Start, s.Year_End
-    FROM Match
-    JOIN Team th ON Match.Home_Team_ID = th.Team_ID
-    JOIN Team ta ON Match.Away_Team_ID = ta.Team_ID
-    JOIN Season s ON Match.Season_ID = s.Season_ID
-    WHERE (Home_Team_ID = ? OR Away_Team_ID = ?) AND s.Season_ID = ?
-    """
-    c.execute(query, (team_id, team_id, season_id))
-    matches = c.fetchall()
 
     if matches:
         print_formatted_matches(matches)
@@ -359,77 +451,60 @@ def view_fixtures_for_team_season(conn):
             f"No fixtures found for '{team_name}' in the {start_year}/{start_year+1} season.\n")
 
 
-def print_formatted_matches(matches):
-    from datetime import datetime
-    width_id = 10
-    width_team = 20
-    width_date = 12
-    width_score = 7
-    width_season = 10
-
-    print("\nMatches:")
-    header = (f"{'Match ID':<{width_id}}"
-              f"{'Home Team':<{width_team}}"
-              f"{'Away Team':<{width_team}}"
-              f"{'Date':<{width_date}}"
-              f"{'Score':<{width_score}}"
-              f"{'Season':<{width_season}}")
-    print(header)
-    print("-" * (width_id + width_team*2 + width_date + width_score + width_season))
-
-    for match in matches:
-        match_id = match[0]
-        home_team = match[1]
-        away_team = match[2]
-        date_str = match[3]
-        dt = datetime.strptime(date_str, "%Y-%m-%dT%H:%M:%S%z")
-        date_only = dt.strftime("%Y-%m-%d")
-        home_score = match[4]
-        away_score = match[5]
-        y_start = match[6]
-        y_end = match[7]
-        season_str = f"{y_start}/{y_end}"
-        score_str = f"{home_score}-{away_score}"
-
-        line = (f"{str(match_id):<{width_id}}"
-                f"{home_team:<{width_team}}"
-                f"{away_team:<{width_team}}"
-                f"{date_only:<{width_date}}"
-                f"{score_str:<{width_score}}"
-                f"{season_str:<{width_season}}")
-        print(line)
-    print()
+def format_date(date_str):
+    """Stored kickoff times (e.g. 2023-08-11T19:00:00+00:00) shown as the date only."""
+    try:
+        return datetime.strptime(date_str, "%Y-%m-%dT%H:%M:%S%z").strftime("%Y-%m-%d")
+    except ValueError:
+        # If timezone info is missing or format is different
+        return date_str
+
+
+def format_score(home_score, away_score):
+    if home_score is None or away_score is None:
+        return "N/A"
+    return f"{home_score}-{away_score}"
+
+
+MATCH_HEADERS = ["Match ID", "Home Team", "Away Team", "Date", "Score", "Season"]
+
+
+def match_rows(matches):
+    """Display rows for (Match_ID, home, away, Date, home score, away score, Year_Start, Year_End) results."""
+    for match_id, home_team, away_team, date_str, home_score, away_score, y_start, y_end in matches:
+        yield (match_id, home_team, away_team, format_date(date_str),
+               format_score(home_score, away_score), f"{y_start}/{y_end}")
+
+
+def print_formatted_matches(matches, title="Matches:"):
+    render(MATCH_HEADERS, match_rows(matches), title=title, max_widths=[10, 35, 35, 12, 7, 10])
 
 
 def view_player_teams_last_5_seasons(conn):
     player_name = input("Enter the player's name: ").strip()
-    c = conn.cursor()
-    c.execute("SELECT Player_ID FROM Player WHERE Player_Name LIKE ?",
-              (f"%{player_name}%",))
-    row = c.fetchone()
+    row = cached_fetchone(conn, "SELECT Player_ID FROM Player WHERE Player_Name LIKE ?",
+                          (f"%{player_name}%",))
     if not row:
         print(f"No player found with name containing '{player_name}'.")
         return
     player_id = row[0]
 
     seasons = [2019, 2020, 2021, 2022, 2023]
-    c.execute(
-        "SELECT Season_ID, Year_Start, Year_End FROM Season WHERE Year_Start IN (2019,2020,2021,2022,2023)")
-    season_rows = c.fetchall()
+    season_rows = cached_fetchall(
+        conn, "SELECT Season_ID, Year_Start, Year_End FROM Season WHERE Year_Start IN (2019,2020,2021,2022,2023)")
     season_ids = {r[1]: r[0] for r in season_rows}
 
     team_set = set()
     for s_year in seasons:
         if s_year in season_ids:
             s_id = season_ids[s_year]
-            c.execute("""
+            results = cached_fetchall(conn, """
                 SELECT DISTINCT T.Team_Name, S.Year_Start, S.Year_End
                 FROM Team_Player_Season TPS
                 JOIN Team T ON TPS.Team_ID = T.Team_ID
                 JOIN Season S ON TPS.Season_ID = S.Season_ID
                 WHERE TPS.Player_ID = ? AND TPS.Season_ID = ?
             """, (player_id, s_id))
-            results = c.fetchall()
             for r in results:
                 team_set.add((r[0], r[1], r[2]))
 
@@ -437,48 +512,35 @@ def view_player_teams_last_5_seasons(conn):
         print("This player didn't play for any teams in the last 5 seasons.")
         return
 
-    width_team = 25
-    width_season = 12
-    print("\nTeams the player played for in the last 5 seasons:")
-    header = f"{'Team Name':<{width_team}}{'Season':<{width_season}}"
-    print(header)
-    print("-" * (width_team + width_season))
-
-    for (team_name, y_start, y_end) in team_set:
-        season_str = f"{y_start}/{y_end}"
-        line = f"{team_name:<{width_team}}{season_str:<{width_season}}"
-        print(line)
-    print()
+    render(["Team Name", "Season"],
+           [(team_name, f"{y_start}/{y_end}") for team_name, y_start, y_end in sorted(team_set, key=lambda t: t[1])],
+           title="Teams the player played for in the last 5 seasons:")
 
 
 def view_player_current_team_2023_24(conn):
     player_name = input("Enter the player's name: ").strip()
 
-    c = conn.cursor()
-    c.execute("SELECT Player_ID FROM Player WHERE Player_Name LIKE ?",
-              (f"%{player_name}%",))
-    row = c.fetchone()
+    row = cached_fetchone(conn, "SELECT Player_ID FROM Player WHERE Player_Name LIKE ?",
+                          (f"%{player_name}%",))
     if not row:
         print(f"No player found with name containing '{player_name}'.")
         return
     player_id = row[0]
 
     
-    c.execute("SELECT Season_ID FROM Season WHERE Year_Start=2023 AND Year_End=2024")
-    srow = c.fetchone()
+    srow = cached_fetchone(conn, "SELECT Season_ID FROM Season WHERE Year_Start=2023 AND Year_End=2024")
     if not srow:
         print("The 2023/2024 season is not in the database.")
         return
     season_id_2324 = srow[0]
 
     # Find player's team for that season
-    c.execute("""
+    row = cached_fetchone(conn, """
         SELECT T.Team_Name
         FROM Team_Player_Season TPS
         JOIN Team T ON TPS.Team_ID = T.Team_ID
         WHERE TPS.Player_ID = ? AND TPS.Season_ID = ?
     """, (player_id, season_id_2324))
-    row = c.fetchone()
 
     if not row:
         print("This player does not have a recorded team for the 2023/2024 season.")
@@ -497,81 +559,19 @@ def view_fixtures_for_league_season(conn):
         return
     start_year = int(start_year)
 
-    c = conn.cursor()
-    # Get League_ID
-    c.execute("SELECT League_ID FROM League WHERE League_Name LIKE ?",
-              (f"%{league_name}%",))
-    lrow = c.fetchone()
-    if not lrow:
-        print(f"No league found with name containing '{league_name}'.")
-        return
-    league_id = lrow[0]
-
-    # Get Season_ID
-    c.execute("SELECT Season_ID FROM Season WHERE Year_Start=? AND Year_End=?",
-              (start_year, start_year+1))
-    srow = c.fetchone()
-    if not srow:
-        print(f"No season found for {start_year}/{start_year+1}.")
+    try:
+        matches = league_fixtures(conn, league_name, start_year)
+    except NotFound as e:
+        print(e)
         return
-    season_id = srow[0]
-
-    # Query matches for the specified league and season
-    query = """
-    SELECT 
-        m.Match_ID, 
-        th.Team_Name AS Home_Team_Name, 
-        ta.Team_Name AS Away_Team_Name, 
-        m.Date, 
-        m.Home_Score, 
-        m.Away_Score,
-        s.Year_Start,
-        s.Year_End
-    FROM Match m
-    JOIN Team th ON m.Home_Team_ID = th.Team_ID
-    JOIN Team ta ON m.Away_Team_ID = ta.Team_ID
-    JOIN Season s ON m.Season_ID = s.Season_ID
-    WHERE m.League_ID = ? AND m.Season_ID = ?
-    ORDER BY m.Date DESC
-    """
-    c.execute(query, (league_id, season_id))
-    matches = c.fetchall()
 
     if not matches:
         print(
             f"No fixtures found for {league_name} in the {start_year}/{start_year+1} season.")
         return
 
-    width_id = 10
-    width_team = 35
-    width_date = 12
-    width_score = 10
-    width_season = 12
-
-    print(
-        f"\nFixtures for {league_name} in the {start_year}/{start_year+1} season:")
-    header = (f"{'Match ID':<{width_id}}"
-              f"{'Home Team':<{width_team}}"
-              f"{'Away Team':<{width_team}}"
-              f"{'Date':<{width_date}}"
-              f"{'Score':<{width_score}}"
-              f"{'Season':<{width_season}}")
-    print(header)
-    print("-" * (width_id + width_team*2 + width_date + width_score + width_season))
-
-    for match in matches:
-        match_id, home_team, away_team, date_str, home_score, away_score, y_start, y_end = match
-        try:
-            dt = datetime.strptime(date_str, "%Y-%m-%dT%H:%M:%S%z")
-            date_only = dt.strftime("%Y-%m-%d")
-        except ValueError:
-            date_only = date_str  # If timezone info is missing
-
-        score_str = f"{home_score}-{away_score}" if home_score is not None and away_score is not None else "N/A"
-        season_str = f"{y_start}/{y_end}"
-
-        print(f"{match_id:<10} {home_team:<25} {away_team:<25} {date_only:<12} {score_str:<10} {season_str:<12}")
-    print()
+    print_formatted_matches(
+        matches, title=f"Fixtures for {league_name} in the {start_year}/{start_year+1} season:")
 
 
 def view_teams_in_league_season(conn):
@@ -584,31 +584,11 @@ def view_teams_in_league_season(conn):
         return
     start_year = int(start_year)
 
-    c = conn.cursor()
-    c.execute("SELECT League_ID FROM League WHERE League_Name LIKE ?",
-              (f"%{league_name}%",))
-    lrow = c.fetchone()
-    if not lrow:
-        print(f"No league found with name containing '{league_name}'.")
-        return
-    league_id = lrow[0]
-
-    c.execute("SELECT Season_ID FROM Season WHERE Year_Start=? AND Year_End=?",
-              (start_year, start_year+1))
-    srow = c.fetchone()
-    if not srow:
-        print(f"No season found for {start_year}/{start_year+1}.")
+    try:
+        teams = league_teams(conn, league_name, start_year)
+    except NotFound as e:
+        print(e)
         return
-    season_id = srow[0]
-
-    c.execute("""
-        SELECT DISTINCT T.Team_Name
-        FROM Team_Player_Season TPS
-        JOIN Team T ON TPS.Team_ID = T.Team_ID
-        JOIN League L ON T.League_ID = L.League_ID
-        WHERE TPS.Season_ID = ? AND L.League_ID = ?
-    """, (season_id, league_id))
-    teams = c.fetchall()
 
     if not teams:
         print(
@@ -632,55 +612,19 @@ def view_team_roster_for_season(conn):
         return
     start_year = int(start_year)
 
-    c = conn.cursor()
-    # Get Team_ID
-    c.execute("SELECT Team_ID FROM Team WHERE Team_Name LIKE ?",
-              (f"%{team_name}%",))
-    trow = c.fetchone()
-    if not trow:
-        print(f"No team found with the name '{team_name}'.")
-        return
-    team_id = trow[0]
-
-    # Get Season_ID
-    c.execute("SELECT Season_ID FROM Season WHERE Year_Start=? AND Year_End=?",
-              (start_year, start_year+1))
-    srow = c.fetchone()
-    if not srow:
-        print(f"No season found for {start_year}/{start_year+1}.")
+    try:
+        players = team_roster(conn, team_name, start_year)
+    except NotFound as e:
+        print(e)
         return
-    season_id = srow[0]
-
-    # Query all players from this team in this season
-    query = """
-    SELECT p.Player_Name, p.Position
-    FROM Team_Player_Season tps
-    JOIN Player p ON tps.Player_ID = p.Player_ID
-    WHERE tps.Team_ID = ? AND tps.Season_ID = ?
-    ORDER BY p.Player_Name
-    """
-    c.execute(query, (team_id, season_id))
-    players = c.fetchall()
 
     if not players:
         print(
             f"No players found for {team_name} in the {start_year}/{start_year+1} season.")
         return
 
-    # Formatting output
-    width_name = 25
-    width_pos = 15
-
-    print(f"\nRoster for {team_name} in {start_year}/{start_year+1}:")
-    header = f"{'Player Name':<{width_name}}{'Position':<{width_pos}}"
-    print(header)
-    print("-" * (width_name + width_pos))
-
-    for player in players:
-        pname, pos = player
-        line = f"{pname:<{width_name}}{pos:<{width_pos}}"
-        print(line)
-    print()
+    render(["Player Name", "Position"], players,
+           title=f"Roster for {team_name} in {start_year}/{start_year+1}:", max_widths=[30, 15])
 
 
 def view_player_matches_in_season(conn):
@@ -692,11 +636,8 @@ def view_player_matches_in_season(conn):
         print("Player name cannot be empty.")
         return
 
-    c = conn.cursor()
     # Search for players matching the input name
-    c.execute("SELECT Player_ID, Player_Name FROM Player WHERE Player_Name LIKE ?",
-              (f"%{player_name}%",))
-    players = c.fetchall()
+    players = find_players(conn, player_name)
 
     if not players:
         print(f"No players found with name containing '{player_name}'.\n")
@@ -731,101 +672,271 @@ def view_player_matches_in_season(conn):
         return
     season_start_year = int(season_start_year_input)
 
-    # Retrieve Season_ID based on start year
-    c.execute("SELECT Season_ID, Year_Start, Year_End FROM Season WHERE Year_Start = ? AND Year_End = ?",
-              (season_start_year, season_start_year + 1))
-    season = c.fetchone()
-    if not season:
-        print(
-            f"No season found for {season_start_year}/{season_start_year + 1}.\n")
+    season_str = f"{season_start_year}/{season_start_year + 1}"
+    try:
+        matches = player_season_matches(conn, player_id, season_start_year)
+    except NotFound as e:
+        print(f"{e}\n")
         return
-    season_id = season[0]
-    season_str = f"{season[1]}/{season[2]}"
-
-    # Query to fetch matches the player participated in during the specified season
-    query = """
-    SELECT 
-        m.Match_ID, 
-        th.Team_Name AS Home_Team_Name, 
-        ta.Team_Name AS Away_Team_Name, 
-        m.Date, 
-        m.Home_Score, 
-        m.Away_Score,
-        pmp.Minutes_Played,
-        pmp.Goals,
-        pmp.Assists
-    FROM Player_Match_Participation pmp
-    JOIN Match m ON pmp.Match_ID = m.Match_ID
-    JOIN Team th ON m.Home_Team_ID = th.Team_ID
-    JOIN Team ta ON m.Away_Team_ID = ta.Team_ID
-    WHERE pmp.Player_ID = ? AND m.Season_ID = ?
-    ORDER BY m.Date DESC
-    """
-    c.execute(query, (player_id, season_id))
-    matches = c.fetchall()
 
     if not matches:
         print(
             f"\n{player_full_name} did not participate in any matches during the {season_str} season.\n")
         return
 
-    # Define column widths for formatting
-    width_id = 10
-    width_home = 25
-    width_away = 25
-    width_date = 12
-    width_score = 7
-    width_minutes = 15
-    width_goals = 7
-    width_assists = 9
-
-    # Print header
-    header = (f"{'Match ID':<{width_id}}"
-              f"{'Home Team':<{width_home}}"
-              f"{'Away Team':<{width_away}}"
-              f"{'Date':<{width_date}}"
-              f"{'Score':<{width_score}}")
-    print(f"\nMatches for {player_full_name} in the {season_str} season:")
-    print(header)
-    print("-" * (width_id + width_home + width_away + width_date +
-          width_score + width_minutes + width_goals + width_assists))
-
-    # Iterate and print each match
-    for match in matches:
-        match_id = match[0]
-        home_team = match[1]
-        away_team = match[2]
-        date_str = match[3]
-        home_score = match[4]
-        away_score = match[5]
-        minutes_played = match[6]
-        goals = match[7]
-        assists = match[8]
-
-        # Format date
+    rows = ((match_id, home_team, away_team, format_date(date_str), format_score(home_score, away_score),
+             minutes_played, goals, assists)
+            for match_id, home_team, away_team, date_str, home_score, away_score,
+            minutes_played, goals, assists in matches)
+    render(["Match ID", "Home Team", "Away Team", "Date", "Score", "Minutes Played", "Goals", "Assists"], rows,
+           title=f"Matches for {player_full_name} in the {season_str} season:",
+           align=["<", "<", "<", "<", "<", ">", ">", ">"], max_widths=[10, 25, 25, 12, 7, 15, 7, 9])
+
+
+def view_team_transfers_for_season(conn):
+    team_name = input("Enter the Team Name: ").strip()
+    start_year = input(
+        "Enter the start year of the season (e.g., 2019 for 2019/2020): ").strip()
+
+    if not start_year.isdigit():
+        print("Invalid input. Season year must be an integer.")
+        return
+    start_year = int(start_year)
+
+    trow = cached_fetchone(conn, "SELECT Team_ID, Team_Name FROM Team WHERE Team_Name LIKE ?",
+                           (f"%{team_name}%",))
+    if not trow:
+        print(f"No team found with the name '{team_name}'.")
+        return
+    team_id, team_name = trow
+
+    srow = cached_fetchone(conn, "SELECT Season_ID FROM Season WHERE Year_Start=? AND Year_End=?",
+                           (start_year, start_year+1))
+    if not srow:
+        print(f"No season found for {start_year}/{start_year+1}.")
+        return
+    season_id = srow[0]
+
+    arrivals, departures = team_transfers(conn, team_id, season_id)
+    if not arrivals and not departures:
+        print(f"No transfers found for {team_name} in the {start_year}/{start_year+1} season. "
+              f"(Run `python3 transfers.py` after fetching new data.)")
+        return
+
+    for title, rows, other in (("Arrivals", arrivals, "From"), ("Departures", departures, "To")):
+        render(["Player Name", other, "Window"],
+               [(pname, other_team, "mid-season" if mid_season else "summer")
+                for pname, other_team, mid_season in rows],
+               title=f"{title} for {team_name} in {start_year}/{start_year+1}:")
+
+
+def view_top_transfer_corridors(conn):
+    start_year = input(
+        "Enter the start year of the season (optional, leave blank for all seasons): ").strip()
+    season_id = None
+    if start_year:
+        if not start_year.isdigit():
+            print("Invalid input. Season year must be an integer.")
+            return
+        start_year = int(start_year)
+        srow = cached_fetchone(conn, "SELECT Season_ID FROM Season WHERE Year_Start=? AND Year_End=?",
+                               (start_year, start_year+1))
+        if not srow:
+            print(f"No season found for {start_year}/{start_year+1}.")
+            return
+        season_id = srow[0]
+
+    corridors = flow_graph(conn, season_id).top_corridors(10)
+    if not corridors:
+        print("No transfers found. (Run `python3 transfers.py` after fetching new data.)")
+        return
+    names = dict(cached_fetchall(conn, "SELECT Team_ID, Team_Name FROM Team"))
+
+    period = f"{start_year}/{start_year+1}" if season_id is not None else "all seasons"
+    render(["From", "To", "Players"],
+           [(names.get(from_id, from_id), names.get(to_id, to_id), moved) for from_id, to_id, moved in corridors],
+           title=f"Top transfer corridors ({period}):", align=["<", "<", ">"])
+
+
+def view_similar_players(conn):
+    if similarity.np is None:
+        print("Player similarity needs numpy (pip install numpy).\n")
+        return
+
+    player_name = input("Enter the player's name or partial name: ").strip()
+    if not player_name:
+        print("Player name cannot be empty.")
+        return
+
+    players = cached_fetchall(conn, "SELECT Player_ID, Player_Name FROM Player WHERE Player_Name LIKE ?",
+                              (f"%{player_name}%",))
+    if not players:
+        print(f"No players found with name containing '{player_name}'.\n")
+        return
+
+    if len(players) > 1:
+        print("\nMultiple players found:")
+        for idx, player in enumerate(players, start=1):
+            print(f"{idx}. {player[1]} (Player ID: {player[0]})")
         try:
-            dt = datetime.strptime(date_str, "%Y-%m-%dT%H:%M:%S%z")
-            date_formatted = dt.strftime("%Y-%m-%d")
+            selection = int(
+                input("Select the player by entering the corresponding number: ").strip())
+            if selection < 1 or selection > len(players):
+                print("Invalid selection. Returning to main menu.\n")
+                return
+            selected_player = players[selection - 1]
         except ValueError:
-            # If timezone info is missing or format is different
-            date_formatted = date_str
-
-        score_str = f"{home_score}-{away_score}" if home_score is not None and away_score is not None else "N/A"
-
-        # Print match details
-        line = (f"{str(match_id):<{width_id}}"
-                f"{home_team:<{width_home}}"
-                f"{away_team:<{width_away}}"
-                f"{date_formatted:<{width_date}}"
-                f"{score_str:<{width_score}}")
-        print(line)
-    print()
+            print("Invalid input. Please enter a number. Returning to main menu.\n")
+            return
+    else:
+        selected_player = players[0]
 
+    if not os.path.exists(similarity.SIMILARITY_FILE):
+        print("Building the player feature matrix (one-off; rerun `python3 similarity.py build` after new data)...")
+        similarity.build(conn)
+    matches = similarity.get_index().most_similar(selected_player[0], k=10)
+    if not matches:
+        print(f"{selected_player[1]} is not in the feature matrix yet; rebuild it with `python3 similarity.py build`.\n")
+        return
 
-def main():
-    conn = connect_to_db()
+    placeholders = ",".join("?" * len(matches))
+    info = {row[0]: row[1:] for row in cached_fetchall(conn, f"""
+        SELECT Player_ID, Player_Name, Position FROM Player WHERE Player_ID IN ({placeholders})
+    """, [pid for pid, _ in matches])}
+
+    rows = []
+    for pid, score in matches:
+        pname, pos = info.get(pid, (str(pid), None))
+        rows.append((pname, pos or "Unknown", f"{score:.3f}"))
+    render(["Player Name", "Position", "Similarity"], rows,
+           title=f"Players most similar to {selected_player[1]}:", align=["<", "<", ">"])
+
+
+def select_player(conn, prompt="Enter the player's name or partial name: "):
+    """Ask for a name and return (Player_ID, Player_Name), or None if nothing was chosen."""
+    player_name = input(prompt).strip()
+    if not player_name:
+        print("Player name cannot be empty.")
+        return None
+
+    players = find_players(conn, player_name)
+    if not players:
+        print(f"No players found with name containing '{player_name}'.\n")
+        return None
+    if len(players) == 1:
+        return players[0]
+
+    print("\nMultiple players found:")
+    for idx, player in enumerate(players, start=1):
+        print(f"{idx}. {player[1]} (Player ID: {player[0]})")
+    try:
+        selection = int(input("Select the player by entering the corresponding number: ").strip())
+    except ValueError:
+        print("Invalid input. Please enter a number. Returning to main menu.\n")
+        return None
+    if selection < 1 or selection > len(players):
+        print("Invalid selection. Returning to main menu.\n")
+        return None
+    return players[selection - 1]
+
+
+def get_teammate_graph(conn):
+    if not os.path.exists(teammates.TEAMMATES_FILE):
+        print("Building the teammate graph (one-off; rerun `python3 teammates.py build` after new data)...")
+        teammates.build(conn)
+    return teammates.get_graph()
+
+
+def player_names(conn, player_ids):
+    placeholders = ",".join("?" * len(player_ids))
+    return dict(cached_fetchall(conn, f"SELECT Player_ID, Player_Name FROM Player WHERE Player_ID IN ({placeholders})",
+                                list(player_ids)))
+
+
+def view_teammates(conn):
+    if teammates.np is None:
+        print("The teammate graph needs numpy (pip install numpy).\n")
+        return
+
+    selected_player = select_player(conn)
+    if selected_player is None:
+        return
+
+    mates = get_teammate_graph(conn).teammates(selected_player[0], k=15)
+    if not mates:
+        print(f"{selected_player[1]} has no teammates in the graph yet; rebuild it with `python3 teammates.py build`.\n")
+        return
+
+    names = player_names(conn, [pid for pid, _, _ in mates])
+    render(["Teammate", "Matches", "Minutes Together"],
+           [(names.get(pid, str(pid)), matches, minutes) for pid, matches, minutes in mates],
+           title=f"Most frequent teammates of {selected_player[1]}:", align=["<", ">", ">"])
+
+
+def view_teammate_link(conn):
+    if teammates.np is None:
+        print("The teammate graph needs numpy (pip install numpy).\n")
+        return
+
+    first = select_player(conn, "Enter the first player's name or partial name: ")
+    if first is None:
+        return
+    second = select_player(conn, "Enter the second player's name or partial name: ")
+    if second is None:
+        return
+
+    graph = get_teammate_graph(conn)
+    path = graph.shortest_link(first[0], second[0])
+    if path is None:
+        print(f"No chain of teammates links {first[1]} and {second[1]}.\n")
+        return
+    if len(path) == 1:
+        print(f"{first[1]} and {second[1]} are the same player.\n")
+        return
+
+    names = player_names(conn, path)
+    rows = []
+    for a, b in zip(path, path[1:]):
+        matches, minutes = graph.shared(a, b)
+        rows.append((names.get(a, str(a)), names.get(b, str(b)), matches, minutes))
+    render(["Player", "Played With", "Matches", "Minutes Together"], rows,
+           title=f"{first[1]} to {second[1]} in {len(path) - 1} link(s):", align=["<", "<", ">", ">"])
+
+
+FORM_HEADERS = ["Team", "P", "Pts", "GD", "Form", "Pts L5", "PPG L5", "PPG L10", "GF L5", "GA L5",
+                "Home Form", "Away Form"]
+
+
+def print_league_form(rows, league_name, start_year):
+    if not rows:
+        print(f"No results found for {league_name} in the {start_year}/{start_year+1} season.\n")
+        return
+    render(FORM_HEADERS, [[value if value is not None else "-" for value in row] for row in rows],
+           title=f"Form guide for {league_name}, {start_year}/{start_year+1} (latest result first):",
+           align=["<"] + [">"] * 3 + ["<"] + [">"] * 5 + ["<", "<"])
+
+
+def view_league_form(conn):
+    league_name = input("Enter the league name: ").strip()
+    start_year = input(
+        "Enter the start year of the season (e.g., 2019 for 2019/2020): ").strip()
+
+    if not start_year.isdigit():
+        print("Invalid year.")
+        return
+    start_year = int(start_year)
+
+    try:
+        rows = league_form(conn, league_name, start_year)
+    except NotFound as e:
+        print(e)
+        return
+    print_league_form(rows, league_name, start_year)
+
+
+def run_menu(conn):
     while True:
-        print("Soccer Management CLI (Enter Choices 1-12)")
+        print("Soccer Management CLI (Enter Choices 1-18)")
         print("1. View all teams")
         print("2. View all teams in a league for a particular season")
         print("3. View a team's roster for a particular season")
@@ -837,7 +948,13 @@ def main():
         print("9. View all teams a player played for in the last 5 seasons")
         print("10. View a player's current team in the 2023/2024 season")
         print("11. View matches a player participated in during a specific season")
-        print("12. Exit (type 'e' or 'q' to exit)")
+        print("12. View transfers in and out of a team in a particular season")
+        print("13. View the top transfer corridors between clubs")
+        print("14. Find players with a similar statistical profile")
+        print("15. View a player's most frequent teammates")
+        print("16. Find the shortest chain of teammates between two players")
+        print("17. View the form guide for a league in a particular season")
+        print("18. Exit (type 'e' or 'q' to exit)")
 
         choice = input("Enter your choice: ").strip()
 
@@ -864,7 +981,19 @@ def main():
         elif choice == "11":
             # view_player_current_team_2023_24(conn)
             view_player_matches_in_season(conn)
-        elif choice == "12" or choice.lower() in ["e", "q"]:
+        elif choice == "12":
+            view_team_transfers_for_season(conn)
+        elif choice == "13":
+            view_top_transfer_corridors(conn)
+        elif choice == "14":
+            view_similar_players(conn)
+        elif choice == "15":
+            view_teammates(conn)
+        elif choice == "16":
+            view_teammate_link(conn)
+        elif choice == "17":
+            view_league_form(conn)
+        elif choice == "18" or choice.lower() in ["e", "q"]:
             print("Exiting the CLI. Goodbye!")
             conn.close()
             break
@@ -872,5 +1001,27 @@ def main():
             print("Invalid choice. Please try again.")
 
 
+def main():
+    parser = argparse.ArgumentParser(description="Soccer Management CLI. Without a command, opens the menu.")
+    subparsers = parser.add_subparsers(dest="command")
+    form = subparsers.add_parser("form", help="Print the form guide for a league-season")
+    form.add_argument("league", help="League name or part of it")
+    form.add_argument("season", type=int, help="Start year of the season (e.g., 2023 for 2023/2024)")
+    args = parser.parse_args()
+
+    conn = connect_to_db()
+    if args.command is None:
+        run_menu(conn)
+        return
+    try:
+        rows = league_form(conn, args.league, args.season)
+    except NotFound as e:
+        print(e)
+        sys.exit(1)
+    finally:
+        conn.close()
+    print_league_form(rows, args.league, args.season)
+
+
 if __name__ == "__main__":
     main()
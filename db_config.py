@@ -0,0 +1,60 @@
+"""
+One place that opens SQLite connections, so the ingestion scripts and the CLI
+agree on how to share a database file.
+
+The database runs in WAL mode: readers see the last committed state while a
+writer appends to the -wal file, so the CLI keeps working during a long ingest.
+Every connection waits up to SQLITE_BUSY_TIMEOUT_MS for a lock instead of
+failing with "database is locked", and writers commit at least every
+WRITE_TXN_MAX_ROWS rows (see db_writer.write_rows) so no lock is held for long.
+"""
+import os
+import sqlite3
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "30000"))
+# Pages in the WAL before a commit runs a passive checkpoint back into the main file
+SQLITE_WAL_AUTOCHECKPOINT = int(os.getenv("SQLITE_WAL_AUTOCHECKPOINT", "1000"))
+# Size the -wal file is truncated back to after a checkpoint
+SQLITE_JOURNAL_SIZE_LIMIT = int(os.getenv("SQLITE_JOURNAL_SIZE_LIMIT", str(64 * 1024 * 1024)))
+WRITE_TXN_MAX_ROWS = int(os.getenv("WRITE_TXN_MAX_ROWS", "5000"))
+
+
+def configure(conn, read_only=False):
+    """Apply the shared settings to an open connection."""
+    conn.execute(f"PRAGMA busy_timeout = {SQLITE_BUSY_TIMEOUT_MS}")
+    if read_only:
+        return conn
+    # journal_mode is stored in the file, so this is a no-op after the first connection
+    conn.execute("PRAGMA journal_mode = WAL")
+    # In WAL mode NORMAL only syncs at checkpoints and stays corruption-safe
+    conn.execute("PRAGMA synchronous = NORMAL")
+    conn.execute(f"PRAGMA wal_autocheckpoint = {SQLITE_WAL_AUTOCHECKPOINT}")
+    conn.execute(f"PRAGMA journal_size_limit = {SQLITE_JOURNAL_SIZE_LIMIT}")
+    return conn
+
+
+def connect(db_file, read_only=False, **kwargs):
+    """
+    Open `db_file` with WAL, busy timeout and checkpoint limits applied.
+    read_only opens it with mode=ro; the file must already exist.
+    """
+    timeout = SQLITE_BUSY_TIMEOUT_MS / 1000
+    if read_only:
+        conn = sqlite3.connect(f"file:{db_file}?mode=ro", uri=True, timeout=timeout, **kwargs)
+    else:
+        conn = sqlite3.connect(db_file, timeout=timeout, **kwargs)
+    return configure(conn, read_only)
+
+
+def checkpoint(conn, mode="TRUNCATE"):
+    """
+    Copy the WAL back into the database file. Automatic checkpoints are passive
+    and cannot finish while readers hold old snapshots, so the ingestion scripts
+    run a TRUNCATE checkpoint when they finish to leave a small -wal file behind.
+    Returns (busy, wal pages, pages checkpointed).
+    """
+    return conn.execute(f"PRAGMA wal_checkpoint({mode})").fetchone()
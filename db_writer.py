@@ -0,0 +1,273 @@
+import logging
+import queue
+import threading
+import time
+
+import metrics
+from db_config import WRITE_TXN_MAX_ROWS, connect
+from partitions import connect_ingest
+
+# Column order matches the row tuples produced by normalize.py.
+# Tables are written in this order so seasons exist before anything references them.
+# Every statement is a single upsert on the table's natural key, so re-fetched
+# data (scores, positions, names) overwrites what was stored before. Lineup-only
+# participation rows carry NULL statistics and never overwrite real ones.
+INSERT_SQL = {
+    "League": """
+        INSERT INTO League (League_ID, League_Name) VALUES (?, ?)
+        ON CONFLICT (League_ID) DO UPDATE SET League_Name = excluded.League_Name
+        WHERE League_Name IS NOT excluded.League_Name
+    """,
+    "Season": """
+        INSERT INTO Season (Year_Start, Year_End) VALUES (?, ?)
+        ON CONFLICT (Year_Start, Year_End) DO NOTHING
+    """,
+    # ?4 is 1 when the row comes from a domestic league. A cup's team list
+    # only adds clubs not seen before and never moves a club out of its league.
+    "Team": """
+        INSERT INTO Team (Team_ID, Team_Name, League_ID) VALUES (?1, ?2, ?3)
+        ON CONFLICT (Team_ID) DO UPDATE SET Team_Name = excluded.Team_Name,
+                                            League_ID = CASE WHEN ?4 THEN excluded.League_ID ELSE League_ID END
+        WHERE Team_Name IS NOT excluded.Team_Name OR ?4 AND League_ID IS NOT excluded.League_ID
+    """,
+    "Player": """
+        INSERT INTO Player (Player_ID, Player_Name, Position) VALUES (?, ?, ?)
+        ON CONFLICT (Player_ID) DO UPDATE SET Player_Name = excluded.Player_Name,
+                                              Position = excluded.Position
+        WHERE Player_Name IS NOT excluded.Player_Name OR Position IS NOT excluded.Position
+    """,
+    "Match": """
+        INSERT INTO Match (Match_ID, Home_Team_ID, Away_Team_ID, Date, Home_Score, Away_Score, Season_ID, League_ID,
+                           Status, Player_Stats)
+        VALUES (?1, ?2, ?3, ?4, ?5, ?6,
+                (SELECT Season_ID FROM Season WHERE Year_Start = ?7 AND Year_End = ?7 + 1), ?8, ?9, ?10)
+        ON CONFLICT (Match_ID) DO UPDATE SET Home_Team_ID = excluded.Home_Team_ID,
+                                             Away_Team_ID = excluded.Away_Team_ID,
+                                             Date = excluded.Date,
+                                             Home_Score = excluded.Home_Score,
+                                             Away_Score = excluded.Away_Score,
+                                             Status = COALESCE(excluded.Status, Status),
+                                             Player_Stats = COALESCE(excluded.Player_Stats, Player_Stats)
+        WHERE Date IS NOT excluded.Date
+           OR Home_Score IS NOT excluded.Home_Score OR Away_Score IS NOT excluded.Away_Score
+           OR Home_Team_ID IS NOT excluded.Home_Team_ID OR Away_Team_ID IS NOT excluded.Away_Team_ID
+           OR excluded.Status IS NOT NULL AND Status IS NOT excluded.Status
+           OR excluded.Player_Stats IS NOT NULL AND Player_Stats IS NOT excluded.Player_Stats
+    """,
+    "Team_Player_Season": """
+        INSERT INTO Team_Player_Season (Team_ID, Player_ID, Season_ID, League_ID)
+        VALUES (?1, ?2, (SELECT Season_ID FROM Season WHERE Year_Start = ?3 AND Year_End = ?3 + 1), ?4)
+        ON CONFLICT (Team_ID, Player_ID, Season_ID) DO UPDATE
+        SET League_ID = COALESCE(excluded.League_ID, League_ID)
+        WHERE excluded.League_ID IS NOT NULL AND League_ID IS NOT excluded.League_ID
+    """,
+    "Player_Match_Participation": """
+        INSERT INTO Player_Match_Participation (Match_ID, Player_ID, Minutes_Played, Goals, Assists, Started, Team_ID,
+                                                Season_ID)
+        VALUES (?1, ?2, ?3, ?4, ?5, ?6, ?7, (SELECT Season_ID FROM Match WHERE Match_ID = ?1))
+        ON CONFLICT (Match_ID, Player_ID) DO UPDATE
+        SET Minutes_Played = COALESCE(excluded.Minutes_Played, Minutes_Played),
+            Goals = COALESCE(excluded.Goals, Goals),
+            Assists = COALESCE(excluded.Assists, Assists),
+            Started = COALESCE(excluded.Started, Started),
+            Team_ID = COALESCE(excluded.Team_ID, Team_ID),
+            Season_ID = COALESCE(excluded.Season_ID, Season_ID)
+        WHERE excluded.Minutes_Played IS NOT NULL AND (Minutes_Played IS NOT excluded.Minutes_Played
+                                                       OR Goals IS NOT excluded.Goals
+                                                       OR Assists IS NOT excluded.Assists)
+           OR excluded.Started IS NOT NULL AND Started IS NOT excluded.Started
+           OR excluded.Team_ID IS NOT NULL AND Team_ID IS NOT excluded.Team_ID
+           OR excluded.Season_ID IS NOT NULL AND Season_ID IS NULL
+    """,
+    "Raw_Payload": """
+        INSERT INTO Raw_Payload (Endpoint, Params, Fetched_At, Encoding, Body) VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT (Endpoint, Params, Fetched_At) DO NOTHING
+    """,
+}
+
+
+def _commit(conn):
+    started = time.perf_counter()
+    conn.commit()
+    metrics.observe("db_commit_duration_seconds", time.perf_counter() - started)
+
+
+def write_rows(conn, rows, max_rows=WRITE_TXN_MAX_ROWS):
+    """
+    Write one batch of normalized rows, committing after every `max_rows` rows
+    so a large batch never holds the write lock for long. The batch is
+    therefore not atomic: if a write fails, the chunks committed before it stay
+    in the database and only the open chunk is rolled back. Tables are written
+    in dependency order, so each commit leaves the database consistent, and
+    since every statement is an upsert the whole batch can be written again.
+    Returns the number of rows handed to SQLite per table.
+    """
+    written = {}
+    in_txn = 0
+    try:
+        for table, sql in INSERT_SQL.items():
+            table_rows = rows.get(table)
+            if not table_rows:
+                continue
+            start = 0
+            while start < len(table_rows):
+                chunk = table_rows[start:start + max_rows - in_txn]
+                conn.executemany(sql, chunk)
+                start += len(chunk)
+                in_txn += len(chunk)
+                if in_txn >= max_rows:
+                    _commit(conn)
+                    in_txn = 0
+            written[table] = len(table_rows)
+        _commit(conn)
+    except BaseException:
+        conn.rollback()
+        raise
+    for table, count in written.items():
+        metrics.inc("db_rows_written_total", count, table=table)
+    return written
+
+
+class BatchWriter:
+    """
+    Accumulates normalized rows and flushes them in large batches. Most of the
+    cost of inserting a row into SQLite is per-statement and per-commit
+    overhead, so fewer, larger executemany calls are much faster.
+    """
+
+    def __init__(self, conn, batch_rows=20000):
+        self.conn = conn
+        self.batch_rows = batch_rows
+        self.pending = {}
+        self.pending_count = 0
+        self.totals = {}
+        self.flush_seconds = 0.0
+
+    def add(self, rows):
+        for table, table_rows in rows.items():
+            if table_rows:
+                self.pending.setdefault(table, []).extend(table_rows)
+                self.pending_count += len(table_rows)
+        if self.pending_count >= self.batch_rows:
+            self.flush()
+
+    def flush(self):
+        if not self.pending_count:
+            return
+        started = time.perf_counter()
+        written = write_rows(self.conn, self.pending)
+        self.flush_seconds += time.perf_counter() - started
+        for table, count in written.items():
+            self.totals[table] = self.totals.get(table, 0) + count
+        logging.info(f"Flushed {self.pending_count} rows in {time.perf_counter() - started:.2f}s")
+        self.pending = {}
+        self.pending_count = 0
+
+
+# Sentinel telling the writer thread to flush and exit
+_STOP = object()
+
+# How often a producer blocked on a full queue checks that the writer is still running
+SUBMIT_POLL_SECONDS = 1.0
+
+
+class WriterThread(threading.Thread):
+    """
+    The only thread allowed to write to the database.
+
+    Producers hand it normalized rows through a bounded queue; `submit`
+    blocks while the queue is full, so fast fetchers are held back instead of
+    piling rows up in memory. Queued batches are merged into one transaction
+    per drain to keep commits (and fsyncs) to a minimum. With `partition_dir`
+    it writes core.db and the current season's partition instead of `db_file`.
+    """
+
+    def __init__(self, db_file, queue_size=64, batch_rows=20000, partition_dir=None):
+        super().__init__(name="db-writer", daemon=True)
+        self.db_file = db_file
+        self.partition_dir = partition_dir
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.batch_rows = batch_rows
+        self.error = None
+
+        self.rows_written = {}
+        self.transactions = 0
+        self.busy_seconds = 0.0
+        self.blocked_seconds = 0.0
+        self.max_depth = 0
+        self._stats_lock = threading.Lock()
+
+    def submit(self, rows):
+        if self.error is not None:
+            raise RuntimeError(f"Database writer stopped: {self.error}")
+        started = time.perf_counter()
+        # Wait in short slices so a writer that died (or never started) raises
+        # here instead of leaving the producer blocked on a full queue forever
+        while True:
+            try:
+                self.queue.put(rows, timeout=SUBMIT_POLL_SECONDS)
+                break
+            except queue.Full:
+                if self.error is not None or not self.is_alive():
+                    raise RuntimeError(f"Database writer stopped: {self.error or 'thread exited'}")
+        waited = time.perf_counter() - started
+        metrics.set_gauge("db_writer_queue_depth", self.queue.qsize())
+        with self._stats_lock:
+            self.blocked_seconds += waited
+            self.max_depth = max(self.max_depth, self.queue.qsize())
+
+    def close(self):
+        """Flush everything queued so far and stop the thread."""
+        if self.is_alive():
+            self.queue.put(_STOP)
+            self.join()
+        if self.error is not None:
+            raise RuntimeError(f"Database writer stopped: {self.error}")
+
+    def _drain(self, first):
+        batch = {}
+        count = 0
+        stop = False
+        item = first
+        while True:
+            if item is _STOP:
+                stop = True
+                break
+            for table, table_rows in item.items():
+                if table_rows:
+                    batch.setdefault(table, []).extend(table_rows)
+                    count += len(table_rows)
+            if count >= self.batch_rows:
+                break
+            try:
+                item = self.queue.get_nowait()
+            except queue.Empty:
+                break
+        return batch, stop
+
+    def run(self):
+        conn = None
+        try:
+            conn = connect_ingest(self.partition_dir) if self.partition_dir else connect(self.db_file)
+            while True:
+                batch, stop = self._drain(self.queue.get())
+                metrics.set_gauge("db_writer_queue_depth", self.queue.qsize())
+                if batch:
+                    started = time.perf_counter()
+                    written = write_rows(conn, batch)
+                    self.busy_seconds += time.perf_counter() - started
+                    self.transactions += 1
+                    for table, count in written.items():
+                        self.rows_written[table] = self.rows_written.get(table, 0) + count
+                if stop:
+                    break
+        except Exception as e:
+            self.error = e
+            logging.error(f"Database writer failed: {e}")
+            # Keep draining so blocked producers can finish and see the error
+            while True:
+                if self.queue.get() is _STOP:
+                    break
+        finally:
+            if conn is not None:
+                conn.close()
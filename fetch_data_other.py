@@ -1,200 +1,228 @@
+import argparse
+import math
 import sqlite3
-import requests
-import time
 import sys
 import os
+import requests
 from dotenv import load_dotenv
 
+from api_client import get_client, log_stats_summary
+from api_scheduler import (PRIORITY_FIXTURES, PRIORITY_PLAYERS, PRIORITY_TEAMS,
+                           QuotaExhausted)
+from catalog import CATALOG_MAX_PRIORITY, load_catalog
+from db_config import checkpoint, connect
+from db_writer import INSERT_SQL, WriterThread
+from metrics import start_reporter, stop_reporter
+from migrations import apply_migrations
+from normalize import empty_rows, normalize_players
+from partitions import connect_ingest, connect_partitioned
+from payload_archive import enable_archiving
+from transfers import build_transfers
+from validate_db import validate_after_ingest
+
 load_dotenv()
 
 DB_FILE = os.getenv("DB_FILE", "soccer_management.db")
-RAPIDAPI_KEY = os.getenv("RAPIDAPI_KEY")
-RAPIDAPI_HOST = os.getenv("RAPIDAPI_HOST", "api-football-v1.p.rapidapi.com")
-
-headers = {
-    "X-RapidAPI-Key": RAPIDAPI_KEY,
-    "X-RapidAPI-Host": RAPIDAPI_HOST
-}
+# With PARTITION_DIR set, ingestion writes core.db and the current season's partition there
+PARTITION_DIR = os.getenv("PARTITION_DIR")
 
-# League IDs for top 5 European Leagues
-LEAGUES = {
-    "Premier League": 39,
-    "La Liga": 140,
-    "Serie A": 135,
-    "Bundesliga": 78,
-    "Ligue 1": 61
-}
+# Competitions and seasons come from competitions.json. Only the ones up to
+# CATALOG_MAX_PRIORITY (by default the top 5 European leagues) are fetched here;
+# planner.py spreads the full catalog across runs.
+COMPETITIONS = load_catalog(max_priority=CATALOG_MAX_PRIORITY)
+LEAGUES = {c["name"]: c["id"] for c in COMPETITIONS}
+SEASONS = sorted({year for c in COMPETITIONS for year in c["seasons"]})
 
-SEASONS = [2019, 2020, 2021, 2022, 2023]
+PLAYER_PAGES_QUEUED = 2
+# API-Football returns /players 20 entries per page
+PLAYERS_PER_PAGE = 20
 
 
 def connect_db():
     try:
-        conn = sqlite3.connect(DB_FILE)
+        if PARTITION_DIR:
+            return connect_ingest(PARTITION_DIR)
+        conn = connect(DB_FILE)
         return conn
-    except sqlite3.Error as e:
+    except (sqlite3.Error, RuntimeError) as e:
         print(f"Error connecting to database: {e}")
         sys.exit(1)
 
 
-def insert_league(league_id, league_name):
-    conn = connect_db()
-    c = conn.cursor()
-    c.execute("SELECT League_ID FROM League WHERE League_ID=?", (league_id,))
-    row = c.fetchone()
-    if not row:
-        c.execute("INSERT INTO League (League_ID, League_Name) VALUES (?, ?)",
-                  (league_id, league_name))
-    conn.commit()
-    conn.close()
+def connect_all_seasons():
+    """Connection that sees every season, for steps such as the transfers rebuild."""
+    if PARTITION_DIR:
+        return connect_partitioned(PARTITION_DIR)
+    return connect_db()
 
 
-def insert_season(year_start, year_end):
-    conn = connect_db()
-    c = conn.cursor()
-    c.execute("SELECT Season_ID FROM Season WHERE Year_Start=? AND Year_End=?",
-              (year_start, year_end))
-    row = c.fetchone()
-    if row:
-        season_id = row[0]
-    else:
-        c.execute("INSERT INTO Season (Year_Start, Year_End) VALUES (?, ?)",
-                  (year_start, year_end))
-        season_id = c.lastrowid
-    conn.commit()
-    conn.close()
-    return season_id
+def fetch_json(endpoint, params, priority):
+    """
+    (status, JSON body) for one GET through the shared client; the body is None
+    unless the status is 200. A transport error that outlasts the scheduler's
+    retries (a dropped connection, a truncated body) comes back as its
+    exception name with no body, so the caller skips that request and carries on.
+    """
+    try:
+        r = get_client().get(endpoint, params, priority=priority)
+        if r.status_code != 200:
+            return r.status_code, None
+        return r.status_code, r.json()
+    except requests.exceptions.RequestException as e:
+        print(f"GET /{endpoint} {params} failed: {e}")
+        return type(e).__name__, None
 
 
-def insert_team(team_id, team_name, coach, league_id):
+def insert_league(league_id, league_name):
     conn = connect_db()
     c = conn.cursor()
-    c.execute("SELECT Team_ID FROM Team WHERE Team_ID=?", (team_id,))
-    row = c.fetchone()
-    if not row:
-        c.execute("INSERT INTO Team (Team_ID, Team_Name, Coach, League_ID) VALUES (?, ?, ?, ?)",
-                  (team_id, team_name, coach, league_id))
+    c.execute("""INSERT INTO League (League_ID, League_Name) VALUES (?, ?)
+                 ON CONFLICT (League_ID) DO UPDATE SET League_Name = excluded.League_Name
+                 WHERE League_Name IS NOT excluded.League_Name""",
+              (league_id, league_name))
     conn.commit()
     conn.close()
 
 
-def insert_player(player_id, player_name, position):
+def insert_season(year_start, year_end):
     conn = connect_db()
     c = conn.cursor()
-    c.execute("SELECT Player_ID FROM Player WHERE Player_ID=?", (player_id,))
-    row = c.fetchone()
-    if not row:
-        c.execute("INSERT INTO Player (Player_ID, Player_Name, Position) VALUES (?, ?, ?)",
-                  (player_id, player_name, position))
+    # The no-op update lets RETURNING hand back the existing Season_ID on conflict
+    c.execute("""INSERT INTO Season (Year_Start, Year_End) VALUES (?, ?)
+                 ON CONFLICT (Year_Start, Year_End) DO UPDATE SET Year_End = excluded.Year_End
+                 RETURNING Season_ID""",
+              (year_start, year_end))
+    season_id = c.fetchone()[0]
     conn.commit()
     conn.close()
+    return season_id
 
 
-def link_player_to_team_season(team_id, player_id, season_id):
+def insert_team(team_id, team_name, league_id, domestic=True):
     conn = connect_db()
     c = conn.cursor()
-    c.execute("SELECT Team_Player_Season_ID FROM Team_Player_Season WHERE Team_ID=? AND Player_ID=? AND Season_ID=?",
-              (team_id, player_id, season_id))
-    row = c.fetchone()
-    if not row:
-        c.execute("INSERT INTO Team_Player_Season (Team_ID, Player_ID, Season_ID) VALUES (?, ?, ?)",
-                  (team_id, player_id, season_id))
+    c.execute(INSERT_SQL["Team"], (team_id, team_name, league_id, 1 if domestic else 0))
     conn.commit()
     conn.close()
 
 
-def insert_match(match_id, home_team_id, away_team_id, date_str, home_score, away_score, season_id, league_id):
+def insert_match(match_id, home_team_id, away_team_id, date_str, home_score, away_score, season_id, league_id,
+                 status=None):
     conn = connect_db()
     c = conn.cursor()
-    c.execute("SELECT Match_ID FROM Match WHERE Match_ID=?", (match_id,))
-    row = c.fetchone()
-    if not row:
-        c.execute("""INSERT INTO Match (Match_ID, Home_Team_ID, Away_Team_ID, Date, Home_Score, Away_Score, Season_ID, League_ID) 
-                     VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
-                  (match_id, home_team_id, away_team_id, date_str, home_score, away_score, season_id, league_id))
+    c.execute("""INSERT INTO Match (Match_ID, Home_Team_ID, Away_Team_ID, Date, Home_Score, Away_Score, Season_ID, League_ID, Status)
+                 VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                 ON CONFLICT (Match_ID) DO UPDATE SET Home_Team_ID = excluded.Home_Team_ID,
+                                                      Away_Team_ID = excluded.Away_Team_ID,
+                                                      Date = excluded.Date,
+                                                      Home_Score = excluded.Home_Score,
+                                                      Away_Score = excluded.Away_Score,
+                                                      Status = COALESCE(excluded.Status, Status)
+                 WHERE Date IS NOT excluded.Date
+                    OR Home_Score IS NOT excluded.Home_Score OR Away_Score IS NOT excluded.Away_Score
+                    OR Home_Team_ID IS NOT excluded.Home_Team_ID OR Away_Team_ID IS NOT excluded.Away_Team_ID
+                    OR excluded.Status IS NOT NULL AND Status IS NOT excluded.Status""",
+              (match_id, home_team_id, away_team_id, date_str, home_score, away_score, season_id, league_id, status))
     conn.commit()
     conn.close()
 
 
-def get_season_id_for_year(year_start):
-    conn = connect_db()
-    c = conn.cursor()
-    c.execute("SELECT Season_ID FROM Season WHERE Year_Start=? AND Year_End=?",
-              (year_start, year_start+1))
-    row = c.fetchone()
-    conn.close()
-    if row:
-        return row[0]
-    return None
-
-
-def fetch_all_players_for_team_season(team_id, season_year):
-    url = "https://api-football-v1.p.rapidapi.com/v3/players"
+def iter_player_pages(scope, season_year):
+    """
+    Yield (params, players) for each page of /players for a season, where
+    `scope` is {"team": id} or {"league": id}. Pages are fetched lazily, so
+    only the page being processed is held in memory.
+    """
+    (scope_name, scope_id), = scope.items()
     page = 1
-    all_players = []
-
+    fetched = 0
     while True:
-        params = {"team": team_id, "season": season_year, "page": page}
-        r = requests.get(url, headers=headers, params=params)
+        params = {scope_name: scope_id, "season": season_year, "page": page}
+        status, data = fetch_json("players", params, PRIORITY_PLAYERS)
 
-        if r.status_code != 200:
+        if data is None:
             print(
-                f"Failed to fetch players for team {team_id}, season {season_year}, page {page}. Status code: {r.status_code}")
-            break
+                f"Failed to fetch players for {scope_name} {scope_id}, season {season_year}, page {page}. Status code: {status}")
+            return
 
-        data = r.json()
         players = data.get("response", [])
         if not players:
             # No more players on this page
-            break
-
-        all_players.extend(players)
+            return
 
         # Check pagination
         paging = data.get("paging", {})
         current_page = paging.get("current", 1)
         total_pages = paging.get("total", 1)
+        fetched += len(players)
 
         print(
-            f"Fetched page {current_page}/{total_pages} for team {team_id}, season {season_year}: total players so far {len(all_players)}")
+            f"Fetched page {current_page}/{total_pages} for {scope_name} {scope_id}, season {season_year}: total players so far {fetched}")
+        yield data.get("parameters") or params, players
 
         if current_page >= total_pages:
             # No more pages
-            break
+            return
 
         page += 1
 
-    return all_players
-
 
-def fetch_and_insert_players_for_team_season(team_id, season_year, player_data):
-    # player_data is the response for a single player from the API
-    player_info = player_data["player"]
-    player_id = player_info["id"]
-    player_name = player_info["name"]
-
-    stats = player_data.get("statistics", [])
-    position = "Unknown"
-    if stats and len(stats) > 0:
-        position = stats[0]["games"].get("position", "Unknown")
-
-    insert_player(player_id, player_name, position)
-
-    season_id = get_season_id_for_year(season_year)
-    if not season_id:
-        return
-
-    # Player could appear for multiple teams in the season according to stats
-    teams_for_season = set()
-    for stat_entry in stats:
-        stat_team_id = stat_entry["team"]["id"]
-        teams_for_season.add(stat_team_id)
-
-    for tid in teams_for_season:
-        link_player_to_team_season(tid, player_id, season_id)
-
-
-def fetch_and_insert_teams_for_league_and_season(league_id, season_year):
+def fetch_and_insert_players_for_team_season(writer, team_id, season_year, calls):
+    """
+    Stream a team's player pages into `writer`: each page is normalized and
+    queued as one batch, and the writer thread commits it while the next page
+    is being fetched. Returns the IDs of the players received.
+    """
+    player_ids = []
+    for params, players in iter_player_pages({"team": team_id}, season_year):
+        writer.submit(normalize_players(params, players))
+        calls["pages"] += 1
+        player_ids.extend(p["player"]["id"] for p in players)
+    return player_ids
+
+
+def fetch_and_insert_players_for_league_season(writer, league_id, season_year, calls):
+    """
+    Page /players once for the whole league-season instead of team by team.
+    A player listed more than once (a mid-season move within the league, or a
+    page boundary shifting between requests) is kept once by ID, while every
+    statistics[].team entry is linked. Each page's new rows are queued as soon
+    as the page arrives, so only one page is held in memory.
+    Returns the number of distinct players.
+    """
+    seen_players = set()
+    seen_links = set()
+    seen_seasons = set()
+    for params, players in iter_player_pages({"league": league_id}, season_year):
+        calls["pages"] += 1
+        page_rows = normalize_players(params, players)
+        rows = empty_rows()
+        for row in page_rows["Player"]:
+            if row[0] in seen_players:
+                calls["duplicates"] += 1
+                continue
+            seen_players.add(row[0])
+            rows["Player"].append(row)
+        for row in page_rows["Team_Player_Season"]:
+            # (Team_ID, Player_ID, season)
+            if row[:3] not in seen_links:
+                seen_links.add(row[:3])
+                rows["Team_Player_Season"].append(row)
+        for row in page_rows["Season"]:
+            if row not in seen_seasons:
+                seen_seasons.add(row)
+                rows["Season"].append(row)
+        writer.submit(rows)
+
+    # What the same squads would have cost fetched team by team
+    squads = {}
+    for team_id, _, _ in seen_links:
+        squads[team_id] = squads.get(team_id, 0) + 1
+    calls["team_pages_estimate"] += sum(math.ceil(size / PLAYERS_PER_PAGE) for size in squads.values())
+    return len(seen_players)
+
+
+def fetch_and_insert_teams_for_league_and_season(league_id, season_year, domestic=True):
     # Insert league info if not present
     league_name = None
     for name, lid in LEAGUES.items():
@@ -206,23 +234,20 @@ def fetch_and_insert_teams_for_league_and_season(league_id, season_year):
 
     insert_league(league_id, league_name)
 
-    url = "https://api-football-v1.p.rapidapi.com/v3/teams"
     params = {"league": league_id, "season": season_year}
-    r = requests.get(url, headers=headers, params=params)
-    if r.status_code != 200:
+    status, data = fetch_json("teams", params, PRIORITY_TEAMS)
+    if data is None:
         print(
-            f"Failed to fetch teams for league {league_id}, season {season_year}, status code: {r.status_code}")
+            f"Failed to fetch teams for league {league_id}, season {season_year}, status code: {status}")
         return []
 
-    data = r.json()
     teams = data.get("response", [])
     team_ids = []
     for t in teams:
         team_info = t["team"]
         tid = team_info["id"]
         tname = team_info["name"]
-        coach = "Unknown"
-        insert_team(tid, tname, coach, league_id)
+        insert_team(tid, tname, league_id, domestic)
         team_ids.append(tid)
     return team_ids
 
@@ -240,15 +265,13 @@ def fetch_and_insert_fixtures_for_league_season(league_id, season_year):
 
     insert_league(league_id, league_name)
 
-    url = "https://api-football-v1.p.rapidapi.com/v3/fixtures"
     params = {"league": league_id, "season": season_year}
-    r = requests.get(url, headers=headers, params=params)
-    if r.status_code != 200:
+    status, data = fetch_json("fixtures", params, PRIORITY_FIXTURES)
+    if data is None:
         print(
-            f"Failed to fetch fixtures for league {league_id}, season {season_year}, status code: {r.status_code}")
+            f"Failed to fetch fixtures for league {league_id}, season {season_year}, status code: {status}")
         return
 
-    data = r.json()
     fixtures = data.get("response", [])
     for f in fixtures:
         fixture = f["fixture"]
@@ -261,41 +284,104 @@ def fetch_and_insert_fixtures_for_league_season(league_id, season_year):
         date_str = fixture["date"]
         home_score = goals["home"]
         away_score = goals["away"]
+        status = (fixture.get("status") or {}).get("short")
 
         insert_match(match_id, home_team_id, away_team_id,
-                     date_str, home_score, away_score, season_id, league_id)
+                     date_str, home_score, away_score, season_id, league_id, status)
 
-        time.sleep(0.2)
 
+def fetch_players_by_team(writer, team_ids, year_start, calls):
+    received = []
+    for tid in team_ids:
+        received.extend(fetch_and_insert_players_for_team_season(writer, tid, year_start, calls))
+    # Players listed by more than one team were fetched once per team
+    distinct = len(set(received))
+    calls["duplicates"] += len(received) - distinct
+    calls["league_pages_estimate"] += math.ceil(distinct / PLAYERS_PER_PAGE)
 
-def main():
-    # Fetch data for each league and season
-    for league_name, league_id in LEAGUES.items():
-        for year_start in SEASONS:
+
+def fetch_all(writer, calls, players_by="team"):
+    # Fetch data for each competition and its seasons
+    for competition in COMPETITIONS:
+        league_name, league_id = competition["name"], competition["id"]
+        for year_start in competition["seasons"]:
             print(
                 f"Fetching fixtures for {league_name} in the {year_start}/{year_start+1} season...")
             fetch_and_insert_fixtures_for_league_season(league_id, year_start)
 
             print(
                 f"Fetching teams for {league_name} {year_start}/{year_start+1}...")
-            season_id = insert_season(year_start, year_start+1)
             team_ids = fetch_and_insert_teams_for_league_and_season(
-                league_id, year_start)
+                league_id, year_start, domestic=competition["type"] != "cup")
+            if not competition["fetch_players"]:
+                # Cup squads are already covered by the domestic leagues
+                continue
 
-            # Fetch players for each team & season with pagination
-            for tid in team_ids:
-                players = fetch_all_players_for_team_season(tid, year_start)
-                for p_data in players:
-                    fetch_and_insert_players_for_team_season(
-                        tid, year_start, p_data)
-                    time.sleep(0.1)
+            # Fetch players with pagination, for the whole league or each team
+            if players_by == "league":
+                fetch_and_insert_players_for_league_season(writer, league_id, year_start, calls)
+            else:
+                fetch_players_by_team(writer, team_ids, year_start, calls)
 
-            time.sleep(1)  # A short break between seasons
 
-    print("All requested competitions and seasons have been fetched and inserted.")
+def new_player_calls():
+    return {"pages": 0, "duplicates": 0, "team_pages_estimate": 0, "league_pages_estimate": 0}
 
 
-if __name__ == "__main__":
-    main()
+def print_player_calls(players_by, calls):
+    """/players calls made next to an estimate for the other strategy, from the squads received."""
+    if players_by == "league":
+        made, other = "by league", f"~{calls['team_pages_estimate']} team by team"
+    else:
+        made, other = "team by team", f"~{calls['league_pages_estimate']} by league"
+    print(f"/players: {calls['pages']} calls {made}, {other}; "
+          f"{calls['duplicates']} players listed more than once.")
 
 
+def main():
+    parser = argparse.ArgumentParser(description="Fetch fixtures, teams and players for the catalog's competitions.")
+    parser.add_argument("--players-by", choices=["team", "league"], default="team",
+                        help="Page /players per team (default) or once per league-season")
+    args = parser.parse_args()
+
+    conn = connect_db()
+    apply_migrations(conn)
+    conn.close()
+    enable_archiving(get_client())
+
+    # Request pacing is handled by the shared scheduler, which stops before the daily quota runs out
+    # Player pages are written by a background thread while the next page is fetched;
+    # the small queue keeps at most a few pages in memory
+    writer = WriterThread(DB_FILE, queue_size=PLAYER_PAGES_QUEUED, partition_dir=PARTITION_DIR)
+    writer.start()
+    reporter = start_reporter("fetch_data_other")
+    calls = new_player_calls()
+    finished = False
+    try:
+        fetch_all(writer, calls, args.players_by)
+        finished = True
+    except QuotaExhausted as e:
+        # Stopping at the quota is not a failure: what was fetched is still post-processed
+        print(f"Stopping early: {e}")
+    finally:
+        try:
+            writer.close()
+        finally:
+            stop_reporter(reporter)
+            log_stats_summary()
+            print_player_calls(args.players_by, calls)
+
+    conn = connect_all_seasons()
+    print(f"Rebuilt transfers: {build_transfers(conn)} club changes.")
+    conn.close()
+    conn = connect_db()
+    validate_after_ingest(conn)
+    checkpoint(conn)
+    conn.close()
+
+    if finished:
+        print("All requested competitions and seasons have been fetched and inserted.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+import argparse
+import gzip
+import json
+import logging
+import os
+import sqlite3
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from dotenv import load_dotenv
+
+from db_config import connect
+from db_writer import BatchWriter
+from migrations import apply_migrations
+from normalize import normalize_payload
+
+try:
+    import ijson
+except ImportError:  # streaming is optional; fall back to loading each file whole
+    ijson = None
+
+load_dotenv()
+
+DB_FILE = os.getenv("DB_FILE", "soccer_management.db")
+
+DUMP_SUFFIXES = (".json", ".json.gz")
+
+# Used when a dump has lost its "get" field; matched against the file path.
+# The first hint found wins, so the most specific ones come first.
+PATH_HINTS = [
+    ("fixtures/players", "fixtures/players"),
+    ("fixtures_players", "fixtures/players"),
+    ("lineups", "fixtures/lineups"),
+    ("fixtures", "fixtures"),
+    ("teams", "teams"),
+    ("players", "players"),
+]
+
+SCALAR_EVENTS = {"string", "number", "boolean", "null"}
+
+# A file failing with any of these is logged and skipped. ijson's parse errors
+# do not derive from ValueError; EOFError comes from a truncated .gz file.
+PARSE_ERRORS = (OSError, EOFError, ValueError, KeyError, TypeError)
+if ijson is not None:
+    PARSE_ERRORS += (ijson.JSONError,)
+
+
+def find_dump_files(root):
+    paths = []
+    for dirpath, _, filenames in os.walk(root):
+        for filename in filenames:
+            if filename.endswith(DUMP_SUFFIXES):
+                paths.append(os.path.join(dirpath, filename))
+    # Largest first so the pool is not left waiting on one big file at the end
+    paths.sort(key=os.path.getsize, reverse=True)
+    return paths
+
+
+def endpoint_from_path(path):
+    lowered = path.lower().replace(os.sep, "/")
+    for hint, endpoint in PATH_HINTS:
+        if hint in lowered:
+            return endpoint
+    return None
+
+
+def open_dump(path):
+    if path.endswith(".gz"):
+        return gzip.open(path, "rb")
+    return open(path, "rb")
+
+
+def _stream_payload(f):
+    """
+    Walk the JSON document with ijson, collecting `get` and `parameters`
+    and building one `response` item at a time.
+    """
+    endpoint = None
+    parameters = {}
+    items = []
+    builder = None
+    for prefix, event, value in ijson.parse(f):
+        if builder is not None:
+            builder.event(event, value)
+            if prefix == "response.item" and event in ("end_map", "end_array"):
+                items.append(builder.value)
+                builder = None
+        elif prefix == "response.item" and event in ("start_map", "start_array"):
+            builder = ijson.ObjectBuilder()
+            builder.event(event, value)
+        elif prefix == "get" and event == "string":
+            endpoint = value
+        elif prefix.startswith("parameters.") and event in SCALAR_EVENTS:
+            parameters[prefix[len("parameters."):]] = value
+    return endpoint, parameters, items
+
+
+def read_payload(path):
+    with open_dump(path) as f:
+        if ijson is not None:
+            return _stream_payload(f)
+        data = json.load(f)
+    parameters = data.get("parameters") or {}
+    if not isinstance(parameters, dict):
+        parameters = {}
+    return data.get("get"), parameters, data.get("response") or []
+
+
+def parse_dump(path):
+    """Worker entry point: parse and normalize one dump file."""
+    try:
+        endpoint, parameters, items = read_payload(path)
+        endpoint = endpoint or endpoint_from_path(path)
+        if endpoint is None:
+            return path, None, {}, "unknown endpoint"
+        return path, endpoint, normalize_payload(endpoint, parameters, items), None
+    except PARSE_ERRORS as e:
+        return path, None, {}, f"{type(e).__name__}: {e}"
+
+
+def import_dumps(conn, dump_dir, workers=None, batch_rows=20000):
+    paths = find_dump_files(dump_dir)
+    print(f"Found {len(paths)} dump files under {dump_dir}")
+    if not paths:
+        return {}
+
+    started = time.perf_counter()
+    writer = BatchWriter(conn, batch_rows=batch_rows)
+    failed = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for idx, (path, endpoint, rows, error) in enumerate(
+                pool.map(parse_dump, paths, chunksize=8), start=1):
+            if error:
+                failed += 1
+                logging.warning(f"Skipping {path}: {error}")
+                continue
+            writer.add(rows)
+            if idx % 500 == 0:
+                print(f"Parsed {idx}/{len(paths)} files...")
+    writer.flush()
+
+    elapsed = time.perf_counter() - started
+    print(f"\nImported {len(paths) - failed} files ({failed} skipped) in {elapsed:.1f}s "
+          f"({writer.flush_seconds:.1f}s writing).")
+    for table, count in writer.totals.items():
+        print(f"  {table:<28}{count:>10} rows")
+    return writer.totals
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Rebuild the database from recorded API-Football JSON dumps.")
+    parser.add_argument("dump_dir", help="Directory containing fixture/team/player/lineup dumps")
+    parser.add_argument("--db", default=DB_FILE, help="SQLite database file (default: DB_FILE)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Parser processes (default: one per CPU)")
+    parser.add_argument("--batch-rows", type=int, default=20000,
+                        help="Rows per write transaction")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.dump_dir):
+        print(f"Dump directory not found: {args.dump_dir}")
+        sys.exit(1)
+
+    try:
+        conn = connect(args.db)
+    except sqlite3.Error as e:
+        print(f"Error connecting to database: {e}")
+        sys.exit(1)
+    apply_migrations(conn)
+    # A rebuild can always be re-run from the dumps, so trade durability for speed
+    conn.execute("PRAGMA synchronous = OFF")
+    conn.execute("PRAGMA temp_store = MEMORY")
+    try:
+        import_dumps(conn, args.dump_dir, workers=args.workers, batch_rows=args.batch_rows)
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
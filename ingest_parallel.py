@@ -0,0 +1,171 @@
+import argparse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+
+from api_client import get_client, log_stats_summary
+from api_scheduler import (PRIORITY_FIXTURES, PRIORITY_PLAYERS, PRIORITY_TEAMS,
+                           QuotaExhausted)
+from db_config import checkpoint
+from db_writer import WriterThread
+from fetch_data_other import (COMPETITIONS, DB_FILE, LEAGUES, PARTITION_DIR, connect_all_seasons, connect_db,
+                              fetch_json)
+from metrics import start_reporter, stop_reporter
+from migrations import apply_migrations
+from normalize import count_rows, empty_rows, normalize_payload
+from payload_archive import enable_archiving
+from transfers import build_transfers
+from validate_db import validate_after_ingest
+
+
+class StageStats:
+    """Thread-safe per-stage timings shared by all league/season workers."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.failed_requests = 0
+        self.failed_jobs = 0
+        self.fetch_seconds = 0.0
+        self.normalize_seconds = 0.0
+        self.rows = 0
+
+    def add(self, **values):
+        with self.lock:
+            for name, value in values.items():
+                setattr(self, name, getattr(self, name) + value)
+
+
+def fetch_payload(endpoint, params, priority, stats):
+    started = time.perf_counter()
+    status, data = fetch_json(endpoint, params, priority)
+    stats.add(requests=1, fetch_seconds=time.perf_counter() - started)
+    if data is None:
+        stats.add(failed_requests=1)
+        print(f"Failed to fetch /{endpoint} {params}. Status code: {status}")
+    return data
+
+
+def ingest_payload(endpoint, params, data, writer, stats, extra_rows=None):
+    started = time.perf_counter()
+    rows = normalize_payload(endpoint, data.get("parameters") or params, data.get("response", []))
+    if extra_rows:
+        for table, table_rows in extra_rows.items():
+            rows[table] = table_rows + rows.get(table, [])
+    stats.add(normalize_seconds=time.perf_counter() - started, rows=count_rows(rows))
+    writer.submit(rows)
+
+
+def ingest_league_season(league_name, league_id, year_start, writer, stats, fetch_players=True):
+    """Worker for one league/season: fixtures, then teams, then every team's player pages."""
+    base_rows = empty_rows()
+    base_rows["League"].append((league_id, league_name))
+    base_rows["Season"].append((year_start, year_start + 1))
+
+    params = {"league": league_id, "season": year_start}
+    data = fetch_payload("fixtures", params, PRIORITY_FIXTURES, stats)
+    if data is not None:
+        ingest_payload("fixtures", params, data, writer, stats, extra_rows=base_rows)
+
+    data = fetch_payload("teams", params, PRIORITY_TEAMS, stats)
+    if data is None:
+        return
+    ingest_payload("teams", params, data, writer, stats, extra_rows=base_rows)
+    team_ids = [t["team"]["id"] for t in data.get("response", [])] if fetch_players else []
+
+    for tid in team_ids:
+        page = 1
+        while True:
+            params = {"team": tid, "season": year_start, "page": page}
+            data = fetch_payload("players", params, PRIORITY_PLAYERS, stats)
+            if data is None or not data.get("response"):
+                break
+            ingest_payload("players", params, data, writer, stats)
+
+            paging = data.get("paging", {})
+            if paging.get("current", 1) >= paging.get("total", 1):
+                break
+            page += 1
+
+    print(f"Finished {league_name} {year_start}/{year_start+1}")
+
+
+def print_stage_report(stats, writer, elapsed, workers):
+    print(f"\nIngestion finished in {elapsed:.1f}s with {workers} workers.")
+    print(f"{'Stage':<12}{'Items':>12}{'Busy s':>10}{'Per s':>10}")
+    fetch_rate = stats.requests / stats.fetch_seconds if stats.fetch_seconds else 0.0
+    norm_rate = stats.rows / stats.normalize_seconds if stats.normalize_seconds else 0.0
+    written = sum(writer.rows_written.values())
+    write_rate = written / writer.busy_seconds if writer.busy_seconds else 0.0
+    print(f"{'fetch':<12}{stats.requests:>12}{stats.fetch_seconds:>10.1f}{fetch_rate:>10.1f}")
+    print(f"{'normalize':<12}{stats.rows:>12}{stats.normalize_seconds:>10.1f}{norm_rate:>10.0f}")
+    print(f"{'write':<12}{written:>12}{writer.busy_seconds:>10.1f}{write_rate:>10.0f}")
+    print(f"Failed requests: {stats.failed_requests}, failed league/seasons: {stats.failed_jobs}")
+    print(f"Writer transactions: {writer.transactions}, busy {writer.busy_seconds / elapsed:.0%} of wall time")
+    print(f"Producers blocked on a full queue for {writer.blocked_seconds:.1f}s "
+          f"(max queue depth {writer.max_depth}/{writer.queue.maxsize})")
+    if writer.blocked_seconds > 0.1 * elapsed or writer.busy_seconds > 0.8 * elapsed:
+        print("Bottleneck: disk (writer cannot keep up with the fetchers).")
+    else:
+        print("Bottleneck: network/API (writer is idle most of the time).")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Fetch every league/season in parallel with a single database writer thread.")
+    parser.add_argument("--workers", type=int, default=len(LEAGUES),
+                        help="Concurrent league/season workers (default: one per league)")
+    parser.add_argument("--queue-size", type=int, default=64,
+                        help="Payload batches buffered before fetchers are held back")
+    args = parser.parse_args()
+
+    conn = connect_db()
+    apply_migrations(conn)
+    conn.close()
+
+    writer = WriterThread(DB_FILE, queue_size=args.queue_size, partition_dir=PARTITION_DIR)
+    writer.start()
+    enable_archiving(get_client(), writer=writer)
+    stats = StageStats()
+    started = time.perf_counter()
+    reporter = start_reporter("ingest_parallel")
+
+    jobs = [(c["name"], c["id"], year, c["fetch_players"])
+            for c in COMPETITIONS for year in c["seasons"]]
+    try:
+        with ThreadPoolExecutor(max_workers=args.workers) as pool:
+            futures = {pool.submit(ingest_league_season, name, lid, year, writer, stats,
+                                   fetch_players): (name, year)
+                       for name, lid, year, fetch_players in jobs}
+            for future in as_completed(futures):
+                name, year = futures[future]
+                try:
+                    future.result()
+                except QuotaExhausted as e:
+                    print(f"Stopping {name} {year}/{year+1}: {e}")
+                    for pending in futures:
+                        pending.cancel()
+                except requests.exceptions.RequestException as e:
+                    # One league/season failing must not stop the others
+                    stats.add(failed_jobs=1)
+                    print(f"Failed {name} {year}/{year+1}: {e}")
+    finally:
+        writer.close()
+        stop_reporter(reporter)
+        log_stats_summary()
+
+    print_stage_report(stats, writer, time.perf_counter() - started, args.workers)
+
+    conn = connect_all_seasons()
+    print(f"Rebuilt transfers: {build_transfers(conn)} club changes.")
+    conn.close()
+    conn = connect_db()
+    validate_after_ingest(conn)
+    checkpoint(conn)
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
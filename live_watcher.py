@@ -0,0 +1,174 @@
+import argparse
+import logging
+import sqlite3
+import sys
+import os
+import time
+from datetime import datetime, timedelta, timezone
+
+from dotenv import load_dotenv
+
+from api_client import get_client, log_stats_summary
+from api_scheduler import PRIORITY_FIXTURES, QuotaExhausted
+from db_config import connect
+from migrations import apply_migrations
+from normalize import FINISHED_STATUSES
+from partitions import connect_ingest
+from payload_archive import enable_archiving
+
+load_dotenv()
+
+DB_FILE = os.getenv("DB_FILE", "soccer_management.db")
+PARTITION_DIR = os.getenv("PARTITION_DIR")
+
+# API-Football accepts up to 20 fixture IDs per /fixtures?ids= call
+IDS_PER_REQUEST = 20
+
+# Fixture status codes (fixture.status.short) meaning the match is in progress
+LIVE_STATUSES = {"1H", "HT", "2H", "ET", "BT", "P", "SUSP", "INT", "LIVE"}
+
+# Polling cadence in seconds
+LIVE_INTERVAL = 20
+KICKOFF_SOON_INTERVAL = 60
+IDLE_MAX_INTERVAL = 15 * 60
+
+# A match is watched from shortly before kickoff until this long after it
+WATCH_BEFORE_KICKOFF = timedelta(minutes=15)
+WATCH_AFTER_KICKOFF = timedelta(hours=3)
+
+
+def connect_db():
+    try:
+        if PARTITION_DIR:
+            return connect_ingest(PARTITION_DIR)
+        conn = connect(DB_FILE)
+        return conn
+    except (sqlite3.Error, RuntimeError) as e:
+        print(f"Error connecting to database: {e}")
+        sys.exit(1)
+
+
+def parse_match_date(date_str):
+    """Stored dates are ISO-8601 with an offset (e.g. 2023-08-11T19:00:00+00:00); return UTC."""
+    dt = datetime.fromisoformat(date_str.replace("Z", "+00:00"))
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(timezone.utc)
+
+
+def fixtures_due(conn, now):
+    """
+    Stored fixtures that are live or kick off today (UTC), with their kickoff times.
+    SQLite's datetime() normalizes the stored offsets to UTC so the window can be filtered in SQL.
+    """
+    day_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    window_start = min(day_start, now - WATCH_AFTER_KICKOFF)
+    window_end = day_start + timedelta(days=1)
+    rows = conn.execute("""
+        SELECT Match_ID, Date, Home_Score, Away_Score
+        FROM Match
+        WHERE datetime(Date) >= datetime(?) AND datetime(Date) < datetime(?)
+        ORDER BY datetime(Date)
+    """, (window_start.isoformat(), window_end.isoformat())).fetchall()
+    return [(match_id, parse_match_date(date_str), home, away)
+            for match_id, date_str, home, away in rows]
+
+
+def fetch_fixture_updates(match_ids):
+    """Fetch current status/score for up to IDS_PER_REQUEST fixtures in one call."""
+    params = {"ids": "-".join(str(mid) for mid in match_ids)}
+    r = get_client().get("fixtures", params, priority=PRIORITY_FIXTURES)
+    if r.status_code != 200:
+        logging.warning(f"Failed to poll fixtures {params['ids']}. Status code: {r.status_code}")
+        return []
+    return r.json().get("response", [])
+
+
+def apply_score_updates(conn, fixtures):
+    """
+    Write changed scores and statuses in one short transaction. The status tells
+    Team_Match whether the score is final. Returns the number of matches updated.
+    """
+    rows = [(f["goals"]["home"], f["goals"]["away"], f["fixture"]["id"],
+             (f["fixture"].get("status") or {}).get("short")) for f in fixtures]
+    with conn:
+        before = conn.total_changes
+        conn.executemany("""
+            UPDATE Match SET Home_Score = ?1, Away_Score = ?2, Status = COALESCE(?4, Status)
+            WHERE Match_ID = ?3
+              AND (Home_Score IS NOT ?1 OR Away_Score IS NOT ?2 OR ?4 IS NOT NULL AND Status IS NOT ?4)
+        """, rows)
+        return conn.total_changes - before
+
+
+def next_interval(now, pending, any_live):
+    """How long to sleep before the next poll, based on what is happening right now."""
+    if any_live:
+        return LIVE_INTERVAL
+    upcoming = [kickoff for kickoff in pending.values() if kickoff > now]
+    if not upcoming:
+        return LIVE_INTERVAL if pending else None
+    until_kickoff = (min(upcoming) - now).total_seconds()
+    if until_kickoff <= WATCH_BEFORE_KICKOFF.total_seconds():
+        return KICKOFF_SOON_INTERVAL
+    # Sleep until the watch window of the next match opens
+    return min(IDLE_MAX_INTERVAL, until_kickoff - WATCH_BEFORE_KICKOFF.total_seconds())
+
+
+def watch(conn, once=False):
+    finished = set()
+    while True:
+        now = datetime.now(timezone.utc)
+        due = fixtures_due(conn, now)
+        # Only fixtures inside their watch window and not yet known to be over are polled
+        pending = {mid: kickoff for mid, kickoff, _, _ in due
+                   if mid not in finished and now <= kickoff + WATCH_AFTER_KICKOFF}
+        to_poll = [mid for mid, kickoff in pending.items()
+                   if kickoff - WATCH_BEFORE_KICKOFF <= now]
+
+        any_live = False
+        updated = 0
+        for i in range(0, len(to_poll), IDS_PER_REQUEST):
+            fixtures = fetch_fixture_updates(to_poll[i:i + IDS_PER_REQUEST])
+            updated += apply_score_updates(conn, fixtures)
+            for f in fixtures:
+                status = (f["fixture"].get("status") or {}).get("short")
+                if status in LIVE_STATUSES:
+                    any_live = True
+                elif status in FINISHED_STATUSES:
+                    finished.add(f["fixture"]["id"])
+                    pending.pop(f["fixture"]["id"], None)
+
+        interval = next_interval(now, pending, any_live)
+        print(f"[{now:%H:%M:%S}] polled {len(to_poll)} fixtures, {updated} score/status change(s), "
+              f"{len(pending)} still to watch today")
+        if once:
+            return
+        if interval is None:
+            # Nothing left today; check back periodically so tomorrow's fixtures are picked up
+            interval = IDLE_MAX_INTERVAL
+        time.sleep(interval)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Keep today's fixtures' scores up to date while they are being played.")
+    parser.add_argument("--once", action="store_true", help="Poll a single time and exit")
+    args = parser.parse_args()
+
+    conn = connect_db()
+    apply_migrations(conn)
+    enable_archiving(get_client())
+    try:
+        watch(conn, once=args.once)
+    except QuotaExhausted as e:
+        print(f"Stopping early: {e}")
+    except KeyboardInterrupt:
+        print("Watcher stopped.")
+    finally:
+        conn.close()
+        log_stats_summary()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,270 @@
+"""
+Ingestion metrics shared by the fetch scripts.
+
+The API client, the request scheduler and the database writer record into one
+process-wide registry: requests and latency per endpoint, HTTP status counts,
+remaining quota, rows written per table, commit latency and writer queue depth.
+While a script runs, a reporter thread rewrites METRICS_DIR/<job>.prom in the
+Prometheus text format (for node_exporter's textfile collector) and prints a
+one-line summary every METRICS_INTERVAL seconds.
+"""
+import logging
+import os
+import threading
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+METRICS_DIR = os.getenv("METRICS_DIR", ".")
+METRICS_INTERVAL = float(os.getenv("METRICS_INTERVAL", "10"))  # 0 disables the reporter
+
+LATENCY_BUCKETS = (0.025, 0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 2.5, 5.0, 10.0, 30.0)
+COMMIT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+
+# name: (type, help, histogram buckets)
+METRICS = {
+    "api_requests_total": ("counter", "API requests sent, by endpoint and HTTP status", None),
+    "api_request_duration_seconds": ("histogram", "API request latency, by endpoint", LATENCY_BUCKETS),
+    "api_quota_remaining": ("gauge", "Daily API requests left, as reported by the API", None),
+    "db_rows_written_total": ("counter", "Rows handed to SQLite, by table", None),
+    "db_commit_duration_seconds": ("histogram", "Time spent in each transaction commit", COMMIT_BUCKETS),
+    "db_writer_queue_depth": ("gauge", "Batches waiting for the database writer thread", None),
+}
+
+
+def _labels(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"') for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-quantile (inf if it is past the last bucket)."""
+        if not self.count:
+            return 0.0
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            if cumulative >= q * self.count:
+                return bound
+        return float("inf")
+
+
+class Metrics:
+    """Thread-safe registry of counters, gauges and histograms keyed by name and labels."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.values = {}  # (name, labels) -> number or Histogram
+
+    def inc(self, name, value=1, **labels):
+        key = (name, _labels(labels))
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + value
+
+    def set(self, name, value, **labels):
+        with self.lock:
+            self.values[(name, _labels(labels))] = value
+
+    def observe(self, name, value, **labels):
+        key = (name, _labels(labels))
+        with self.lock:
+            histogram = self.values.get(key)
+            if histogram is None:
+                histogram = self.values[key] = Histogram(METRICS[name][2])
+            histogram.observe(value)
+
+    def snapshot(self):
+        """{(name, labels): value}, with histograms copied so they can be read without the lock."""
+        with self.lock:
+            snapshot = {}
+            for key, value in self.values.items():
+                if isinstance(value, Histogram):
+                    copy = Histogram(value.buckets)
+                    copy.counts, copy.sum, copy.count = list(value.counts), value.sum, value.count
+                    value = copy
+                snapshot[key] = value
+            return snapshot
+
+    def prometheus_text(self, job):
+        snapshot = self.snapshot()
+        lines = []
+        for name, (kind, help_text, _) in METRICS.items():
+            series = sorted(((labels, value) for (n, labels), value in snapshot.items() if n == name),
+                            key=lambda item: item[0])
+            if not series:
+                continue
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in series:
+                labels = (("script", job),) + labels
+                if kind != "histogram":
+                    lines.append(f"{name}{_format_labels(labels)} {value}")
+                    continue
+                cumulative = 0
+                for bound, count in zip(value.buckets, value.counts):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_format_labels(labels, [('le', bound)])} {cumulative}")
+                lines.append(f"{name}_bucket{_format_labels(labels, [('le', '+Inf')])} {value.count}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {value.sum}")
+                lines.append(f"{name}_count{_format_labels(labels)} {value.count}")
+        return "\n".join(lines) + "\n"
+
+
+_metrics = Metrics()
+
+
+def inc(name, value=1, **labels):
+    _metrics.inc(name, value, **labels)
+
+
+def set_gauge(name, value, **labels):
+    _metrics.set(name, value, **labels)
+
+
+def observe(name, value, **labels):
+    _metrics.observe(name, value, **labels)
+
+
+def get_metrics():
+    return _metrics
+
+
+def _merged_histogram(snapshot, name):
+    merged = None
+    for (n, _), value in snapshot.items():
+        if n != name:
+            continue
+        if merged is None:
+            merged = Histogram(value.buckets)
+        merged.counts = [a + b for a, b in zip(merged.counts, value.counts)]
+        merged.sum += value.sum
+        merged.count += value.count
+    return merged
+
+
+def _format_seconds(seconds):
+    return "-" if seconds == float("inf") else f"<={seconds * 1000:.0f}ms"
+
+
+class MetricsReporter(threading.Thread):
+    """Rewrites the .prom file and prints a summary line every `interval` seconds."""
+
+    def __init__(self, job, metrics=None, interval=METRICS_INTERVAL, directory=METRICS_DIR):
+        super().__init__(name="metrics-reporter", daemon=True)
+        self.job = job
+        self.metrics = metrics or _metrics
+        self.interval = interval
+        self.path = os.path.join(directory, f"{job}.prom")
+        self._stop_event = threading.Event()
+        self._last = (time.perf_counter(), {})
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            self.report()
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+        self.report()
+
+    def write_file(self):
+        # Written to a temporary file and renamed, so the collector never reads a partial file
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(self.metrics.prometheus_text(self.job))
+        os.replace(tmp, self.path)
+
+    def summary_line(self):
+        """Rates since the previous line, plus latency quantiles and gauges over the whole run."""
+        now = time.perf_counter()
+        snapshot = self.metrics.snapshot()
+        last_time, last_counts = self._last
+        elapsed = max(now - last_time, 1e-9)
+
+        counts = {key: value for key, value in snapshot.items()
+                  if key[0] in ("api_requests_total", "db_rows_written_total")}
+        self._last = (now, counts)
+        delta = {key: value - last_counts.get(key, 0) for key, value in counts.items()}
+
+        by_endpoint = {}
+        statuses = {}
+        rows = 0
+        for (name, labels), value in delta.items():
+            labels = dict(labels)
+            if name == "api_requests_total":
+                by_endpoint[labels["endpoint"]] = by_endpoint.get(labels["endpoint"], 0) + value
+                if labels["status"] != "200" and value:
+                    statuses[labels["status"]] = statuses.get(labels["status"], 0) + value
+            else:
+                rows += value
+
+        total = sum(by_endpoint.values())
+        parts = [f"{total / elapsed:.1f} req/s"]
+        if total:
+            parts[0] += " (" + ", ".join(f"{endpoint} {count / elapsed:.1f}"
+                                         for endpoint, count in sorted(by_endpoint.items()) if count) + ")"
+        latency = _merged_histogram(snapshot, "api_request_duration_seconds")
+        if latency:
+            parts.append(f"latency p50 {_format_seconds(latency.quantile(0.5))} "
+                         f"p95 {_format_seconds(latency.quantile(0.95))}")
+        if statuses:
+            parts.append("status " + " ".join(f"{status}:{count}" for status, count in sorted(statuses.items())))
+        parts.append(f"{rows / elapsed:.0f} rows/s")
+        commits = _merged_histogram(snapshot, "db_commit_duration_seconds")
+        if commits:
+            parts.append(f"commit p95 {_format_seconds(commits.quantile(0.95))}")
+        quota = snapshot.get(("api_quota_remaining", ()))
+        if quota is not None:
+            parts.append(f"quota {quota}")
+        depth = snapshot.get(("db_writer_queue_depth", ()))
+        if depth is not None:
+            parts.append(f"queue {depth}")
+        return "[metrics] " + " | ".join(parts)
+
+    def report(self):
+        try:
+            self.write_file()
+        except OSError as e:
+            logging.warning(f"Could not write metrics to {self.path}: {e}")
+        line = self.summary_line()
+        logging.info(line)
+        print(line)
+
+
+def start_reporter(job):
+    """Start the periodic reporter for `job` (the .prom file name); returns None if disabled."""
+    if METRICS_INTERVAL <= 0:
+        return None
+    reporter = MetricsReporter(job)
+    reporter.start()
+    return reporter
+
+
+def stop_reporter(reporter):
+    """Write the final metrics file and summary line."""
+    if reporter is not None:
+        reporter.stop()
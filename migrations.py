@@ -0,0 +1,215 @@
+import sqlite3
+import sys
+import os
+from dotenv import load_dotenv
+
+from db_config import connect
+
+load_dotenv()
+
+DB_FILE = os.getenv("DB_FILE", "soccer_management.db")
+
+# One row per team per finished match, from that team's point of view. A match
+# counts only once its fixture status says it is over, so an in-progress score is
+# never taken as a result and the view does not change with the clock (the query
+# cache keys on data_version alone). Also created as a TEMP view over the attached
+# partitions by partitions.connect_partitioned.
+FINISHED_MATCH = """
+    Home_Score IS NOT NULL AND Away_Score IS NOT NULL
+    AND Status IN ('FT', 'AET', 'PEN', 'AWD', 'WO')
+"""
+TEAM_MATCH_SELECT = f"""
+    SELECT Match_ID, Season_ID, League_ID, Date, Home_Team_ID AS Team_ID, Away_Team_ID AS Opponent_ID,
+           1 AS Home, Home_Score AS Goals_For, Away_Score AS Goals_Against
+    FROM Match WHERE {FINISHED_MATCH}
+    UNION ALL
+    SELECT Match_ID, Season_ID, League_ID, Date, Away_Team_ID, Home_Team_ID,
+           0, Away_Score, Home_Score
+    FROM Match WHERE {FINISHED_MATCH}
+"""
+
+# Each migration brings a database from version N-1 to N (tracked in PRAGMA user_version).
+# schema.sql always describes the latest version, so a fresh database starts there.
+MIGRATIONS = [
+    # 1: natural-key uniqueness so ingestion can upsert instead of SELECT-then-INSERT.
+    # Duplicates left behind by earlier runs are collapsed onto the oldest row first.
+    """
+    UPDATE Match SET Season_ID = (
+        SELECT MIN(s2.Season_ID) FROM Season s1
+        JOIN Season s2 ON s1.Year_Start = s2.Year_Start AND s1.Year_End = s2.Year_End
+        WHERE s1.Season_ID = Match.Season_ID
+    );
+    UPDATE Team_Player_Season SET Season_ID = (
+        SELECT MIN(s2.Season_ID) FROM Season s1
+        JOIN Season s2 ON s1.Year_Start = s2.Year_Start AND s1.Year_End = s2.Year_End
+        WHERE s1.Season_ID = Team_Player_Season.Season_ID
+    );
+    DELETE FROM Season WHERE Season_ID NOT IN (
+        SELECT MIN(Season_ID) FROM Season GROUP BY Year_Start, Year_End
+    );
+    DELETE FROM Team_Player_Season WHERE Team_Player_Season_ID NOT IN (
+        SELECT MIN(Team_Player_Season_ID) FROM Team_Player_Season
+        GROUP BY Team_ID, Player_ID, Season_ID
+    );
+    DELETE FROM Player_Match_Participation WHERE Player_Match_ID NOT IN (
+        SELECT MIN(Player_Match_ID) FROM Player_Match_Participation
+        GROUP BY Match_ID, Player_ID
+    );
+    CREATE UNIQUE INDEX IF NOT EXISTS ux_season_years ON Season (Year_Start, Year_End);
+    CREATE UNIQUE INDEX IF NOT EXISTS ux_team_player_season ON Team_Player_Season (Team_ID, Player_ID, Season_ID);
+    CREATE UNIQUE INDEX IF NOT EXISTS ux_player_match ON Player_Match_Participation (Match_ID, Player_ID);
+    """,
+    # 2: kickoff times normalized to UTC, so the live watcher can find today's fixtures by index
+    """
+    CREATE INDEX IF NOT EXISTS ix_match_kickoff_utc ON Match (datetime(Date));
+    """,
+    # 3: compressed archive of raw API responses, replayable without refetching
+    """
+    CREATE TABLE IF NOT EXISTS Raw_Payload (
+        Payload_ID INTEGER PRIMARY KEY,
+        Endpoint TEXT NOT NULL,
+        Params TEXT NOT NULL,
+        Fetched_At TEXT NOT NULL,
+        Encoding TEXT NOT NULL,
+        Body BLOB NOT NULL,
+        UNIQUE (Endpoint, Params, Fetched_At)
+    );
+    """,
+    # 4: persisted ingestion work queue filled by planner.py from the competition catalog
+    """
+    CREATE TABLE IF NOT EXISTS Work_Item (
+        Work_ID INTEGER PRIMARY KEY,
+        Endpoint TEXT NOT NULL,
+        Params TEXT NOT NULL,
+        League_ID INTEGER NOT NULL,
+        Priority INTEGER NOT NULL,
+        Status TEXT NOT NULL DEFAULT 'pending',
+        Attempts INTEGER NOT NULL DEFAULT 0,
+        Last_Error TEXT,
+        Updated_At TEXT,
+        UNIQUE (Endpoint, Params)
+    );
+    CREATE INDEX IF NOT EXISTS ix_work_item_queue ON Work_Item (Status, Priority, Work_ID);
+    """,
+    # 5: club changes between consecutive seasons, rebuilt by transfers.py
+    """
+    CREATE TABLE IF NOT EXISTS Player_Transfer (
+        Player_Transfer_ID INTEGER PRIMARY KEY,
+        Player_ID INTEGER NOT NULL,
+        From_Team_ID INTEGER NOT NULL,
+        To_Team_ID INTEGER NOT NULL,
+        From_Season_ID INTEGER NOT NULL,
+        To_Season_ID INTEGER NOT NULL,
+        Mid_Season INTEGER NOT NULL DEFAULT 0,
+        FOREIGN KEY (Player_ID) REFERENCES Player(Player_ID),
+        FOREIGN KEY (From_Team_ID) REFERENCES Team(Team_ID),
+        FOREIGN KEY (To_Team_ID) REFERENCES Team(Team_ID),
+        FOREIGN KEY (From_Season_ID) REFERENCES Season(Season_ID),
+        FOREIGN KEY (To_Season_ID) REFERENCES Season(Season_ID)
+    );
+    CREATE INDEX IF NOT EXISTS ix_transfer_in ON Player_Transfer (To_Team_ID, To_Season_ID);
+    CREATE INDEX IF NOT EXISTS ix_transfer_out ON Player_Transfer (From_Team_ID, To_Season_ID);
+    CREATE INDEX IF NOT EXISTS ix_transfer_corridor ON Player_Transfer (From_Team_ID, To_Team_ID);
+    CREATE INDEX IF NOT EXISTS ix_transfer_season ON Player_Transfer (To_Season_ID);
+    """,
+    # 6: CLI lookups by season, league and player (checked by check_query_plans.py)
+    """
+    CREATE INDEX IF NOT EXISTS ix_match_season ON Match (Season_ID, Date);
+    CREATE INDEX IF NOT EXISTS ix_match_league_season ON Match (League_ID, Season_ID, Date);
+    CREATE INDEX IF NOT EXISTS ix_tps_player_season ON Team_Player_Season (Player_ID, Season_ID);
+    CREATE INDEX IF NOT EXISTS ix_tps_season_team ON Team_Player_Season (Season_ID, Team_ID);
+    """,
+    # 7: starter/substitute and team per participation, filled from per-fixture player statistics.
+    # Rows written from lineups alone held placeholder 90/0/0 statistics; they become unknown
+    # (NULL) so `player_match_fetch.py --backfill` can find and re-fetch them.
+    """
+    ALTER TABLE Player_Match_Participation ADD COLUMN Started INTEGER;
+    ALTER TABLE Player_Match_Participation ADD COLUMN Team_ID INTEGER REFERENCES Team(Team_ID);
+    UPDATE Player_Match_Participation SET Minutes_Played = NULL, Goals = NULL, Assists = NULL
+    WHERE Minutes_Played = 90 AND Goals = 0 AND Assists = 0;
+    """,
+    # 8: normalized team-match view for the form guide
+    """
+    CREATE VIEW IF NOT EXISTS Team_Match AS
+    SELECT Match_ID, Season_ID, League_ID, Date, Home_Team_ID AS Team_ID, Away_Team_ID AS Opponent_ID,
+           1 AS Home, Home_Score AS Goals_For, Away_Score AS Goals_Against
+    FROM Match WHERE Home_Score IS NOT NULL AND Away_Score IS NOT NULL
+    UNION ALL
+    SELECT Match_ID, Season_ID, League_ID, Date, Away_Team_ID, Home_Team_ID,
+           0, Away_Score, Home_Score
+    FROM Match WHERE Home_Score IS NOT NULL AND Away_Score IS NOT NULL;
+    """,
+    # 9: fixture status (fixture.status.short), so in-progress scores written by
+    # live_watcher.py are not counted as results by Team_Match
+    """
+    ALTER TABLE Match ADD COLUMN Status TEXT;
+    DROP VIEW IF EXISTS Team_Match;
+    CREATE VIEW Team_Match AS
+    SELECT Match_ID, Season_ID, League_ID, Date, Home_Team_ID AS Team_ID, Away_Team_ID AS Opponent_ID,
+           1 AS Home, Home_Score AS Goals_For, Away_Score AS Goals_Against
+    FROM Match WHERE Home_Score IS NOT NULL AND Away_Score IS NOT NULL
+      AND (Status IN ('FT', 'AET', 'PEN', 'AWD', 'WO')
+           OR Status IS NULL AND datetime(Date) < datetime('now', '-3 hours'))
+    UNION ALL
+    SELECT Match_ID, Season_ID, League_ID, Date, Away_Team_ID, Home_Team_ID,
+           0, Away_Score, Home_Score
+    FROM Match WHERE Home_Score IS NOT NULL AND Away_Score IS NOT NULL
+      AND (Status IN ('FT', 'AET', 'PEN', 'AWD', 'WO')
+           OR Status IS NULL AND datetime(Date) < datetime('now', '-3 hours'));
+    """,
+    # 10: Team_Match goes by Status alone. Scored rows stored before Status existed
+    # and already past live_watcher's watch window (3 hours after kickoff) are marked
+    # finished once here; the next fixtures fetch overwrites them with the real status.
+    f"""
+    UPDATE Match SET Status = 'FT'
+    WHERE Status IS NULL AND Home_Score IS NOT NULL AND Away_Score IS NOT NULL
+      AND datetime(Date) < datetime('now', '-3 hours');
+    DROP VIEW IF EXISTS Team_Match;
+    CREATE VIEW Team_Match AS {TEAM_MATCH_SELECT};
+    """,
+    # 11: whether a fixture's player statistics were published (1), or were still
+    # missing after the final whistle (0), so `player_match_fetch.py` stops re-fetching them
+    """
+    ALTER TABLE Match ADD COLUMN Player_Stats INTEGER;
+    """,
+    # 12: each participation's season, copied from its match, so the season partitions
+    # can filter Player_Match_Participation per file the way they filter the other tables
+    """
+    ALTER TABLE Player_Match_Participation ADD COLUMN Season_ID INTEGER REFERENCES Season(Season_ID);
+    UPDATE Player_Match_Participation
+    SET Season_ID = (SELECT m.Season_ID FROM Match m WHERE m.Match_ID = Player_Match_Participation.Match_ID);
+    """,
+]
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def apply_migrations(conn):
+    """Bring `conn` up to SCHEMA_VERSION. Returns the number of migrations applied."""
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    applied = 0
+    for number, script in enumerate(MIGRATIONS[version:], start=version + 1):
+        # executescript commits first, so the version bump lives inside the same script
+        try:
+            conn.executescript(f"BEGIN;\n{script}\nPRAGMA user_version = {number};\nCOMMIT;")
+        except sqlite3.Error:
+            if conn.in_transaction:
+                conn.rollback()
+            raise
+        applied += 1
+    return applied
+
+
+def main():
+    try:
+        conn = connect(DB_FILE)
+    except sqlite3.Error as e:
+        print(f"Error connecting to database: {e}")
+        sys.exit(1)
+    applied = apply_migrations(conn)
+    conn.close()
+    print(f"Applied {applied} migration(s); {DB_FILE} is at schema version {SCHEMA_VERSION}.")
+
+
+if __name__ == "__main__":
+    main()
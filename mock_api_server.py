@@ -0,0 +1,446 @@
+"""
+Local stand-in for API-Football, for load and fault testing without spending quota.
+
+Every league, season, team, squad, fixture and lineup is generated from the
+seed, so the same request always returns the same payload. Latency, 429
+bursts, per-minute and daily rate limits, truncated bodies and 5xx errors can
+be injected. Point the fetch scripts at it with API_BASE_URL:
+
+    python3 mock_api_server.py --port 8080 --latency-ms 50 --error-rate 0.02
+    API_BASE_URL=http://127.0.0.1:8080/v3 DB_FILE=mock.db python3 fetch_data_other.py
+"""
+import argparse
+import gzip
+import json
+import random
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+TEAMS_PER_LEAGUE = 20
+SQUAD_SIZE = 25
+PAGE_SIZE = 20            # players per page, as in API-Football
+MAX_IDS_PER_REQUEST = 20  # /fixtures?ids= limit, as in API-Football
+BASE_YEAR = 2015          # squads are generated from this season onwards
+SQUAD_TURNOVER = 0.2      # chance a squad place changes hands between seasons
+GZIP_MIN_BYTES = 1024
+
+POSITIONS = ["Goalkeeper"] * 3 + ["Defender"] * 8 + ["Midfielder"] * 8 + ["Attacker"] * 6
+LINEUP_POSITIONS = {"Goalkeeper": "G", "Defender": "D", "Midfielder": "M", "Attacker": "F"}
+FIRST_NAMES = ["Luca", "Mateo", "Jonas", "Kai", "Theo", "Noah", "Rafael", "Ilkay", "Bruno", "Sami",
+               "Youssef", "Diego", "Marco", "Jan", "Emil", "Tomas", "Hugo", "Arda", "Ismael", "Joao"]
+LAST_SYLLABLES = ["ber", "tin", "ka", "ro", "vic", "son", "man", "el", "ard", "li", "mo", "sen", "ez", "do"]
+CITY_SYLLABLES = ["Nor", "Wes", "Ash", "Bel", "Cal", "Dun", "Fair", "Glen", "Kings", "Mar", "Port", "Ross"]
+CLUB_SUFFIXES = ["United", "City", "Rovers", "Athletic", "FC", "Town", "Wanderers", "Albion"]
+
+
+def _rng(*key):
+    return random.Random(":".join(str(k) for k in key))
+
+
+class World:
+    """Deterministic leagues, squads, fixtures and lineups generated from `seed`."""
+
+    def __init__(self, seed=42, teams_per_league=TEAMS_PER_LEAGUE, squad_size=SQUAD_SIZE):
+        self.seed = seed
+        self.teams_per_league = teams_per_league
+        self.squad_size = squad_size
+        self._schedules = {}
+
+    # Team IDs are league_id * 100 + index and fixture IDs encode league, season
+    # and match number, so any ID can be traced back without stored state.
+    def team_ids(self, league_id):
+        return [league_id * 100 + i for i in range(1, self.teams_per_league + 1)]
+
+    def team_name(self, team_id):
+        r = _rng(self.seed, "team", team_id)
+        return f"{''.join(r.sample(CITY_SYLLABLES, 2)).title()} {r.choice(CLUB_SUFFIXES)}"
+
+    def player_name(self, player_id):
+        r = _rng(self.seed, "player", player_id)
+        last = "".join(r.choice(LAST_SYLLABLES) for _ in range(r.randint(2, 3))).title()
+        return f"{r.choice(FIRST_NAMES)[0]}. {last}"
+
+    def squad(self, team_id, season):
+        """[(player_id, position)]: each place turns over with SQUAD_TURNOVER chance per season."""
+        players = []
+        for slot in range(self.squad_size):
+            generation = sum(1 for year in range(BASE_YEAR + 1, season + 1)
+                             if _rng(self.seed, "turnover", team_id, slot, year).random() < SQUAD_TURNOVER)
+            players.append((team_id * 1000 + generation * self.squad_size + slot,
+                            POSITIONS[slot % len(POSITIONS)]))
+        return players
+
+    def fixture_id(self, league_id, season, number):
+        return league_id * 100000 + (season % 100) * 1000 + number
+
+    def decode_fixture(self, fixture_id):
+        league_id, rest = divmod(fixture_id, 100000)
+        season_part, number = divmod(rest, 1000)
+        return league_id, 2000 + season_part, number
+
+    def schedule(self, league_id, season):
+        """Double round robin: (number, round, home_id, away_id), one round per week from August."""
+        cached = self._schedules.get((league_id, season))
+        if cached is not None:
+            return cached
+        teams = self.team_ids(league_id)
+        rotation = teams[1:]
+        rounds = []
+        for _ in range(len(teams) - 1):
+            lineup = [teams[0]] + rotation
+            rounds.append([(lineup[i], lineup[-1 - i]) for i in range(len(teams) // 2)])
+            rotation = rotation[-1:] + rotation[:-1]
+        rounds += [[(away, home) for home, away in r] for r in rounds]
+        matches = []
+        for round_number, pairs in enumerate(rounds, start=1):
+            for home, away in pairs:
+                matches.append((len(matches) + 1, round_number, home, away))
+        self._schedules[(league_id, season)] = matches
+        return matches
+
+    def fixture(self, league_id, season, number, now=None):
+        matches = self.schedule(league_id, season)
+        if not 1 <= number <= len(matches):
+            return None
+        _, round_number, home, away = matches[number - 1]
+        r = _rng(self.seed, "fixture", league_id, season, number)
+        kickoff = (datetime(season, 8, 10, 14, 0, tzinfo=timezone.utc)
+                   + timedelta(weeks=round_number - 1, hours=r.choice([0, 2, 4, 6])))
+        now = now or datetime.now(timezone.utc)
+        finished = kickoff + timedelta(minutes=115) < now
+        live = kickoff <= now and not finished
+        goals = {"home": None, "away": None}
+        status = {"long": "Not Started", "short": "NS", "elapsed": None}
+        if finished or live:
+            goals = {"home": min(r.randint(0, 3) + r.randint(0, 1), 7), "away": r.randint(0, 3)}
+            status = ({"long": "Match Finished", "short": "FT", "elapsed": 90} if finished else
+                      {"long": "Second Half", "short": "2H",
+                       "elapsed": min(90, int((now - kickoff).total_seconds() // 60))})
+        return {
+            "fixture": {"id": self.fixture_id(league_id, season, number), "referee": None,
+                        "timezone": "UTC", "date": kickoff.isoformat(), "timestamp": int(kickoff.timestamp()),
+                        "status": status},
+            "league": {"id": league_id, "name": f"League {league_id}", "country": "Mockland",
+                       "season": season, "round": f"Regular Season - {round_number}"},
+            "teams": {"home": {"id": home, "name": self.team_name(home),
+                               "winner": None if goals["home"] is None else goals["home"] > goals["away"]},
+                      "away": {"id": away, "name": self.team_name(away),
+                               "winner": None if goals["home"] is None else goals["away"] > goals["home"]}},
+            "goals": goals,
+            "score": {"halftime": {"home": None, "away": None}, "fulltime": goals},
+        }
+
+    def _match_squads(self, league_id, season, number):
+        """Per side: (team_id, starters, used subs with their minute on, unused subs)."""
+        _, _, home, away = self.schedule(league_id, season)[number - 1]
+        sides = []
+        for team_id in (home, away):
+            r = _rng(self.seed, "lineup", league_id, season, number, team_id)
+            squad = self.squad(team_id, season)
+            keepers = [p for p in squad if p[1] == "Goalkeeper"]
+            outfield = [p for p in squad if p[1] != "Goalkeeper"]
+            r.shuffle(keepers)
+            r.shuffle(outfield)
+            starters = keepers[:1] + outfield[:10]
+            bench = keepers[1:2] + outfield[10:16]
+            used = [(player, r.randint(46, 85)) for player in bench[1:4]]
+            sides.append((team_id, starters, used, [bench[0]] + bench[4:]))
+        return sides
+
+    def lineups(self, fixture_id):
+        league_id, season, number = self.decode_fixture(fixture_id)
+        if self.fixture(league_id, season, number) is None:
+            return []
+
+        def entry(player_id, position):
+            return {"player": {"id": player_id, "name": self.player_name(player_id),
+                               "number": player_id % 99 + 1, "pos": LINEUP_POSITIONS[position], "grid": None}}
+
+        return [{"team": {"id": team_id, "name": self.team_name(team_id)}, "formation": "4-3-3",
+                 "startXI": [entry(*p) for p in starters],
+                 "substitutes": [entry(*p) for p, _ in used] + [entry(*p) for p in unused]}
+                for team_id, starters, used, unused in self._match_squads(league_id, season, number)]
+
+    def player_stats(self, fixture_id):
+        """Per-player minutes, goals and assists, shaped like the `players` block of /fixtures?ids=."""
+        league_id, season, number = self.decode_fixture(fixture_id)
+        fixture = self.fixture(league_id, season, number)
+        if fixture is None or fixture["goals"]["home"] is None:
+            return []
+        result = []
+        for side, (team_id, starters, used, unused) in zip(("home", "away"),
+                                                            self._match_squads(league_id, season, number)):
+            r = _rng(self.seed, "stats", fixture_id, team_id)
+            minutes = {}
+            for (player_id, _), ((sub_id, _), minute_on) in zip(starters[-len(used):], used):
+                minutes[player_id] = minute_on
+                minutes[sub_id] = 90 - minute_on
+            played = [(pid, pos) for pid, pos in starters] + [p for p, _ in used]
+            goals = Counter()
+            assists = Counter()
+            scorers = [p for p in played if p[1] != "Goalkeeper"]
+            weights = [4 if pos == "Attacker" else 2 if pos == "Midfielder" else 1 for _, pos in scorers]
+            for _ in range(fixture["goals"][side]):
+                scorer = r.choices(scorers, weights)[0]
+                goals[scorer[0]] += 1
+                if r.random() < 0.7:
+                    assists[r.choice([p for p in scorers if p != scorer])[0]] += 1
+
+            def entry(player_id, position, substitute, played_minutes):
+                return {"player": {"id": player_id, "name": self.player_name(player_id)},
+                        "statistics": [{"games": {"minutes": played_minutes, "position": LINEUP_POSITIONS[position],
+                                                  "substitute": substitute},
+                                        "goals": {"total": goals[player_id] or None,
+                                                  "assists": assists[player_id] or None}}]}
+
+            players = [entry(pid, pos, False, minutes.get(pid, 90)) for pid, pos in starters]
+            players += [entry(pid, pos, True, minutes[pid]) for (pid, pos), _ in used]
+            players += [entry(pid, pos, True, None) for pid, pos in unused]
+            result.append({"team": {"id": team_id, "name": self.team_name(team_id)}, "players": players})
+        return result
+
+    def player_entry(self, player_id, position, team_id, league_id, season):
+        return {"player": {"id": player_id, "name": self.player_name(player_id),
+                           "age": 18 + player_id % 17, "nationality": "Mockland"},
+                "statistics": [{"team": {"id": team_id, "name": self.team_name(team_id)},
+                                "league": {"id": league_id, "name": f"League {league_id}", "season": season},
+                                "games": {"position": position}}]}
+
+
+class FaultInjector:
+    """Decides, per request, whether to delay, throttle, fail or truncate the response."""
+
+    def __init__(self, seed=42, latency_ms=0, jitter_ms=0, error_rate=0.0, truncate_rate=0.0,
+                 burst_every=0, burst_length=0, rate_limit=0, daily_quota=0):
+        self.random = random.Random(seed)
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.truncate_rate = truncate_rate
+        self.burst_every = burst_every
+        self.burst_length = burst_length
+        self.rate_limit = rate_limit
+        self.daily_quota = daily_quota
+        self.requests = 0
+        self.daily_used = 0
+        self.window = deque()
+        self.counts = Counter()
+        self.lock = threading.Lock()
+
+    def delay(self):
+        with self.lock:
+            jitter = self.random.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0
+        return max(0.0, (self.latency_ms + jitter) / 1000)
+
+    def decide(self, endpoint):
+        """(status, headers, truncate) for the next request."""
+        with self.lock:
+            self.requests += 1
+            self.counts[endpoint] += 1
+            now = time.monotonic()
+            while self.window and now - self.window[0] >= 60:
+                self.window.popleft()
+            headers = {}
+            status = 200
+            if (self.burst_every and self.requests > self.burst_every
+                    and (self.requests - 1) % self.burst_every < self.burst_length):
+                status = 429
+                headers["Retry-After"] = "1"
+                self.counts["injected 429 burst"] += 1
+            elif self.rate_limit and len(self.window) >= self.rate_limit:
+                status = 429
+                headers["Retry-After"] = str(max(1, int(60 - (now - self.window[0]))))
+                self.counts["rate limited"] += 1
+            elif self.daily_quota and self.daily_used >= self.daily_quota:
+                status = 429
+                self.counts["daily quota exceeded"] += 1
+            elif self.random.random() < self.error_rate:
+                status = self.random.choice([500, 502, 503])
+                self.counts[f"injected {status}"] += 1
+            else:
+                self.window.append(now)
+                self.daily_used += 1
+
+            if self.rate_limit:
+                headers["X-RateLimit-Limit"] = str(self.rate_limit)
+                headers["X-RateLimit-Remaining"] = str(max(0, self.rate_limit - len(self.window)))
+            if self.daily_quota:
+                headers["x-ratelimit-requests-limit"] = str(self.daily_quota)
+                headers["x-ratelimit-requests-remaining"] = str(max(0, self.daily_quota - self.daily_used))
+            truncate = status == 200 and self.random.random() < self.truncate_rate
+            if truncate:
+                self.counts["truncated"] += 1
+            return status, headers, truncate
+
+
+def _envelope(endpoint, params, response, errors=None, page=1, total=1):
+    return {"get": endpoint, "parameters": params, "errors": errors or [], "results": len(response),
+            "paging": {"current": page, "total": total}, "response": response}
+
+
+def _int(params, name):
+    value = params.get(name, "")
+    return int(value) if value.lstrip("-").isdigit() else None
+
+
+def handle_request(world, endpoint, params):
+    """The JSON body API-Football would return for `endpoint` with `params`."""
+    if endpoint == "fixtures":
+        if "ids" in params or "id" in params:
+            ids = [int(i) for i in params.get("ids", params.get("id", "")).split("-") if i.isdigit()]
+            if len(ids) > MAX_IDS_PER_REQUEST:
+                return _envelope(endpoint, params, [], {"ids": f"Maximum of {MAX_IDS_PER_REQUEST} ids"})
+            fixtures = []
+            for fixture_id in ids:
+                fixture = world.fixture(*world.decode_fixture(fixture_id))
+                if fixture is not None:
+                    fixture["lineups"] = world.lineups(fixture_id)
+                    fixture["players"] = world.player_stats(fixture_id)
+                    fixtures.append(fixture)
+            return _envelope(endpoint, params, fixtures)
+        league_id, season = _int(params, "league"), _int(params, "season")
+        if league_id is None or season is None:
+            return _envelope(endpoint, params, [], {"required": "league and season, or ids"})
+        fixtures = [world.fixture(league_id, season, number)
+                    for number, _, _, _ in world.schedule(league_id, season)]
+        return _envelope(endpoint, params, fixtures)
+
+    if endpoint == "fixtures/lineups":
+        fixture_id = _int(params, "fixture")
+        if fixture_id is None:
+            return _envelope(endpoint, params, [], {"required": "fixture"})
+        return _envelope(endpoint, params, world.lineups(fixture_id))
+
+    if endpoint == "fixtures/players":
+        fixture_id = _int(params, "fixture")
+        if fixture_id is None:
+            return _envelope(endpoint, params, [], {"required": "fixture"})
+        return _envelope(endpoint, params, world.player_stats(fixture_id))
+
+    if endpoint == "teams":
+        league_id = _int(params, "league")
+        if league_id is None:
+            return _envelope(endpoint, params, [], {"required": "league"})
+        teams = [{"team": {"id": team_id, "name": world.team_name(team_id), "country": "Mockland"},
+                  "venue": {"name": f"{world.team_name(team_id)} Stadium"}}
+                 for team_id in world.team_ids(league_id)]
+        return _envelope(endpoint, params, teams)
+
+    if endpoint == "players":
+        season, page = _int(params, "season"), _int(params, "page") or 1
+        team_id, league_id = _int(params, "team"), _int(params, "league")
+        if season is None or (team_id is None and league_id is None):
+            return _envelope(endpoint, params, [], {"required": "season and team or league"})
+        team_ids = [team_id] if team_id is not None else world.team_ids(league_id)
+        entries = [world.player_entry(player_id, position, tid, tid // 100, season)
+                   for tid in team_ids for player_id, position in world.squad(tid, season)]
+        total = max(1, -(-len(entries) // PAGE_SIZE))
+        start = (page - 1) * PAGE_SIZE
+        return _envelope(endpoint, params, entries[start:start + PAGE_SIZE], page=page, total=total)
+
+    return _envelope(endpoint, params, [], {"endpoint": f"Unknown endpoint /{endpoint}"})
+
+
+class MockApiHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real API
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        endpoint = url.path.split("/v3/", 1)[-1].strip("/")
+        params = {name: values[0] for name, values in parse_qs(url.query).items()}
+        faults = self.server.faults
+
+        time.sleep(faults.delay())
+        status, headers, truncate = faults.decide(endpoint)
+        if status == 200:
+            body = json.dumps(handle_request(self.server.world, endpoint, params)).encode()
+        else:
+            body = json.dumps({"message": "Too many requests" if status == 429 else "Server error"}).encode()
+        if "gzip" in self.headers.get("Accept-Encoding", "") and len(body) >= GZIP_MIN_BYTES:
+            body = gzip.compress(body, compresslevel=5)
+            headers["Content-Encoding"] = "gzip"
+
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        if truncate:
+            # The advertised length is kept, so the client sees a dropped connection mid-body
+            self.send_header("Connection", "close")
+            self.end_headers()
+            self.wfile.write(body[:len(body) // 2])
+            self.close_connection = True
+            return
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+def start_server(host="127.0.0.1", port=0, seed=42, verbose=False, teams_per_league=TEAMS_PER_LEAGUE,
+                 squad_size=SQUAD_SIZE, **fault_options):
+    """Serve in a background thread; returns the server (its address is server.server_address)."""
+    server = ThreadingHTTPServer((host, port), MockApiHandler)
+    server.daemon_threads = True
+    server.world = World(seed, teams_per_league, squad_size)
+    server.faults = FaultInjector(seed, **fault_options)
+    server.verbose = verbose
+    threading.Thread(target=server.serve_forever, name="mock-api", daemon=True).start()
+    return server
+
+
+def print_counts(faults):
+    print(f"\nServed {faults.requests} requests:")
+    for name, count in sorted(faults.counts.items()):
+        print(f"  {name:<24}{count:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve seeded API-Football payloads locally, with injected faults.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--seed", type=int, default=42, help="Generates the same data for the same seed")
+    parser.add_argument("--teams-per-league", type=int, default=TEAMS_PER_LEAGUE)
+    parser.add_argument("--squad-size", type=int, default=SQUAD_SIZE)
+    parser.add_argument("--latency-ms", type=float, default=0, help="Added to every response")
+    parser.add_argument("--jitter-ms", type=float, default=0, help="Random +/- spread around the latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 5xx")
+    parser.add_argument("--truncate-rate", type=float, default=0.0,
+                        help="Fraction of responses cut off halfway through the body")
+    parser.add_argument("--burst-every", type=int, default=0, help="Start a 429 burst every N requests")
+    parser.add_argument("--burst-length", type=int, default=3, help="Requests rejected per 429 burst")
+    parser.add_argument("--rate-limit", type=int, default=600,
+                        help="Requests per minute, sent as X-RateLimit-* headers (0 = unlimited)")
+    parser.add_argument("--daily-quota", type=int, default=0,
+                        help="Daily quota, sent as x-ratelimit-requests-* headers (0 = unlimited)")
+    parser.add_argument("--verbose", action="store_true", help="Log every request")
+    args = parser.parse_args()
+
+    server = start_server(args.host, args.port, seed=args.seed, verbose=args.verbose,
+                          teams_per_league=args.teams_per_league, squad_size=args.squad_size,
+                          latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+                          truncate_rate=args.truncate_rate, burst_every=args.burst_every,
+                          burst_length=args.burst_length if args.burst_every else 0,
+                          rate_limit=args.rate_limit, daily_quota=args.daily_quota)
+    host, port = server.server_address
+    print(f"Mock API-Football listening on http://{host}:{port}/v3 (seed {args.seed})")
+    print(f"Use it with: API_BASE_URL=http://{host}:{port}/v3")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+        print_counts(server.faults)
+
+
+if __name__ == "__main__":
+    main()
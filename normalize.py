@@ -0,0 +1,199 @@
+"""
+Turns raw API-Football payloads into rows for the SQLite tables.
+
+Every normalizer takes the endpoint's `parameters` and its `response` items
+and returns a dict of table name -> list of row tuples, in the column order
+used by db_writer.INSERT_SQL. Seasons are referenced by their start year; the
+writer resolves them to Season_ID.
+"""
+import logging
+
+from catalog import cup_ids
+
+# Fixture status codes (fixture.status.short) after which nothing about the match changes
+FINISHED_STATUSES = {"FT", "AET", "PEN", "PST", "CANC", "ABD", "AWD", "WO"}
+
+
+def empty_rows():
+    return {
+        "League": [],
+        "Season": [],
+        "Team": [],
+        "Player": [],
+        "Match": [],
+        "Team_Player_Season": [],
+        "Player_Match_Participation": [],
+    }
+
+
+def merge_rows(target, rows):
+    for table, table_rows in rows.items():
+        target.setdefault(table, []).extend(table_rows)
+    return target
+
+
+def count_rows(rows):
+    return sum(len(table_rows) for table_rows in rows.values())
+
+
+def _int_param(parameters, name):
+    value = (parameters or {}).get(name)
+    if value is None or value == "":
+        return None
+    return int(value)
+
+
+def normalize_fixtures(parameters, items):
+    rows = empty_rows()
+    seen_leagues = set()
+    seen_seasons = set()
+    for f in items:
+        fixture = f["fixture"]
+        league = f.get("league", {})
+        teams = f["teams"]
+        goals = f["goals"]
+
+        league_id = league.get("id") or _int_param(parameters, "league")
+        season_year = league.get("season") or _int_param(parameters, "season")
+        if league_id is None or season_year is None:
+            logging.warning(f"Skipping fixture {fixture.get('id')}: league or season unknown")
+            continue
+
+        if league_id not in seen_leagues and league.get("name"):
+            rows["League"].append((league_id, league["name"]))
+            seen_leagues.add(league_id)
+        if season_year not in seen_seasons:
+            rows["Season"].append((season_year, season_year + 1))
+            seen_seasons.add(season_year)
+
+        # /fixtures?ids= embeds each fixture's player statistics and lineups alongside the
+        # score. Player_Stats records whether they were there: 1, or 0 once the match is
+        # over and they are still missing; unknown (NULL) for any other payload.
+        status = (fixture.get("status") or {}).get("short")
+        player_stats = None
+        if f.get("players"):
+            player_stats = 1
+        elif "players" in f and status in FINISHED_STATUSES:
+            player_stats = 0
+        rows["Match"].append((fixture["id"], teams["home"]["id"], teams["away"]["id"],
+                              fixture["date"], goals["home"], goals["away"],
+                              season_year, league_id, status, player_stats))
+        if f.get("players"):
+            rows["Player_Match_Participation"].extend(_player_stat_rows(fixture["id"], f["players"]))
+        else:
+            rows["Player_Match_Participation"].extend(_lineup_rows(fixture["id"], f.get("lineups") or []))
+    return rows
+
+
+def normalize_teams(parameters, items):
+    rows = empty_rows()
+    league_id = _int_param(parameters, "league")
+    if league_id is None:
+        logging.warning("Skipping teams payload without a league parameter")
+        return rows
+    domestic = 0 if league_id in cup_ids() else 1
+    for t in items:
+        team_info = t["team"]
+        rows["Team"].append((team_info["id"], team_info["name"], league_id, domestic))
+    return rows
+
+
+def normalize_players(parameters, items):
+    rows = empty_rows()
+    season_year = _int_param(parameters, "season")
+    seen_seasons = set()
+    for player_data in items:
+        player_info = player_data["player"]
+        player_id = player_info["id"]
+
+        stats = player_data.get("statistics", [])
+        position = "Unknown"
+        if stats:
+            position = stats[0]["games"].get("position", "Unknown")
+        rows["Player"].append((player_id, player_info["name"], position))
+
+        # Player could appear for multiple teams in the season according to stats
+        linked = set()
+        for stat_entry in stats:
+            team_id = stat_entry["team"]["id"]
+            league = stat_entry.get("league") or {}
+            year = league.get("season") or season_year
+            if team_id is None or year is None or (team_id, year) in linked:
+                continue
+            linked.add((team_id, year))
+            if year not in seen_seasons:
+                rows["Season"].append((year, year + 1))
+                seen_seasons.add(year)
+            rows["Team_Player_Season"].append((team_id, player_id, year, league.get("id")))
+    return rows
+
+
+def _lineup_rows(match_id, lineups):
+    """
+    Participation from lineups alone: who started and for which team. Lineups
+    carry no statistics, so minutes, goals and assists stay unknown (NULL).
+    """
+    rows = []
+    for team_entry in lineups:
+        team_id = (team_entry.get("team") or {}).get("id")
+        for player_group, started in [("startXI", 1), ("substitutes", 0)]:
+            for player_entry in team_entry.get(player_group) or []:
+                player_id = (player_entry.get("player") or {}).get("id")
+                if not player_id:
+                    continue
+                rows.append((match_id, player_id, None, None, None, started, team_id))
+    return rows
+
+
+def _player_stat_rows(match_id, teams):
+    """Participation from the per-fixture player statistics (the `players` block)."""
+    rows = []
+    for team_entry in teams:
+        team_id = (team_entry.get("team") or {}).get("id")
+        for player_entry in team_entry.get("players") or []:
+            player_id = (player_entry.get("player") or {}).get("id")
+            statistics = player_entry.get("statistics") or []
+            if not player_id or not statistics:
+                continue
+            games = statistics[0].get("games") or {}
+            goals = statistics[0].get("goals") or {}
+            # Unused substitutes are listed with null minutes; null goals and assists mean none
+            rows.append((match_id, player_id, games.get("minutes") or 0, goals.get("total") or 0,
+                         goals.get("assists") or 0, 0 if games.get("substitute") else 1, team_id))
+    return rows
+
+
+def normalize_lineups(parameters, items):
+    rows = empty_rows()
+    match_id = _int_param(parameters, "fixture")
+    if match_id is None:
+        logging.warning("Skipping lineups payload without a fixture parameter")
+        return rows
+    rows["Player_Match_Participation"] = _lineup_rows(match_id, items)
+    return rows
+
+
+def normalize_fixture_players(parameters, items):
+    rows = empty_rows()
+    match_id = _int_param(parameters, "fixture")
+    if match_id is None:
+        logging.warning("Skipping player statistics payload without a fixture parameter")
+        return rows
+    rows["Player_Match_Participation"] = _player_stat_rows(match_id, items)
+    return rows
+
+
+NORMALIZERS = {
+    "fixtures": normalize_fixtures,
+    "teams": normalize_teams,
+    "players": normalize_players,
+    "fixtures/lineups": normalize_lineups,
+    "fixtures/players": normalize_fixture_players,
+}
+
+
+def normalize_payload(endpoint, parameters, items):
+    normalizer = NORMALIZERS.get(endpoint)
+    if normalizer is None:
+        raise ValueError(f"No normalizer for endpoint '{endpoint}'")
+    return normalizer(parameters, items)
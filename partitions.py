@@ -0,0 +1,327 @@
+import argparse
+import os
+import re
+import sqlite3
+import stat
+import sys
+
+from dotenv import load_dotenv
+
+from db_config import connect
+from migrations import SCHEMA_VERSION, TEAM_MATCH_SELECT
+
+load_dotenv()
+
+DB_FILE = os.getenv("DB_FILE", "soccer_management.db")
+PARTITION_DIR = os.getenv("PARTITION_DIR")
+
+CORE_FILE = "core.db"
+CORE_TABLES = ["League", "Season", "Team", "Player", "Raw_Payload", "Player_Transfer", "Work_Item"]
+PARTITIONED_TABLES = ["Match", "Team_Player_Season", "Player_Match_Participation"]
+
+# Read-only partitions are memory-mapped; 256 MB covers a full season with room to spare
+PARTITION_MMAP_SIZE = 256 * 1024 * 1024
+
+PARTITION_FILE_RE = re.compile(r"^season_(\d{4})(?:_league_(\d+))?\.db$")
+
+# Rows copied into each partition; ?1 = Season_ID, ?2 = League_ID (or NULL for per-season files)
+PARTITION_SELECT = {
+    "Match": """
+        SELECT * FROM src.Match
+        WHERE Season_ID = ?1 AND (?2 IS NULL OR League_ID = ?2)
+    """,
+    "Team_Player_Season": """
+        SELECT tps.* FROM src.Team_Player_Season tps
+        LEFT JOIN src.Team t ON tps.Team_ID = t.Team_ID
+        WHERE tps.Season_ID = ?1 AND (?2 IS NULL OR COALESCE(tps.League_ID, t.League_ID) = ?2)
+    """,
+    "Player_Match_Participation": """
+        SELECT pmp.* FROM src.Player_Match_Participation pmp
+        JOIN src.Match m ON pmp.Match_ID = m.Match_ID
+        WHERE m.Season_ID = ?1 AND (?2 IS NULL OR m.League_ID = ?2)
+    """,
+}
+
+
+def partition_file_name(year_start, league_id=None):
+    if league_id is None:
+        return f"season_{year_start}.db"
+    return f"season_{year_start}_league_{league_id}.db"
+
+
+def schema_name(year_start, league_id=None):
+    if league_id is None:
+        return f"s{year_start}"
+    return f"s{year_start}_l{league_id}"
+
+
+def _table_ddl(conn, tables):
+    """CREATE TABLE/INDEX statements for `tables`, as stored in the source database."""
+    placeholders = ",".join("?" * len(tables))
+    return [sql for (sql,) in conn.execute(f"""
+        SELECT sql FROM sqlite_master
+        WHERE tbl_name IN ({placeholders}) AND sql IS NOT NULL
+        ORDER BY type = 'index', name
+    """, tables)]
+
+
+def _remove_partition(path):
+    if os.path.exists(path):
+        os.chmod(path, stat.S_IRUSR | stat.S_IWUSR)
+        os.remove(path)
+
+
+def _build_file(source, path, tables, fill):
+    _remove_partition(path)
+    conn = sqlite3.connect(path)
+    try:
+        src = sqlite3.connect(source)
+        ddl = _table_ddl(src, tables)
+        user_version = src.execute("PRAGMA user_version").fetchone()[0]
+        src.close()
+        for sql in ddl:
+            conn.execute(sql)
+        conn.execute("ATTACH DATABASE ? AS src", (source,))
+        with conn:
+            fill(conn)
+        conn.execute("DETACH DATABASE src")
+        conn.execute(f"PRAGMA user_version = {user_version}")
+        conn.execute("VACUUM")
+    finally:
+        conn.close()
+
+
+def split_database(source, target_dir, by_league=False, current_year=None, only_year=None):
+    """
+    Split `source` into core.db plus one file per season (or per league-season).
+    Seasons before `current_year` are made read-only on disk.
+    """
+    os.makedirs(target_dir, exist_ok=True)
+    src = sqlite3.connect(source)
+    seasons = src.execute("SELECT Season_ID, Year_Start FROM Season ORDER BY Year_Start").fetchall()
+    if not seasons:
+        print("The source database has no seasons to partition.")
+        return
+    if current_year is None:
+        current_year = seasons[-1][1]
+    core_tables = [name for (name,) in src.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table'") if name in CORE_TABLES]
+    partition_tables = [name for (name,) in src.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table'") if name in PARTITIONED_TABLES]
+    src.close()
+
+    if only_year is None:
+        def fill_core(conn):
+            for table in core_tables:
+                conn.execute(f"INSERT INTO main.{table} SELECT * FROM src.{table}")
+        _build_file(source, os.path.join(target_dir, CORE_FILE), core_tables, fill_core)
+        print(f"Wrote {CORE_FILE}")
+
+    for season_id, year_start in seasons:
+        if only_year is not None and year_start != only_year:
+            continue
+        league_ids = [None]
+        if by_league:
+            src = sqlite3.connect(source)
+            league_ids = [lid for (lid,) in src.execute(
+                "SELECT DISTINCT League_ID FROM Match WHERE Season_ID = ? ORDER BY League_ID",
+                (season_id,))]
+            src.close()
+
+        for league_id in league_ids:
+            def fill_partition(conn):
+                for table in partition_tables:
+                    conn.execute(f"INSERT INTO main.{table} {PARTITION_SELECT[table]}",
+                                 (season_id, league_id))
+
+            path = os.path.join(target_dir, partition_file_name(year_start, league_id))
+            _build_file(source, path, partition_tables, fill_partition)
+            read_only = year_start < current_year
+            if read_only:
+                os.chmod(path, stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+            print(f"Wrote {os.path.basename(path)}{' (read-only)' if read_only else ''}")
+
+
+def list_partitions(target_dir):
+    """(file path, year_start, league_id) for every partition file in `target_dir`."""
+    partitions = []
+    for filename in sorted(os.listdir(target_dir)):
+        match = PARTITION_FILE_RE.match(filename)
+        if match:
+            league_id = int(match.group(2)) if match.group(2) else None
+            partitions.append((os.path.join(target_dir, filename), int(match.group(1)), league_id))
+    return partitions
+
+
+def is_read_only(path):
+    # Checked on the mode bits rather than os.access, which is always true for root
+    return not os.stat(path).st_mode & stat.S_IWUSR
+
+
+def writable_partition(target_dir):
+    """(path, year_start) of the one writable per-season partition, the one ingestion writes to."""
+    writable = [(path, year_start) for path, year_start, league_id in list_partitions(target_dir)
+                if league_id is None and not is_read_only(path)]
+    if len(writable) != 1:
+        raise RuntimeError(f"Ingestion needs exactly one writable per-season partition in {target_dir}, "
+                           f"found {len(writable)}.")
+    return writable[0]
+
+
+def connect_ingest(target_dir):
+    """
+    Writable connection for the ingestion scripts: core.db with the current
+    season's partition attached. No views shadow the table names, so the
+    writer's statements find core tables in core.db and the partitioned ones
+    in the current season's file. Rows for any other season are dropped by
+    TEMP triggers, since closed seasons are read-only.
+    """
+    path, year_start = writable_partition(target_dir)
+    name = schema_name(year_start)
+    conn = connect(os.path.join(target_dir, CORE_FILE))
+    try:
+        conn.execute("ATTACH DATABASE ? AS " + name, (path,))
+        conn.execute(f"PRAGMA {name}.journal_mode = WAL")
+        conn.execute(f"PRAGMA {name}.synchronous = NORMAL")
+        for schema in ("main", name):
+            version = conn.execute(f"PRAGMA {schema}.user_version").fetchone()[0]
+            if version != SCHEMA_VERSION:
+                raise RuntimeError(f"{'core.db' if schema == 'main' else os.path.basename(path)} is at "
+                                   f"schema version {version}, expected {SCHEMA_VERSION}; "
+                                   f"split a migrated database again.")
+        row = conn.execute("SELECT Season_ID FROM Season WHERE Year_Start = ?", (year_start,)).fetchone()
+        if row is None:
+            raise RuntimeError(f"Season {year_start} is missing from core.db.")
+        for table in PARTITIONED_TABLES:
+            conn.execute(f"""
+                CREATE TEMP TRIGGER {table}_other_season BEFORE INSERT ON {name}.{table}
+                WHEN NEW.Season_ID IS NOT {int(row[0])}
+                BEGIN SELECT RAISE(IGNORE); END
+            """)
+    except BaseException:
+        conn.close()
+        raise
+    return conn
+
+
+def start_season(target_dir, year_start):
+    """
+    Make `year_start` the season ingestion writes to: an empty partition is
+    created for it, and the current one is checkpointed and made read-only.
+    """
+    path, current_year = writable_partition(target_dir)
+    if year_start <= current_year:
+        raise RuntimeError(f"Season {year_start} is not after the current season {current_year}.")
+    core = connect(os.path.join(target_dir, CORE_FILE))
+    with core:
+        core.execute("INSERT INTO Season (Year_Start, Year_End) VALUES (?, ?) "
+                     "ON CONFLICT (Year_Start, Year_End) DO NOTHING", (year_start, year_start + 1))
+    core.close()
+
+    new_path = os.path.join(target_dir, partition_file_name(year_start))
+    _build_file(path, new_path, PARTITIONED_TABLES, lambda conn: None)
+    print(f"Wrote {os.path.basename(new_path)}")
+
+    # Immutable readers never look at a -wal file, so the closed season goes back to a rollback journal
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    conn.execute("PRAGMA journal_mode = DELETE")
+    conn.close()
+    os.chmod(path, stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+    print(f"Closed {os.path.basename(path)} (read-only)")
+
+
+def connect_partitioned(target_dir):
+    """
+    Open core.db and attach every partition behind TEMP views named like the
+    original tables, so existing queries run unchanged.
+
+    Read-only partitions are attached immutable and memory-mapped. Each view
+    branch carries its partition's Season_ID (and League_ID) as a constant, so
+    a query filtering on `Season_ID = ?` lets SQLite skip every other partition
+    before reading a single page from it.
+    """
+    conn = sqlite3.connect(f"file:{os.path.join(target_dir, CORE_FILE)}", uri=True)
+    season_ids = dict(conn.execute("SELECT Year_Start, Season_ID FROM Season").fetchall())
+
+    partitions = list_partitions(target_dir)
+    attach_limit = conn.getlimit(sqlite3.SQLITE_LIMIT_ATTACHED) if hasattr(conn, "getlimit") else 10
+    if len(partitions) > attach_limit:
+        conn.close()
+        raise RuntimeError(f"{len(partitions)} partitions exceed SQLite's limit of {attach_limit} "
+                           f"attached databases; use one partition per season instead.")
+
+    branches = {table: [] for table in PARTITIONED_TABLES}
+    for path, year_start, league_id in partitions:
+        name = schema_name(year_start, league_id)
+        read_only = is_read_only(path)
+        uri = f"file:{path}?mode=ro&immutable=1" if read_only else f"file:{path}"
+        conn.execute("ATTACH DATABASE ? AS " + name, (uri,))
+        if read_only:
+            conn.execute(f"PRAGMA {name}.mmap_size = {PARTITION_MMAP_SIZE}")
+
+        season_id = season_ids.get(year_start)
+        match_filter = []
+        if season_id is not None:
+            match_filter.append(f"Season_ID = {int(season_id)}")
+        if league_id is not None:
+            match_filter.append(f"League_ID = {int(league_id)}")
+        where = f" WHERE {' AND '.join(match_filter)}" if match_filter else ""
+        season_where = f" WHERE Season_ID = {int(season_id)}" if season_id is not None else ""
+        branches["Match"].append(f"SELECT * FROM {name}.Match{where}")
+        branches["Team_Player_Season"].append(f"SELECT * FROM {name}.Team_Player_Season{season_where}")
+        branches["Player_Match_Participation"].append(
+            f"SELECT * FROM {name}.Player_Match_Participation{season_where}")
+
+    for table, selects in branches.items():
+        if selects:
+            conn.execute(f"CREATE TEMP VIEW {table} AS " + " UNION ALL ".join(selects))
+    if branches["Match"]:
+        conn.execute("CREATE TEMP VIEW Team_Match AS " + TEAM_MATCH_SELECT)
+    return conn
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Split the database into season partitions attached behind unified views.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    split = subparsers.add_parser("split", help="Build core.db and the season partition files")
+    split.add_argument("--source", default=DB_FILE, help="Monolithic database to split (default: DB_FILE)")
+    split.add_argument("--dir", default=PARTITION_DIR, required=PARTITION_DIR is None,
+                       help="Output directory (default: PARTITION_DIR)")
+    split.add_argument("--by-league", action="store_true",
+                       help="One file per league-season instead of per season")
+    split.add_argument("--current", type=int, default=None,
+                       help="Start year of the season that stays writable (default: latest)")
+    split.add_argument("--season", type=int, default=None,
+                       help="Only rebuild this season's partition (e.g. to refresh the current one)")
+    start = subparsers.add_parser("start-season",
+                                  help="Close the current season's partition and start an empty one")
+    start.add_argument("season", type=int, help="Start year of the new season")
+    start.add_argument("--dir", default=PARTITION_DIR, required=PARTITION_DIR is None)
+    show = subparsers.add_parser("list", help="List partitions and whether they are read-only")
+    show.add_argument("--dir", default=PARTITION_DIR, required=PARTITION_DIR is None)
+    args = parser.parse_args()
+
+    if args.command == "split":
+        if not os.path.exists(args.source):
+            print(f"Source database not found: {args.source}")
+            sys.exit(1)
+        split_database(args.source, args.dir, by_league=args.by_league,
+                       current_year=args.current, only_year=args.season)
+    elif args.command == "start-season":
+        try:
+            start_season(args.dir, args.season)
+        except RuntimeError as e:
+            print(e)
+            sys.exit(1)
+    else:
+        for path, year_start, league_id in list_partitions(args.dir):
+            mode = "read-only" if is_read_only(path) else "read-write"
+            size_kb = os.path.getsize(path) / 1024
+            league = f" league {league_id}" if league_id is not None else ""
+            print(f"{year_start}/{year_start + 1}{league:<12} {mode:<11} {size_kb:>10.1f} KB  {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+import argparse
+import json
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+
+from dotenv import load_dotenv
+
+from db_config import connect
+from db_writer import BatchWriter, write_rows
+from migrations import apply_migrations
+from normalize import NORMALIZERS, normalize_payload
+from partitions import CORE_FILE
+
+try:
+    import zstandard
+except ImportError:  # zlib is always available, zstd is just smaller and faster
+    zstandard = None
+
+load_dotenv()
+
+DB_FILE = os.getenv("DB_FILE", "soccer_management.db")
+PARTITION_DIR = os.getenv("PARTITION_DIR")
+# Raw_Payload is a core table, so a partitioned layout archives into core.db
+ARCHIVE_DB_FILE = os.path.join(PARTITION_DIR, CORE_FILE) if PARTITION_DIR else DB_FILE
+ARCHIVE_PAYLOADS = os.getenv("ARCHIVE_PAYLOADS", "1") != "0"
+
+ZSTD_LEVEL = 9
+ZLIB_LEVEL = 6
+
+
+def compress(body):
+    if zstandard is not None:
+        return "zstd", zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(body)
+    return "zlib", zlib.compress(body, ZLIB_LEVEL)
+
+
+def decompress(encoding, blob):
+    if encoding == "zlib":
+        return zlib.decompress(blob)
+    if encoding == "zstd":
+        if zstandard is None:
+            raise RuntimeError("zstandard is required to read zstd-compressed payloads")
+        return zstandard.ZstdDecompressor().decompress(blob)
+    raise ValueError(f"Unknown payload encoding '{encoding}'")
+
+
+def canonical_params(params):
+    """Stable text form of request parameters so equal requests share a key."""
+    return json.dumps({str(k): str(v) for k, v in (params or {}).items()}, sort_keys=True)
+
+
+def payload_row(endpoint, params, body, fetched_at=None):
+    fetched_at = fetched_at or datetime.now(timezone.utc).isoformat(timespec="milliseconds")
+    encoding, blob = compress(body)
+    return (endpoint, canonical_params(params), fetched_at, encoding, blob)
+
+
+def archive_payload(conn, endpoint, params, body, fetched_at=None):
+    write_rows(conn, {"Raw_Payload": [payload_row(endpoint, params, body, fetched_at)]})
+
+
+def enable_archiving(client, writer=None, db_file=ARCHIVE_DB_FILE):
+    """
+    Store every successful response from `client` in Raw_Payload.
+
+    With a WriterThread the rows join its queue; otherwise each thread writes
+    through its own short-lived transaction on a dedicated connection.
+    """
+    if not ARCHIVE_PAYLOADS:
+        return
+    local = threading.local()
+
+    def hook(endpoint, params, response):
+        row = payload_row(endpoint, params, response.content)
+        if writer is not None:
+            writer.submit({"Raw_Payload": [row]})
+            return
+        conn = getattr(local, "conn", None)
+        if conn is None:
+            conn = local.conn = connect(db_file)
+        try:
+            write_rows(conn, {"Raw_Payload": [row]})
+        except sqlite3.Error as e:
+            logging.error(f"Failed to archive /{endpoint} {params}: {e}")
+
+    client.response_hooks.append(hook)
+
+
+_reader = None
+
+
+def _replay_chunk(args):
+    """Worker: decompress and normalize one chunk of archived payloads."""
+    global _reader
+    db_file, payload_ids = args
+    if _reader is None:
+        _reader = connect(db_file, read_only=True)
+    placeholders = ",".join("?" * len(payload_ids))
+    rows = {}
+    failed = 0
+    for endpoint, params, encoding, blob in _reader.execute(f"""
+            SELECT Endpoint, Params, Encoding, Body FROM Raw_Payload
+            WHERE Payload_ID IN ({placeholders})
+            """, payload_ids):
+        try:
+            data = json.loads(decompress(encoding, blob))
+            parameters = data.get("parameters") or json.loads(params)
+            if not isinstance(parameters, dict):
+                parameters = json.loads(params)
+            normalized = normalize_payload(endpoint, parameters, data.get("response") or [])
+        except (ValueError, KeyError, TypeError, RuntimeError, zlib.error) as e:
+            logging.warning(f"Could not replay /{endpoint} {params}: {e}")
+            failed += 1
+            continue
+        for table, table_rows in normalized.items():
+            rows.setdefault(table, []).extend(table_rows)
+    return rows, failed
+
+
+def payloads_to_replay(conn, endpoint=None, all_versions=False):
+    """Payload IDs to replay, oldest first; by default only the latest fetch of each request."""
+    endpoints = [endpoint] if endpoint else list(NORMALIZERS)
+    placeholders = ",".join("?" * len(endpoints))
+    if all_versions:
+        query = f"""
+            SELECT Payload_ID FROM Raw_Payload
+            WHERE Endpoint IN ({placeholders})
+            ORDER BY Fetched_At
+        """
+    else:
+        query = f"""
+            SELECT Payload_ID FROM (
+                SELECT Payload_ID, Fetched_At,
+                       ROW_NUMBER() OVER (PARTITION BY Endpoint, Params ORDER BY Fetched_At DESC) AS rn
+                FROM Raw_Payload
+                WHERE Endpoint IN ({placeholders})
+            )
+            WHERE rn = 1
+            ORDER BY Fetched_At
+        """
+    return [row[0] for row in conn.execute(query, endpoints)]
+
+
+def reprocess(conn, db_file, endpoint=None, all_versions=False, workers=None, chunk_size=50):
+    payload_ids = payloads_to_replay(conn, endpoint, all_versions)
+    print(f"Replaying {len(payload_ids)} archived payloads...")
+    chunks = [(db_file, payload_ids[i:i + chunk_size])
+              for i in range(0, len(payload_ids), chunk_size)]
+
+    started = time.perf_counter()
+    writer = BatchWriter(conn)
+    failed = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # map() keeps chunk order, so later fetches still overwrite earlier ones
+        for rows, chunk_failed in pool.map(_replay_chunk, chunks):
+            failed += chunk_failed
+            writer.add(rows)
+    writer.flush()
+
+    print(f"Replayed {len(payload_ids) - failed} payloads ({failed} failed) "
+          f"in {time.perf_counter() - started:.1f}s.")
+    for table, count in writer.totals.items():
+        print(f"  {table:<28}{count:>10} rows")
+
+
+def show_summary(conn):
+    rows = conn.execute("""
+        SELECT Endpoint, COUNT(*), SUM(LENGTH(Body)), MIN(Fetched_At), MAX(Fetched_At)
+        FROM Raw_Payload
+        GROUP BY Endpoint
+        ORDER BY Endpoint
+    """).fetchall()
+    if not rows:
+        print("The payload archive is empty.")
+        return
+    print(f"{'Endpoint':<22}{'Payloads':>10}{'Stored KB':>12}  {'First fetch':<31}{'Last fetch':<31}")
+    for endpoint, count, size, first, last in rows:
+        print(f"{endpoint:<22}{count:>10}{size / 1024:>12.1f}  {first:<31}{last:<31}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or replay the raw API payload archive.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("summary", help="Show what the archive holds")
+    replay = subparsers.add_parser("reprocess",
+                                   help="Re-run archived payloads through the normalizers")
+    replay.add_argument("--endpoint", choices=sorted(NORMALIZERS),
+                        help="Only replay one endpoint")
+    replay.add_argument("--all-versions", action="store_true",
+                        help="Replay every fetch instead of only the latest per request")
+    replay.add_argument("--workers", type=int, default=None,
+                        help="Worker processes (default: one per CPU)")
+    args = parser.parse_args()
+
+    try:
+        conn = connect(DB_FILE)
+    except sqlite3.Error as e:
+        print(f"Error connecting to database: {e}")
+        sys.exit(1)
+    apply_migrations(conn)
+    try:
+        if args.command == "summary":
+            show_summary(conn)
+        else:
+            reprocess(conn, DB_FILE, endpoint=args.endpoint,
+                      all_versions=args.all_versions, workers=args.workers)
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
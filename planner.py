@@ -0,0 +1,291 @@
+import argparse
+import json
+import logging
+import math
+import sys
+from datetime import datetime, timezone
+
+import requests
+
+from api_client import get_client, log_stats_summary
+from api_scheduler import (DAILY_QUOTA, DAILY_QUOTA_RESERVE, PRIORITY_FIXTURES,
+                           PRIORITY_PLAYERS, PRIORITY_TEAMS, RATE_LIMIT_PER_MINUTE,
+                           QuotaExhausted)
+from catalog import COMPETITIONS_FILE, competition_names, load_catalog
+from db_config import checkpoint
+from db_writer import write_rows
+from fetch_data_other import connect_all_seasons, connect_db
+from migrations import apply_migrations
+from normalize import empty_rows, normalize_payload
+from payload_archive import canonical_params, enable_archiving
+from transfers import build_transfers
+from validate_db import validate_after_ingest
+
+API_PRIORITY = {
+    "fixtures": PRIORITY_FIXTURES,
+    "teams": PRIORITY_TEAMS,
+    "players": PRIORITY_PLAYERS,
+}
+
+# Used by the estimate until the queue has enough finished work to measure them
+DEFAULT_TEAMS_PER_SEASON = 20
+DEFAULT_PAGES_PER_TEAM = 2
+
+
+def work_priority(competition_priority, endpoint):
+    """Competition priority first; within it fixtures, then teams, then player pages."""
+    return competition_priority * 10 + API_PRIORITY[endpoint]
+
+
+def now_iso():
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+def enqueue(conn, items):
+    """Insert (endpoint, params, league_id, priority) items not already queued. Returns how many were new."""
+    before = conn.total_changes
+    conn.executemany("""
+        INSERT INTO Work_Item (Endpoint, Params, League_ID, Priority, Updated_At)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT (Endpoint, Params) DO NOTHING
+    """, [(endpoint, canonical_params(params), league_id, priority, now_iso())
+          for endpoint, params, league_id, priority in items])
+    return conn.total_changes - before
+
+
+def plan(conn, competitions, only_season=None):
+    """
+    Expand the catalog into fixtures and teams calls for every competition-season.
+    Player pages are queued as the teams calls complete, since the team IDs are
+    only known then. Most recent seasons go first within a competition.
+    """
+    items = []
+    for c in competitions:
+        for year in sorted(c["seasons"], reverse=True):
+            if only_season is not None and year != only_season:
+                continue
+            params = {"league": c["id"], "season": year}
+            for endpoint in ("fixtures", "teams"):
+                items.append((endpoint, params, c["id"], work_priority(c["priority"], endpoint)))
+    # Left uncommitted so the caller can estimate first and then keep or discard the plan
+    return enqueue(conn, items)
+
+
+def _observed_teams_per_season(conn):
+    row = conn.execute("""
+        SELECT AVG(teams) FROM (
+            SELECT COUNT(*) AS teams FROM Work_Item
+            WHERE Endpoint = 'players' AND json_extract(Params, '$.page') = '1'
+            GROUP BY League_ID, json_extract(Params, '$.season')
+        )
+    """).fetchone()
+    return row[0] or DEFAULT_TEAMS_PER_SEASON
+
+
+def _observed_pages_per_team(conn):
+    # Only teams whose first page is done have all of their pages queued
+    row = conn.execute("""
+        WITH first_pages AS (
+            SELECT json_extract(Params, '$.team') AS team, json_extract(Params, '$.season') AS season
+            FROM Work_Item
+            WHERE Endpoint = 'players' AND json_extract(Params, '$.page') = '1' AND Status = 'done'
+        )
+        SELECT COUNT(*) * 1.0 / NULLIF((SELECT COUNT(*) FROM first_pages), 0)
+        FROM Work_Item w
+        JOIN first_pages f ON json_extract(w.Params, '$.team') = f.team
+                          AND json_extract(w.Params, '$.season') = f.season
+        WHERE w.Endpoint = 'players'
+    """).fetchone()
+    return row[0] or DEFAULT_PAGES_PER_TEAM
+
+
+def estimate_requests(conn, competitions):
+    """Requests still needed per endpoint: queued calls plus the player pages they will add."""
+    fetch_players = {c["id"]: c["fetch_players"] for c in competitions}
+    teams_per_season = _observed_teams_per_season(conn)
+    pages_per_team = _observed_pages_per_team(conn)
+
+    estimate = {"fixtures": 0, "teams": 0, "players": 0}
+    for endpoint, params, league_id in conn.execute(
+            "SELECT Endpoint, Params, League_ID FROM Work_Item WHERE Status = 'pending'"):
+        estimate[endpoint] = estimate.get(endpoint, 0) + 1
+        if endpoint == "teams" and fetch_players.get(league_id, True):
+            estimate["players"] += teams_per_season * pages_per_team
+        elif endpoint == "players" and json.loads(params).get("page") == "1":
+            estimate["players"] += pages_per_team - 1
+    return {endpoint: math.ceil(count) for endpoint, count in estimate.items()}
+
+
+def print_estimate(estimate):
+    total = sum(estimate.values())
+    print(f"{'Endpoint':<12}{'Requests':>10}")
+    for endpoint, count in estimate.items():
+        print(f"{endpoint:<12}{count:>10}")
+    print(f"{'total':<12}{total:>10}")
+
+    minutes = total / RATE_LIMIT_PER_MINUTE
+    print(f"\nAt {RATE_LIMIT_PER_MINUTE} requests/minute: about {minutes / 60:.1f} hours of fetching.")
+    per_day = DAILY_QUOTA - DAILY_QUOTA_RESERVE
+    if DAILY_QUOTA <= 0:
+        print("Daily quota unknown; set DAILY_QUOTA to see how many days the backfill needs.")
+    elif per_day <= 0:
+        print(f"DAILY_QUOTA ({DAILY_QUOTA}) leaves nothing above the reserve of {DAILY_QUOTA_RESERVE}.")
+    else:
+        days = math.ceil(total / per_day)
+        print(f"With {per_day} usable requests per day ({DAILY_QUOTA} quota, {DAILY_QUOTA_RESERVE} reserve): "
+              f"{days} daily run(s), each about {min(total, per_day) / RATE_LIMIT_PER_MINUTE:.0f} minutes.")
+
+
+def print_status(conn):
+    rows = conn.execute("""
+        SELECT Endpoint,
+               SUM(Status = 'pending'), SUM(Status = 'done'), SUM(Status = 'failed')
+        FROM Work_Item
+        GROUP BY Endpoint
+        ORDER BY MIN(Priority % 10)
+    """).fetchall()
+    if not rows:
+        print("The work queue is empty; run `python3 planner.py plan` first.")
+        return
+    print(f"{'Endpoint':<12}{'Pending':>10}{'Done':>10}{'Failed':>10}")
+    for endpoint, pending, done, failed in rows:
+        print(f"{endpoint:<12}{pending:>10}{done:>10}{failed:>10}")
+
+
+def run_item(conn, work_id, endpoint, params_text, league_id, priority, names, fetch_players):
+    """Fetch and store one work item, then queue the calls it unlocks."""
+    params = json.loads(params_text)
+    r = get_client().get(endpoint, params, priority=API_PRIORITY[endpoint])
+    if r.status_code != 200:
+        raise RuntimeError(f"status code {r.status_code}")
+    data = r.json()
+
+    rows = normalize_payload(endpoint, data.get("parameters") or params, data.get("response", []))
+    if endpoint in ("fixtures", "teams"):
+        base_rows = empty_rows()
+        base_rows["League"].append((league_id, names.get(league_id, f"League_{league_id}")))
+        base_rows["Season"].append((int(params["season"]), int(params["season"]) + 1))
+        for table, table_rows in base_rows.items():
+            rows[table] = table_rows + rows.get(table, [])
+    # Upserts make a repeat harmless if we stop between writing and marking the item done
+    write_rows(conn, rows)
+
+    follow_ups = []
+    player_priority = priority - API_PRIORITY[endpoint] + PRIORITY_PLAYERS
+    if endpoint == "teams" and fetch_players.get(league_id, True):
+        for t in data.get("response", []):
+            follow_ups.append(("players", {"team": t["team"]["id"], "season": params["season"], "page": 1},
+                               league_id, player_priority))
+    elif endpoint == "players" and str(params.get("page")) == "1":
+        total_pages = (data.get("paging") or {}).get("total", 1)
+        for page in range(2, total_pages + 1):
+            follow_ups.append(("players", dict(params, page=page), league_id, player_priority))
+
+    with conn:
+        enqueue(conn, follow_ups)
+        conn.execute("UPDATE Work_Item SET Status = 'done', Attempts = Attempts + 1, Last_Error = NULL, "
+                     "Updated_At = ? WHERE Work_ID = ?", (now_iso(), work_id))
+    return len(follow_ups)
+
+
+def run(conn, competitions, max_requests=None):
+    """Work through pending items in priority order until the queue, the limit or the quota runs out."""
+    names = competition_names(competitions)
+    fetch_players = {c["id"]: c["fetch_players"] for c in competitions}
+    completed = failed = 0
+    while max_requests is None or completed + failed < max_requests:
+        row = conn.execute("""
+            SELECT Work_ID, Endpoint, Params, League_ID, Priority FROM Work_Item
+            WHERE Status = 'pending'
+            ORDER BY Priority, Work_ID
+            LIMIT 1
+        """).fetchone()
+        if row is None:
+            print("The work queue is empty.")
+            break
+        work_id, endpoint, params_text, league_id, priority = row
+        try:
+            run_item(conn, work_id, endpoint, params_text, league_id, priority, names, fetch_players)
+            completed += 1
+        except QuotaExhausted as e:
+            print(f"Stopping for today: {e}")
+            break
+        except (requests.exceptions.RequestException, RuntimeError, ValueError) as e:
+            logging.error(f"Work item {work_id} /{endpoint} {params_text} failed: {e}")
+            print(f"Failed /{endpoint} {params_text}: {e}")
+            with conn:
+                conn.execute("UPDATE Work_Item SET Status = 'failed', Attempts = Attempts + 1, "
+                             "Last_Error = ?, Updated_At = ? WHERE Work_ID = ?",
+                             (str(e), now_iso(), work_id))
+            failed += 1
+        if (completed + failed) % 50 == 0:
+            print(f"{completed} work items done, {failed} failed so far...")
+    print(f"This run: {completed} work items done, {failed} failed.")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Plan and run a resumable backfill of every competition in the catalog.")
+    parser.add_argument("--catalog", default=COMPETITIONS_FILE,
+                        help="Competition catalog (default: competitions.json)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    plan_parser = subparsers.add_parser("plan", help="Queue the catalog's API calls and estimate the cost")
+    plan_parser.add_argument("--max-priority", type=int, default=None,
+                             help="Only plan competitions up to this priority")
+    plan_parser.add_argument("--season", type=int, default=None, help="Only plan this season")
+    plan_parser.add_argument("--dry-run", action="store_true",
+                             help="Show the estimate without saving the queue")
+    subparsers.add_parser("status", help="Show queue progress and the remaining estimate")
+    run_parser = subparsers.add_parser("run", help="Work through the queue, highest priority first")
+    run_parser.add_argument("--max-requests", type=int, default=None,
+                            help="Stop after this many work items (default: until the daily quota)")
+    run_parser.add_argument("--retry-failed", action="store_true",
+                            help="Put failed items back in the queue first")
+    args = parser.parse_args()
+
+    try:
+        competitions = load_catalog(args.catalog)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Could not read the competition catalog {args.catalog}: {e}")
+        sys.exit(1)
+
+    conn = connect_db()
+    apply_migrations(conn)
+    try:
+        if args.command == "plan":
+            planned = [c for c in competitions
+                       if args.max_priority is None or c["priority"] <= args.max_priority]
+            added = plan(conn, planned, only_season=args.season)
+            print(f"{len(planned)} competitions: {added} new work items queued.\n")
+            print_estimate(estimate_requests(conn, competitions))
+            if args.dry_run:
+                conn.rollback()
+                print("\nDry run: the queue was not saved.")
+            else:
+                conn.commit()
+        elif args.command == "status":
+            print_status(conn)
+            print()
+            print_estimate(estimate_requests(conn, competitions))
+        else:
+            if args.retry_failed:
+                with conn:
+                    conn.execute("UPDATE Work_Item SET Status = 'pending' WHERE Status = 'failed'")
+            enable_archiving(get_client())
+            try:
+                run(conn, competitions, max_requests=args.max_requests)
+            finally:
+                log_stats_summary()
+            all_seasons = connect_all_seasons()
+            print(f"Rebuilt transfers: {build_transfers(all_seasons)} club changes.")
+            all_seasons.close()
+            validate_after_ingest(conn)
+            checkpoint(conn)
+            print()
+            print_status(conn)
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
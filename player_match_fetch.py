@@ -1,22 +1,36 @@
+import argparse
 import sqlite3
 import requests
-import time
 import sys
 import logging
 import os
 from dotenv import load_dotenv
 
+from api_client import get_client, log_stats_summary
+from api_scheduler import PRIORITY_LINEUPS, QuotaExhausted
+from db_config import checkpoint, connect
+from db_writer import WriterThread, write_rows
+from metrics import start_reporter, stop_reporter
+from migrations import apply_migrations
+from normalize import FINISHED_STATUSES, normalize_fixture_players, normalize_fixtures, normalize_lineups
+from partitions import connect_ingest
+from payload_archive import enable_archiving
+from validate_db import validate_after_ingest
+
 load_dotenv()
 
 # Configuration
 DB_FILE = os.getenv("DB_FILE", "soccer_management.db")
-RAPIDAPI_KEY = os.getenv("RAPIDAPI_KEY")
-RAPIDAPI_HOST = os.getenv("RAPIDAPI_HOST", "api-football-v1.p.rapidapi.com")
+# With PARTITION_DIR set, only the current season's matches are fetched, into its partition
+PARTITION_DIR = os.getenv("PARTITION_DIR")
+# /fixtures?ids= accepts at most 20 fixture IDs per request
+IDS_PER_REQUEST = 20
 
-headers = {
-    "X-RapidAPI-Key": RAPIDAPI_KEY,
-    "X-RapidAPI-Host": RAPIDAPI_HOST
-}
+# Same rule as normalize_fixtures: statistics count as missing only once the match is over
+PLAYER_STATS_SQL = f"""
+    UPDATE Match SET Player_Stats = ?2
+    WHERE Match_ID = ?1 AND (?2 = 1 OR Status IN ({", ".join(f"'{s}'" for s in sorted(FINISHED_STATUSES))}))
+"""
 
 # Setup logging
 logging.basicConfig(filename='populate_player_match_participation.log', 
@@ -25,23 +39,24 @@ logging.basicConfig(filename='populate_player_match_participation.log',
 
 def connect_db():
     try:
-        conn = sqlite3.connect(DB_FILE)
+        if PARTITION_DIR:
+            return connect_ingest(PARTITION_DIR)
+        conn = connect(DB_FILE)
         return conn
-    except sqlite3.Error as e:
+    except (sqlite3.Error, RuntimeError) as e:
         logging.error(f"Error connecting to database: {e}")
         sys.exit(1)
 
-def fetch_lineups(match_id):
+def fetch_match_payload(endpoint, match_id):
     """
-    Fetch lineups for a given match using the /fixtures/lineups endpoint.
+    Fetch one per-fixture endpoint (/fixtures/players or /fixtures/lineups) for a match.
     """
-    url = f"https://{RAPIDAPI_HOST}/v3/fixtures/lineups"
     params = {"fixture": match_id}
 
     try:
-        response = requests.get(url, headers=headers, params=params)
+        response = get_client().get(endpoint, params, priority=PRIORITY_LINEUPS)
         if response.status_code != 200:
-            logging.warning(f"Failed to fetch lineups for Match_ID {match_id}. Status code: {response.status_code}")
+            logging.warning(f"Failed to fetch {endpoint} for Match_ID {match_id}. Status code: {response.status_code}")
             return None
         data = response.json()
         return data
@@ -49,85 +64,157 @@ def fetch_lineups(match_id):
         logging.error(f"Request exception for Match_ID {match_id}: {e}")
         return None
 
-def insert_player_match_participation(conn, match_id, player_id, minutes_played=90, goals=0, assists=0):
+def fetch_fixture_details(match_ids):
     """
-    Insert a record into Player_Match_Participation table.
-    Defaults minutes_played to 90 as lineups imply full match participation.
-    Goals and assists are set to 0 due to lack of detailed statistics.
+    Fetch up to IDS_PER_REQUEST fixtures in one call to /fixtures?ids=.
+    Each fixture in the response carries its lineups and player statistics.
     """
+    params = {"ids": "-".join(str(match_id) for match_id in match_ids)}
+
     try:
-        cursor = conn.cursor()
-        # Check if the record already exists
-        cursor.execute("""
-            SELECT Player_Match_ID FROM Player_Match_Participation
-            WHERE Match_ID = ? AND Player_ID = ?
-        """, (match_id, player_id))
-        row = cursor.fetchone()
-        if row:
-            logging.info(f"Record already exists for Match_ID {match_id}, Player_ID {player_id}. Skipping.")
-            return
-        
-        # Insert the new record
-        cursor.execute("""
-            INSERT INTO Player_Match_Participation (Match_ID, Player_ID, Minutes_Played, Goals, Assists)
-            VALUES (?, ?, ?, ?, ?)
-        """, (match_id, player_id, minutes_played, goals, assists))
-        conn.commit()
-        logging.info(f"Inserted Player_Match_Participation for Match_ID {match_id}, Player_ID {player_id}.")
-    except sqlite3.Error as e:
-        logging.error(f"SQLite error while inserting for Match_ID {match_id}, Player_ID {player_id}: {e}")
+        response = get_client().get("fixtures", params, priority=PRIORITY_LINEUPS)
+        if response.status_code != 200:
+            logging.warning(f"Failed to fetch fixtures {params['ids']}. Status code: {response.status_code}")
+            return None
+        return response.json()
+    except requests.exceptions.RequestException as e:
+        logging.error(f"Request exception for fixtures {params['ids']}: {e}")
+        return None
 
 def process_match(conn, match_id):
     """
-    Process a single match to populate Player_Match_Participation.
+    Populate Player_Match_Participation for a single match from its player
+    statistics, falling back to the lineups when no statistics are published.
+    The match is written in one transaction.
     """
     logging.info(f"Processing Match_ID {match_id}")
-    data = fetch_lineups(match_id)
-    if not data:
-        logging.warning(f"No data returned for Match_ID {match_id}")
-        return
-
-    response = data.get("response", [])
-    if not response:
-        logging.warning(f"No response data for Match_ID {match_id}")
+    data = fetch_match_payload("fixtures/players", match_id)
+    rows = normalize_fixture_players({"fixture": match_id}, (data or {}).get("response", []))
+    if data is not None:
+        conn.execute(PLAYER_STATS_SQL, (match_id, 1 if rows["Player_Match_Participation"] else 0))
+    if not rows["Player_Match_Participation"]:
+        logging.info(f"No player statistics for Match_ID {match_id}, using lineups")
+        data = fetch_match_payload("fixtures/lineups", match_id)
+        rows = normalize_lineups({"fixture": match_id}, (data or {}).get("response", []))
+    if not rows["Player_Match_Participation"]:
+        logging.warning(f"No lineups for Match_ID {match_id}")
+        conn.commit()
         return
+    write_rows(conn, rows)
 
-    for team_entry in response:
-        # Extract players from startXI and substitutes
-        for player_group in ["startXI", "substitutes"]:
-            players = team_entry.get(player_group, [])
-            for player_entry in players:
-                player_info = player_entry.get("player", {})
-                player_id = player_info.get("id")
-                if not player_id:
-                    logging.warning(f"Player ID missing in Match_ID {match_id}, Team {team_entry.get('team', {}).get('name')}. Skipping player entry.")
-                    continue
-                # Insert with default statistics
-                insert_player_match_participation(conn, match_id, player_id)
-    # Respect API rate limits
-    time.sleep(0.2)  # Adjust based on API's rate limit policy
+def process_match_batch(writer, match_ids):
+    """
+    Populate Player_Match_Participation for a chunk of matches from one
+    /fixtures?ids= response. Returns (matches with statistics, matches with lineups only).
+    """
+    logging.info(f"Processing Match_IDs {match_ids}")
+    data = fetch_fixture_details(match_ids)
+    if not data:
+        logging.warning(f"No data returned for Match_IDs {match_ids}")
+        return 0, 0
+
+    fixtures = data.get("response", [])
+    returned = {f["fixture"]["id"] for f in fixtures}
+    for match_id in match_ids:
+        if match_id not in returned:
+            logging.warning(f"Match_ID {match_id} missing from the /fixtures?ids= response")
+    with_stats = lineups_only = 0
+    parameters = data.get("parameters") or {}
+    for f in fixtures:
+        if f.get("players"):
+            with_stats += 1
+        elif f.get("lineups"):
+            lineups_only += 1
+            logging.info(f"No player statistics for Match_ID {f['fixture']['id']}, using lineups")
+        else:
+            logging.warning(f"No lineups for Match_ID {f['fixture']['id']}")
+        # The fixture is written too, which refreshes its score alongside the participation rows
+        writer.submit(normalize_fixtures(parameters, [f]))
+    return with_stats, lineups_only
+
+def run_batched(match_ids):
+    # batch_rows=1 makes the writer commit every submitted fixture on its own, so an
+    # interrupted run never leaves a match with only part of its players stored
+    writer = WriterThread(DB_FILE, batch_rows=1, partition_dir=PARTITION_DIR)
+    writer.start()
+    total_matches = len(match_ids)
+    with_stats = lineups_only = 0
+    try:
+        for start in range(0, total_matches, IDS_PER_REQUEST):
+            chunk = match_ids[start:start + IDS_PER_REQUEST]
+            print(f"Processing matches {start + 1}-{start + len(chunk)}/{total_matches}")
+            try:
+                stats, lineups = process_match_batch(writer, chunk)
+            except QuotaExhausted as e:
+                logging.warning(f"Stopping early: {e}")
+                print(f"Stopping early: {e}")
+                break
+            with_stats += stats
+            lineups_only += lineups
+    finally:
+        writer.close()
+    print(f"Player statistics stored for {with_stats} matches, lineups only for {lineups_only}.")
+
+def run_per_match(conn, match_ids):
+    total_matches = len(match_ids)
+    for idx, match_id in enumerate(match_ids, start=1):
+        print(f"Processing match {idx}/{total_matches}: Match_ID = {match_id}")
+        logging.info(f"Processing match {idx}/{total_matches}: Match_ID = {match_id}")
+        try:
+            process_match(conn, match_id)
+        except QuotaExhausted as e:
+            logging.warning(f"Stopping early: {e}")
+            print(f"Stopping early: {e}")
+            break
 
 def main():
+    parser = argparse.ArgumentParser(description="Populate Player_Match_Participation from fixture player statistics.")
+    parser.add_argument("--per-match", action="store_true",
+                        help="One /fixtures/players call per match instead of batches of 20 via /fixtures?ids=")
+    parser.add_argument("--backfill", action="store_true",
+                        help="Re-fetch matches whose stored participation has no statistics yet")
+    args = parser.parse_args()
+
     conn = connect_db()
+    apply_migrations(conn)
+    enable_archiving(get_client())
     cursor = conn.cursor()
 
-    # Fetch all Match_IDs that are not yet processed
-    cursor.execute("""
-        SELECT Match_ID FROM Match
-        WHERE Match_ID NOT IN (SELECT DISTINCT Match_ID FROM Player_Match_Participation)
-    """)
-    matches = cursor.fetchall()
+    if args.backfill:
+        # Rows written from lineups alone (or before statistics were fetched) have NULL minutes.
+        # Matches already fetched after the final whistle without statistics never get them.
+        cursor.execute("""
+            SELECT DISTINCT pmp.Match_ID FROM Player_Match_Participation pmp
+            JOIN Match m ON m.Match_ID = pmp.Match_ID
+            WHERE pmp.Minutes_Played IS NULL AND m.Player_Stats IS NOT 0
+            ORDER BY pmp.Match_ID
+        """)
+    else:
+        # Fetch all Match_IDs that are not yet processed
+        cursor.execute("""
+            SELECT Match_ID FROM Match
+            WHERE Match_ID NOT IN (SELECT DISTINCT Match_ID FROM Player_Match_Participation)
+              AND Player_Stats IS NOT 0
+        """)
+    match_ids = [match_id for (match_id,) in cursor.fetchall()]
 
-    total_matches = len(matches)
+    total_matches = len(match_ids)
     logging.info(f"Total matches to process: {total_matches}")
     print(f"Total matches to process: {total_matches}")
 
-    for idx, (match_id,) in enumerate(matches, start=1):
-        print(f"Processing match {idx}/{total_matches}: Match_ID = {match_id}")
-        logging.info(f"Processing match {idx}/{total_matches}: Match_ID = {match_id}")
-        process_match(conn, match_id)
-
+    reporter = start_reporter("player_match_fetch")
+    try:
+        if args.per_match:
+            run_per_match(conn, match_ids)
+        else:
+            run_batched(match_ids)
+    finally:
+        stop_reporter(reporter)
+
+    validate_after_ingest(conn)
+    checkpoint(conn)
     conn.close()
+    log_stats_summary()
     logging.info("Player_Match_Participation table has been populated.")
     print("Player_Match_Participation table has been populated.")
 
@@ -0,0 +1,102 @@
+import os
+import sys
+from collections import OrderedDict
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+CLI_CACHE_MB = float(os.getenv("CLI_CACHE_MB", "64"))
+
+
+def _normalize_sql(sql):
+    return " ".join(sql.split())
+
+
+def _estimate_size(rows):
+    size = sys.getsizeof(rows)
+    for row in rows:
+        size += sys.getsizeof(row)
+        for value in row:
+            size += sys.getsizeof(value)
+    return size
+
+
+class QueryCache:
+    """
+    LRU cache of query results, bounded by an estimate of their memory use.
+
+    Entries are keyed by whitespace-normalized SQL plus parameters. Before
+    answering, `PRAGMA data_version` is compared with the value seen when the
+    cache was filled: SQLite bumps it whenever another connection (e.g. an
+    ingest script) commits, and in that case everything is dropped.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.current_bytes = 0
+        self.data_versions = {}
+        self.hits = 0
+        self.misses = 0
+
+    def clear(self):
+        self.entries.clear()
+        self.current_bytes = 0
+
+    def _check_version(self, conn):
+        # With partitions attached, a commit to any of them must invalidate the cache
+        schemas = [name for _, name, _ in conn.execute("PRAGMA database_list") if name != "temp"]
+        version = tuple(conn.execute(f'PRAGMA "{name}".data_version').fetchone()[0]
+                        for name in schemas)
+        key = id(conn)
+        if self.data_versions.get(key) != version:
+            if key in self.data_versions:
+                self.clear()
+            self.data_versions[key] = version
+
+    def fetchall(self, conn, sql, params=()):
+        self._check_version(conn)
+        key = (id(conn), _normalize_sql(sql), tuple(params))
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+        self.misses += 1
+        rows = conn.execute(sql, params).fetchall()
+        size = _estimate_size(rows)
+        if size <= self.max_bytes:
+            self.entries[key] = (rows, size)
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                _, (_, evicted_size) = self.entries.popitem(last=False)
+                self.current_bytes -= evicted_size
+        return rows
+
+
+_cache = QueryCache(int(CLI_CACHE_MB * 1024 * 1024))
+
+
+def cached_fetchall(conn, sql, params=()):
+    """Rows for `sql`, served from memory unless the database changed since they were cached."""
+    return _cache.fetchall(conn, sql, params)
+
+
+def cached_fetchone(conn, sql, params=()):
+    rows = _cache.fetchall(conn, sql, params)
+    return rows[0] if rows else None
+
+
+def clear_cache():
+    _cache.clear()
+
+
+def cache_stats():
+    return {
+        "entries": len(_cache.entries),
+        "bytes": _cache.current_bytes,
+        "hits": _cache.hits,
+        "misses": _cache.misses,
+    }
@@ -1,4 +1,8 @@
 -- Drop tables if they already exist (optional, for convenience during development)
+DROP VIEW IF EXISTS Team_Match;
+DROP TABLE IF EXISTS Player_Transfer;
+DROP TABLE IF EXISTS Work_Item;
+DROP TABLE IF EXISTS Raw_Payload;
 DROP TABLE IF EXISTS Player_Match_Participation;
 DROP TABLE IF EXISTS Team_Player_Season;
 DROP TABLE IF EXISTS Match;
@@ -46,6 +50,8 @@ CREATE TABLE Match (
     Away_Score INTEGER,
     Season_ID INTEGER NOT NULL,
     League_ID INTEGER NOT NULL,
+    Status TEXT,  -- fixture.status.short from the API: NS, 1H, HT, FT, ...
+    Player_Stats INTEGER,  -- 1 statistics published, 0 still missing after the final whistle
     FOREIGN KEY (Home_Team_ID) REFERENCES Team(Team_ID),
     FOREIGN KEY (Away_Team_ID) REFERENCES Team(Team_ID),
     FOREIGN KEY (Season_ID) REFERENCES Season(Season_ID),
@@ -68,7 +74,8 @@ CREATE TABLE Team_Player_Season (
 );
 
 -- Create the Player_Match_Participation table (associative entity)
--- This links a player to a match and can store stats like minutes played, goals, and assists.
+-- This links a player to a match with their team, whether they started, and minutes played,
+-- goals and assists. The statistics are NULL when only the lineup was available.
 CREATE TABLE Player_Match_Participation (
     Player_Match_ID INTEGER PRIMARY KEY,
     Match_ID INTEGER NOT NULL,
@@ -76,6 +83,97 @@ CREATE TABLE Player_Match_Participation (
     Minutes_Played INTEGER,
     Goals INTEGER DEFAULT 0,
     Assists INTEGER DEFAULT 0,
+    Started INTEGER,
+    Team_ID INTEGER,
+    Season_ID INTEGER,  -- the match's season, so season partitions can filter on it
     FOREIGN KEY (Match_ID) REFERENCES Match(Match_ID),
-    FOREIGN KEY (Player_ID) REFERENCES Player(Player_ID)
+    FOREIGN KEY (Player_ID) REFERENCES Player(Player_ID),
+    FOREIGN KEY (Team_ID) REFERENCES Team(Team_ID),
+    FOREIGN KEY (Season_ID) REFERENCES Season(Season_ID)
+);
+
+-- Create the Raw_Payload table
+-- Every API response, compressed (zstd when available, otherwise zlib), so new columns
+-- can be backfilled by replaying the archive instead of re-crawling the API.
+CREATE TABLE Raw_Payload (
+    Payload_ID INTEGER PRIMARY KEY,
+    Endpoint TEXT NOT NULL,
+    Params TEXT NOT NULL,
+    Fetched_At TEXT NOT NULL,
+    Encoding TEXT NOT NULL,
+    Body BLOB NOT NULL,
+    UNIQUE (Endpoint, Params, Fetched_At)
+);
+
+-- Create the Work_Item table
+-- Ingestion work queue expanded from competitions.json by planner.py; one row per API call.
+CREATE TABLE Work_Item (
+    Work_ID INTEGER PRIMARY KEY,
+    Endpoint TEXT NOT NULL,
+    Params TEXT NOT NULL,
+    League_ID INTEGER NOT NULL,
+    Priority INTEGER NOT NULL,
+    Status TEXT NOT NULL DEFAULT 'pending',
+    Attempts INTEGER NOT NULL DEFAULT 0,
+    Last_Error TEXT,
+    Updated_At TEXT,
+    UNIQUE (Endpoint, Params)
+);
+
+-- Create the Player_Transfer table
+-- Club changes between consecutive seasons (or within one, Mid_Season = 1), rebuilt by transfers.py
+CREATE TABLE Player_Transfer (
+    Player_Transfer_ID INTEGER PRIMARY KEY,
+    Player_ID INTEGER NOT NULL,
+    From_Team_ID INTEGER NOT NULL,
+    To_Team_ID INTEGER NOT NULL,
+    From_Season_ID INTEGER NOT NULL,
+    To_Season_ID INTEGER NOT NULL,
+    Mid_Season INTEGER NOT NULL DEFAULT 0,
+    FOREIGN KEY (Player_ID) REFERENCES Player(Player_ID),
+    FOREIGN KEY (From_Team_ID) REFERENCES Team(Team_ID),
+    FOREIGN KEY (To_Team_ID) REFERENCES Team(Team_ID),
+    FOREIGN KEY (From_Season_ID) REFERENCES Season(Season_ID),
+    FOREIGN KEY (To_Season_ID) REFERENCES Season(Season_ID)
 );
+
+-- Natural keys: ingestion upserts against these instead of SELECT-then-INSERT
+CREATE UNIQUE INDEX ux_season_years ON Season (Year_Start, Year_End);
+CREATE UNIQUE INDEX ux_team_player_season ON Team_Player_Season (Team_ID, Player_ID, Season_ID);
+CREATE UNIQUE INDEX ux_player_match ON Player_Match_Participation (Match_ID, Player_ID);
+
+-- Kickoff times normalized to UTC (stored dates carry their own offsets)
+CREATE INDEX ix_match_kickoff_utc ON Match (datetime(Date));
+
+-- Next pending work items in priority order
+CREATE INDEX ix_work_item_queue ON Work_Item (Status, Priority, Work_ID);
+
+-- Transfers in/out of a team per season, corridors between two clubs
+CREATE INDEX ix_transfer_in ON Player_Transfer (To_Team_ID, To_Season_ID);
+CREATE INDEX ix_transfer_out ON Player_Transfer (From_Team_ID, To_Season_ID);
+CREATE INDEX ix_transfer_corridor ON Player_Transfer (From_Team_ID, To_Team_ID);
+CREATE INDEX ix_transfer_season ON Player_Transfer (To_Season_ID);
+
+-- CLI lookups by season, league and player (plans pinned in query_plans.json)
+CREATE INDEX ix_match_season ON Match (Season_ID, Date);
+CREATE INDEX ix_match_league_season ON Match (League_ID, Season_ID, Date);
+CREATE INDEX ix_tps_player_season ON Team_Player_Season (Player_ID, Season_ID);
+CREATE INDEX ix_tps_season_team ON Team_Player_Season (Season_ID, Team_ID);
+
+-- One row per team per finished match, from that team's point of view (form guide).
+-- Only matches whose fixture status says they are over count.
+CREATE VIEW Team_Match AS
+SELECT Match_ID, Season_ID, League_ID, Date, Home_Team_ID AS Team_ID, Away_Team_ID AS Opponent_ID,
+       1 AS Home, Home_Score AS Goals_For, Away_Score AS Goals_Against
+FROM Match
+WHERE Home_Score IS NOT NULL AND Away_Score IS NOT NULL
+  AND Status IN ('FT', 'AET', 'PEN', 'AWD', 'WO')
+UNION ALL
+SELECT Match_ID, Season_ID, League_ID, Date, Away_Team_ID, Home_Team_ID,
+       0, Away_Score, Home_Score
+FROM Match
+WHERE Home_Score IS NOT NULL AND Away_Score IS NOT NULL
+  AND Status IN ('FT', 'AET', 'PEN', 'AWD', 'WO');
+
+-- Matches the number of entries in migrations.MIGRATIONS
+PRAGMA user_version = 12;
@@ -0,0 +1,245 @@
+import argparse
+import os
+import sqlite3
+import sys
+import time
+
+from dotenv import load_dotenv
+
+from db_config import connect
+
+try:
+    import numpy as np
+except ImportError:  # only needed for the similarity search
+    np = None
+
+load_dotenv()
+
+DB_FILE = os.getenv("DB_FILE", "soccer_management.db")
+SIMILARITY_FILE = os.getenv("SIMILARITY_FILE", "player_features.npy")
+
+POSITIONS = ["Goalkeeper", "Defender", "Midfielder", "Attacker"]
+SEASON_FEATURES = ["registered", "appearances", "minutes", "goals", "assists"]
+CAREER_FEATURES = ["goals_per_90", "assists_per_90"]
+
+# After standardization every column counts the same; position is a single
+# one-hot column per player, so it gets extra weight against the many stat columns.
+POSITION_WEIGHT = 2.0
+
+# Query rows scored per matrix product in batch mode; bounds the score block to
+# BATCH_CHUNK x players float32 values
+BATCH_CHUNK = 256
+
+
+def _require_numpy():
+    if np is None:
+        raise RuntimeError("numpy is required for player similarity (pip install numpy)")
+
+
+def ids_file(path):
+    root, ext = os.path.splitext(path)
+    return f"{root}.ids{ext}"
+
+
+def build_features(conn):
+    """
+    (player_ids, matrix, feature_names): one row per player with per-season
+    registration, appearances, minutes, goals and assists, career per-90 rates
+    and position. Columns are standardized and rows scaled to unit length, so a
+    dot product between two rows is their cosine similarity.
+    """
+    _require_numpy()
+    players = conn.execute("SELECT Player_ID, Position FROM Player ORDER BY Player_ID").fetchall()
+    seasons = [year for (year,) in conn.execute("SELECT Year_Start FROM Season ORDER BY Year_Start")]
+    season_index = {year: i for i, year in enumerate(seasons)}
+    player_ids = np.array([pid for pid, _ in players], dtype=np.int64)
+
+    per_season = len(SEASON_FEATURES)
+    career_col = per_season * len(seasons)
+    position_col = career_col + len(CAREER_FEATURES)
+    names = [f"{year}_{feature}" for year in seasons for feature in SEASON_FEATURES]
+    names += CAREER_FEATURES + [f"position_{p.lower()}" for p in POSITIONS]
+    matrix = np.zeros((len(players), len(names)), dtype=np.float32)
+    if not players:
+        return player_ids, matrix, names
+
+    registered = np.array(conn.execute("""
+        SELECT DISTINCT tps.Player_ID, s.Year_Start
+        FROM Team_Player_Season tps
+        JOIN Season s ON s.Season_ID = tps.Season_ID
+    """).fetchall(), dtype=np.int64).reshape(-1, 2)
+    rows = np.searchsorted(player_ids, registered[:, 0])
+    known = (rows < len(player_ids)) & (player_ids[np.minimum(rows, len(player_ids) - 1)] == registered[:, 0])
+    cols = np.array([season_index[year] for year in registered[:, 1]], dtype=np.int64) * per_season
+    matrix[rows[known], cols[known]] = 1.0
+
+    appearances = np.array(conn.execute("""
+        SELECT pmp.Player_ID, s.Year_Start, COUNT(*),
+               COALESCE(SUM(pmp.Minutes_Played), 0), COALESCE(SUM(pmp.Goals), 0),
+               COALESCE(SUM(pmp.Assists), 0)
+        FROM Player_Match_Participation pmp
+        JOIN Match m ON m.Match_ID = pmp.Match_ID
+        JOIN Season s ON s.Season_ID = m.Season_ID
+        GROUP BY pmp.Player_ID, s.Year_Start
+    """).fetchall(), dtype=np.int64).reshape(-1, 6)
+    rows = np.searchsorted(player_ids, appearances[:, 0])
+    known = (rows < len(player_ids)) & (player_ids[np.minimum(rows, len(player_ids) - 1)] == appearances[:, 0])
+    appearances, rows = appearances[known], rows[known]
+    base = np.array([season_index[year] for year in appearances[:, 1]], dtype=np.int64) * per_season
+    for offset in range(1, per_season):
+        matrix[rows, base + offset] = appearances[:, offset + 1]
+
+    minutes = matrix[:, 2:career_col:per_season].sum(axis=1)
+    played = minutes > 0
+    matrix[played, career_col] = matrix[played, 3:career_col:per_season].sum(axis=1) * 90 / minutes[played]
+    matrix[played, career_col + 1] = matrix[played, 4:career_col:per_season].sum(axis=1) * 90 / minutes[played]
+
+    for i, (_, position) in enumerate(players):
+        if position in POSITIONS:
+            matrix[i, position_col + POSITIONS.index(position)] = 1.0
+
+    # Players with no data at all stay at the origin and match nothing
+    empty = ~matrix.any(axis=1)
+    std = matrix.std(axis=0)
+    std[std == 0] = 1.0
+    matrix = (matrix - matrix.mean(axis=0)) / std
+    matrix[:, position_col:] *= POSITION_WEIGHT
+    matrix[empty] = 0.0
+    norms = np.linalg.norm(matrix, axis=1)
+    norms[norms == 0] = 1.0
+    matrix /= norms[:, None]
+    return player_ids, matrix.astype(np.float32), names
+
+
+def save_features(path, player_ids, matrix):
+    np.save(path, matrix)
+    np.save(ids_file(path), player_ids)
+
+
+class SimilarityIndex:
+    """Top-k cosine search over the saved feature matrix, memory-mapped from disk."""
+
+    def __init__(self, path=SIMILARITY_FILE):
+        _require_numpy()
+        self.matrix = np.load(path, mmap_mode="r")
+        self.player_ids = np.load(ids_file(path))
+        self.path = path
+
+    def row_of(self, player_id):
+        i = np.searchsorted(self.player_ids, player_id)
+        if i < len(self.player_ids) and self.player_ids[i] == player_id:
+            return int(i)
+        return None
+
+    def _top_k(self, scores, k):
+        n = scores.shape[1]
+        k = min(k, n)
+        if k <= 0:
+            return np.empty((scores.shape[0], 0), dtype=np.int64)
+        # Partitioning in place of a full sort keeps this linear in the number of players
+        top = np.argpartition(scores, n - k, axis=1)[:, n - k:]
+        order = np.argsort(-np.take_along_axis(scores, top, axis=1), axis=1)
+        return np.take_along_axis(top, order, axis=1)
+
+    def most_similar_batch(self, player_ids, k=10):
+        """
+        {player_id: [(other_player_id, score), ...]} for many players, scoring
+        BATCH_CHUNK query rows per matrix product. Unknown players map to [].
+        """
+        results = {pid: [] for pid in player_ids}
+        known = [(pid, row) for pid, row in ((pid, self.row_of(pid)) for pid in results)
+                 if row is not None]
+        for start in range(0, len(known), BATCH_CHUNK):
+            chunk = known[start:start + BATCH_CHUNK]
+            query_rows = np.array([row for _, row in chunk])
+            scores = np.asarray(self.matrix[query_rows]) @ np.asarray(self.matrix).T
+            scores[np.arange(len(chunk)), query_rows] = -np.inf  # never return the player itself
+            top = self._top_k(scores, k)
+            for (pid, _), indexes, row_scores in zip(chunk, top, scores):
+                # A score of 0 or less means no shared profile at all (e.g. an all-zero
+                # vector), so such players are dropped rather than padding the list
+                results[pid] = [(int(self.player_ids[j]), float(row_scores[j])) for j in indexes
+                                if row_scores[j] > 0]
+        return results
+
+    def most_similar(self, player_id, k=10):
+        return self.most_similar_batch([player_id], k)[player_id]
+
+
+_index = None
+
+
+def get_index(path=SIMILARITY_FILE):
+    """Shared index for the CLI, loaded on first use."""
+    global _index
+    if _index is None or _index.path != path:
+        _index = SimilarityIndex(path)
+    return _index
+
+
+def build(conn, path=SIMILARITY_FILE):
+    global _index
+    started = time.perf_counter()
+    player_ids, matrix, names = build_features(conn)
+    save_features(path, player_ids, matrix)
+    _index = None
+    print(f"Saved {matrix.shape[0]} players x {matrix.shape[1]} features to {path} "
+          f"({matrix.nbytes / 1024 / 1024:.1f} MB) in {time.perf_counter() - started:.2f}s.")
+
+
+def _print_matches(conn, player_id, matches):
+    names = dict(conn.execute(
+        f"SELECT Player_ID, Player_Name FROM Player WHERE Player_ID IN ({','.join('?' * (len(matches) + 1))})",
+        [player_id] + [pid for pid, _ in matches]))
+    print(f"\nPlayers most similar to {names.get(player_id, player_id)}:")
+    for other_id, score in matches:
+        print(f"{names.get(other_id, other_id):<30}{other_id:>10}{score:>8.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Find players with similar statistical profiles.")
+    parser.add_argument("--file", default=SIMILARITY_FILE,
+                        help="Feature matrix file (default: SIMILARITY_FILE or player_features.npy)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("build", help="Rebuild the feature matrix from the database")
+    query = subparsers.add_parser("query", help="Most similar players to one or more players")
+    query.add_argument("player_ids", type=int, nargs="+")
+    query.add_argument("-k", type=int, default=10, help="Matches per player")
+    bench = subparsers.add_parser("bench", help="Time batch queries for every player")
+    bench.add_argument("-k", type=int, default=10)
+    args = parser.parse_args()
+
+    if np is None:
+        print("numpy is required for player similarity (pip install numpy).")
+        sys.exit(1)
+    try:
+        conn = connect(DB_FILE)
+    except sqlite3.Error as e:
+        print(f"Error connecting to database: {e}")
+        sys.exit(1)
+
+    try:
+        if args.command == "build":
+            build(conn, args.file)
+            return
+        if not os.path.exists(args.file):
+            build(conn, args.file)
+        index = get_index(args.file)
+        if args.command == "query":
+            for player_id, matches in index.most_similar_batch(args.player_ids, args.k).items():
+                if not matches:
+                    print(f"\nPlayer {player_id} is not in the feature matrix.")
+                    continue
+                _print_matches(conn, player_id, matches)
+        else:
+            started = time.perf_counter()
+            index.most_similar_batch(index.player_ids.tolist(), args.k)
+            elapsed = time.perf_counter() - started
+            count = len(index.player_ids)
+            print(f"{count} top-{args.k} queries in {elapsed:.2f}s ({count / elapsed:.0f} queries/s).")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+"""
+Stress check for reading while ingesting: one process writes synthetic batches
+through db_writer.write_rows while several CLI-style reader processes query the
+same file. Read latency is measured with and without the writer; any
+"database is locked" error fails the run.
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+from db_config import WRITE_TXN_MAX_ROWS, checkpoint, connect
+from db_writer import write_rows
+
+SCHEMA_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "schema.sql")
+
+TEAMS = 40
+SEASONS = [2022, 2023]
+PLAYERS = 4000
+MATCHES_PER_SEASON = 760
+LEAGUE_ID = 1
+
+# The same shapes of query the CLI runs for rosters, fixtures and player histories
+READ_QUERIES = [
+    ("""SELECT p.Player_Name, p.Position
+        FROM Team_Player_Season tps
+        JOIN Player p ON tps.Player_ID = p.Player_ID
+        WHERE tps.Team_ID = ? AND tps.Season_ID = ?
+        ORDER BY p.Player_Name""", lambda r: (r.randint(1, TEAMS), r.randint(1, len(SEASONS)))),
+    ("""SELECT m.Match_ID, th.Team_Name, ta.Team_Name, m.Date, m.Home_Score, m.Away_Score
+        FROM Match m
+        JOIN Team th ON m.Home_Team_ID = th.Team_ID
+        JOIN Team ta ON m.Away_Team_ID = ta.Team_ID
+        WHERE (m.Home_Team_ID = ? OR m.Away_Team_ID = ?) AND m.Season_ID = ?
+        ORDER BY m.Date""", lambda r: (lambda t: (t, t, r.randint(1, len(SEASONS))))(r.randint(1, TEAMS))),
+    ("""SELECT m.Date, pmp.Minutes_Played, pmp.Goals, pmp.Assists
+        FROM Player_Match_Participation pmp
+        JOIN Match m ON m.Match_ID = pmp.Match_ID
+        WHERE pmp.Player_ID = ?
+        ORDER BY m.Date""", lambda r: (r.randint(1, PLAYERS),)),
+    ("""SELECT t.Team_Name, COUNT(*)
+        FROM Team_Player_Season tps
+        JOIN Team t ON t.Team_ID = tps.Team_ID
+        WHERE tps.Season_ID = ?
+        GROUP BY t.Team_Name""", lambda r: (r.randint(1, len(SEASONS)),)),
+]
+
+
+def is_lock_error(e):
+    text = str(e).lower()
+    return "locked" in text or "busy" in text
+
+
+def open_db(path, legacy):
+    # legacy: the connection every script used before db_config existed
+    return sqlite3.connect(path) if legacy else connect(path)
+
+
+def synthetic_rows(rng, batch, size):
+    """A batch of upserts shaped like normalize.py output: lineups plus refreshed players and scores."""
+    rows = {"Player": [], "Match": [], "Player_Match_Participation": []}
+    for i in range(size):
+        player_id = rng.randint(1, PLAYERS)
+        match_id = rng.randint(1, MATCHES_PER_SEASON * len(SEASONS))
+        rows["Player_Match_Participation"].append(
+            (match_id, player_id, rng.randint(0, 90), rng.randint(0, 1), rng.randint(0, 1),
+             rng.randint(0, 1), 1 + player_id % TEAMS))
+        if i % 10 == 0:
+            rows["Player"].append((player_id, f"Player {player_id} v{batch}", "Midfielder"))
+    return rows
+
+
+def seed(path, legacy):
+    conn = sqlite3.connect(path)
+    with open(SCHEMA_FILE, encoding="utf-8") as f:
+        conn.executescript(f.read())
+    conn.execute("PRAGMA journal_mode = DELETE" if legacy else "PRAGMA journal_mode = WAL")
+    rng = random.Random(1)
+    rows = {
+        "League": [(LEAGUE_ID, "Stress League")],
+        "Season": [(year, year + 1) for year in SEASONS],
+        "Team": [(t, f"Team {t}", LEAGUE_ID, 1) for t in range(1, TEAMS + 1)],
+        "Player": [(p, f"Player {p}", "Midfielder") for p in range(1, PLAYERS + 1)],
+        "Team_Player_Season": [(1 + p % TEAMS, p, year, LEAGUE_ID) for p in range(1, PLAYERS + 1)
+                               for year in SEASONS],
+        "Match": [],
+    }
+    match_id = 0
+    for year in SEASONS:
+        for _ in range(MATCHES_PER_SEASON):
+            match_id += 1
+            home, away = rng.sample(range(1, TEAMS + 1), 2)
+            rows["Match"].append((match_id, home, away, f"{year}-{rng.randint(8, 12):02d}-{rng.randint(1, 28):02d}"
+                                  f"T15:00:00+00:00", rng.randint(0, 4), rng.randint(0, 4), year, LEAGUE_ID, "FT", None))
+    write_rows(conn, rows)
+    conn.close()
+
+
+def reader(path, legacy, seed_value, stop_at, results):
+    rng = random.Random(seed_value)
+    latencies = []
+    errors = 0
+    conn = open_db(path, legacy)
+    while time.time() < stop_at:
+        sql, params = rng.choice(READ_QUERIES)
+        started = time.perf_counter()
+        try:
+            conn.execute(sql, params(rng)).fetchall()
+        except sqlite3.OperationalError as e:
+            if not is_lock_error(e):
+                raise
+            errors += 1
+            continue
+        latencies.append(time.perf_counter() - started)
+    conn.close()
+    results.put(("reader", latencies, errors))
+
+
+def ingest(path, legacy, batch_rows, stop_at, results):
+    rng = random.Random(0)
+    conn = open_db(path, legacy)
+    batches = rows = errors = 0
+    longest = 0.0
+    while time.time() < stop_at:
+        batch = synthetic_rows(rng, batches, batch_rows)
+        started = time.perf_counter()
+        try:
+            # Legacy mode writes each batch as one transaction, as write_rows used to
+            write_rows(conn, batch, max_rows=sys.maxsize if legacy else WRITE_TXN_MAX_ROWS)
+        except sqlite3.OperationalError as e:
+            if not is_lock_error(e):
+                raise
+            errors += 1
+            continue
+        longest = max(longest, time.perf_counter() - started)
+        batches += 1
+        rows += sum(len(r) for r in batch.values())
+    if not legacy:
+        checkpoint(conn)
+    conn.close()
+    results.put(("ingest", (batches, rows, longest), errors))
+
+
+def run_phase(path, legacy, readers, duration, batch_rows, with_ingest):
+    results = multiprocessing.Queue()
+    stop_at = time.time() + duration
+    processes = [multiprocessing.Process(target=reader, args=(path, legacy, i, stop_at, results))
+                 for i in range(readers)]
+    if with_ingest:
+        processes.append(multiprocessing.Process(target=ingest,
+                                                 args=(path, legacy, batch_rows, stop_at, results)))
+    for p in processes:
+        p.start()
+
+    wal_file = f"{path}-wal"
+    max_wal = 0
+    while time.time() < stop_at:
+        if os.path.exists(wal_file):
+            max_wal = max(max_wal, os.path.getsize(wal_file))
+        time.sleep(0.05)
+
+    phase = {"latencies": [], "read_errors": 0, "write_errors": 0, "ingest": None, "max_wal": max_wal}
+    for _ in processes:
+        kind, data, errors = results.get()
+        if kind == "reader":
+            phase["latencies"].extend(data)
+            phase["read_errors"] += errors
+        else:
+            phase["ingest"] = data
+            phase["write_errors"] += errors
+    for p in processes:
+        p.join()
+        if p.exitcode:
+            raise RuntimeError(f"{p.name} exited with status {p.exitcode}")
+    return phase
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def print_phase(name, phase, duration):
+    ms = [v * 1000 for v in phase["latencies"]]
+    print(f"{name:<16}{len(ms) / duration:>9.0f} reads/s  p50 {statistics.median(ms) if ms else 0:6.2f} ms  "
+          f"p95 {percentile(ms, 95):6.2f} ms  p99 {percentile(ms, 99):7.2f} ms  max {max(ms, default=0):7.2f} ms  "
+          f"lock errors {phase['read_errors']}")
+    if phase["ingest"]:
+        batches, rows, longest = phase["ingest"]
+        print(f"{'':<16}ingest: {batches} batches, {rows / duration:.0f} rows/s, longest batch {longest:.2f}s, "
+              f"lock errors {phase['write_errors']}, largest -wal {phase['max_wal'] / 1024 / 1024:.1f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run concurrent CLI readers against a simulated ingest.")
+    parser.add_argument("--readers", type=int, default=8, help="Reader processes")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per phase")
+    parser.add_argument("--batch-rows", type=int, default=20000, help="Rows per ingest batch")
+    parser.add_argument("--legacy", action="store_true",
+                        help="Rollback journal and default connections, as before WAL was enabled")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "stress.db")
+        seed(path, args.legacy)
+        mode = "rollback journal, default connections" if args.legacy else "WAL via db_config"
+        print(f"{args.readers} readers, {args.duration:.0f}s per phase, {mode}")
+        baseline = run_phase(path, args.legacy, args.readers, args.duration, args.batch_rows, False)
+        print_phase("readers only", baseline, args.duration)
+        loaded = run_phase(path, args.legacy, args.readers, args.duration, args.batch_rows, True)
+        print_phase("during ingest", loaded, args.duration)
+
+    base_p95 = percentile(baseline["latencies"], 95)
+    if base_p95:
+        print(f"p95 read latency during ingest: {percentile(loaded['latencies'], 95) / base_p95:.1f}x baseline")
+    lock_errors = baseline["read_errors"] + loaded["read_errors"] + loaded["write_errors"]
+    if lock_errors:
+        print(f"FAILED: {lock_errors} lock error(s).")
+        sys.exit(1)
+    print("No lock errors.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,323 @@
+import argparse
+import itertools
+import os
+import sqlite3
+import sys
+import time
+from collections import deque
+
+from dotenv import load_dotenv
+
+from db_config import connect
+
+try:
+    import numpy as np
+except ImportError:  # only needed for the teammate graph
+    np = None
+
+load_dotenv()
+
+DB_FILE = os.getenv("DB_FILE", "soccer_management.db")
+TEAMMATES_FILE = os.getenv("TEAMMATES_FILE", "teammates.npy")
+
+# (match, team) groups whose pairs are generated before they are merged into
+# the running totals; bounds the memory used by the build
+GROUPS_PER_CHUNK = 5000
+
+# Every player who took part in a match, with the side they played for. Rows
+# stored before Team_ID existed take it from the squad registration for that
+# season when exactly one of the fixture's teams matches (the same rule as
+# transfers.py); a player registered with both is left without a side and dropped.
+PARTICIPATION_SQL = """
+    SELECT pmp.Match_ID,
+           COALESCE(pmp.Team_ID, (
+               SELECT CASE WHEN COUNT(*) = 1 THEN MAX(tps.Team_ID) END
+               FROM Team_Player_Season tps
+               WHERE tps.Player_ID = pmp.Player_ID AND tps.Season_ID = m.Season_ID
+                 AND tps.Team_ID IN (m.Home_Team_ID, m.Away_Team_ID))) AS Team,
+           pmp.Player_ID, pmp.Minutes_Played, pmp.Started
+    FROM Player_Match_Participation pmp
+    JOIN Match m ON m.Match_ID = pmp.Match_ID
+    WHERE pmp.Minutes_Played IS NULL OR pmp.Minutes_Played > 0
+    ORDER BY pmp.Match_ID, Team
+"""
+
+
+def _require_numpy():
+    if np is None:
+        raise RuntimeError("numpy is required for the teammate graph (pip install numpy)")
+
+
+def sidecar(path, name):
+    root, ext = os.path.splitext(path)
+    return f"{root}.{name}{ext}"
+
+
+def _pairs(players, minutes, started):
+    """
+    (a, b, minutes together) for every ordered pair in one team's lineup.
+    Starters are on the pitch from kickoff and substitutes until the final
+    whistle, so their shared minutes are the overlap of those intervals.
+    Unknown minutes (lineup-only rows) count the match but add no minutes.
+    """
+    known = minutes >= 0
+    length = max(90, int(minutes.max(initial=0)))
+    start = np.where(started, 0, length - minutes)
+    end = np.where(started, minutes, length)
+    start[~known] = end[~known] = 0
+    i, j = np.triu_indices(len(players), k=1)
+    overlap = np.clip(np.minimum(end[i], end[j]) - np.maximum(start[i], start[j]), 0, None)
+    return (np.concatenate([players[i], players[j]]), np.concatenate([players[j], players[i]]),
+            np.concatenate([overlap, overlap]))
+
+
+def _reduce(n, sources, targets, minutes, totals):
+    """Merge pair arrays into `totals` ([keys, matches, minutes]) keyed by source * n + target."""
+    keys = np.concatenate([sources * n + targets] + ([totals[0]] if totals else []))
+    matches = np.concatenate([np.ones(len(sources), dtype=np.int64)] + ([totals[1]] if totals else []))
+    minutes = np.concatenate([minutes] + ([totals[2]] if totals else []))
+    keys, inverse = np.unique(keys, return_inverse=True)
+    return [keys, np.bincount(inverse, weights=matches).astype(np.int64),
+            np.bincount(inverse, weights=minutes).astype(np.int64)]
+
+
+def build_graph(conn):
+    """
+    (player_ids, indptr, indices, matches, minutes): a CSR adjacency list in
+    which row i holds player_ids[i]'s teammates (as rows), the number of
+    matches they shared and their minutes on the pitch together. Built in one
+    pass over the participations, grouped by match and team.
+    """
+    _require_numpy()
+    player_ids = np.array([pid for (pid,) in conn.execute(
+        "SELECT DISTINCT Player_ID FROM Player_Match_Participation ORDER BY Player_ID")], dtype=np.int64)
+    n = len(player_ids)
+
+    totals = []
+    chunk = ([], [], [])
+    groups = 0
+    rows = conn.execute(PARTICIPATION_SQL)
+    for (_, team_id), group in itertools.groupby(rows, key=lambda row: (row[0], row[1])):
+        group = list(group)
+        if team_id is None or len(group) < 2:
+            continue
+        players = np.searchsorted(player_ids, [row[2] for row in group])
+        minutes = np.array([-1 if row[3] is None else row[3] for row in group], dtype=np.int64)
+        started = np.array([row[4] != 0 for row in group])
+        for part, values in zip(chunk, _pairs(players, minutes, started)):
+            part.append(values)
+        groups += 1
+        if groups % GROUPS_PER_CHUNK == 0:
+            totals = _reduce(n, *(np.concatenate(part) for part in chunk), totals)
+            chunk = ([], [], [])
+    if chunk[0]:
+        totals = _reduce(n, *(np.concatenate(part) for part in chunk), totals)
+
+    if not totals:
+        totals = [np.empty(0, dtype=np.int64)] * 3
+    keys, matches, minutes = totals
+    sources = keys // max(n, 1)
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(sources, minlength=n), out=indptr[1:])
+    return (player_ids, indptr, (keys % max(n, 1)).astype(np.int32),
+            matches.astype(np.int32), minutes.astype(np.int32))
+
+
+def save_graph(path, player_ids, indptr, indices, matches, minutes):
+    np.save(path, indices)
+    np.save(sidecar(path, "ids"), player_ids)
+    np.save(sidecar(path, "indptr"), indptr)
+    np.save(sidecar(path, "matches"), matches)
+    np.save(sidecar(path, "minutes"), minutes)
+
+
+class TeammateGraph:
+    """Teammate and shortest-link queries over the saved CSR arrays, memory-mapped from disk."""
+
+    def __init__(self, path=TEAMMATES_FILE):
+        _require_numpy()
+        self.indices = np.load(path, mmap_mode="r")
+        self.player_ids = np.load(sidecar(path, "ids"))
+        self.indptr = np.load(sidecar(path, "indptr"))
+        self.matches = np.load(sidecar(path, "matches"), mmap_mode="r")
+        self.minutes = np.load(sidecar(path, "minutes"), mmap_mode="r")
+        self.path = path
+
+    def row_of(self, player_id):
+        i = np.searchsorted(self.player_ids, player_id)
+        if i < len(self.player_ids) and self.player_ids[i] == player_id:
+            return int(i)
+        return None
+
+    def teammates(self, player_id, k=10):
+        """[(teammate_id, shared matches, minutes together)], most minutes first."""
+        row = self.row_of(player_id)
+        if row is None:
+            return []
+        start, end = self.indptr[row], self.indptr[row + 1]
+        indices = np.asarray(self.indices[start:end])
+        matches = np.asarray(self.matches[start:end])
+        minutes = np.asarray(self.minutes[start:end])
+        order = np.lexsort((-matches, -minutes))[:k]
+        return [(int(self.player_ids[indices[i]]), int(matches[i]), int(minutes[i])) for i in order]
+
+    def _neighbours(self, row):
+        return self.indices[self.indptr[row]:self.indptr[row + 1]]
+
+    def shortest_link(self, player_id, other_id, max_depth=6):
+        """
+        Player IDs on a shortest chain of teammates from one player to the
+        other (both included), or None if none exists within max_depth links.
+        Searches breadth-first from both ends, expanding the smaller side.
+        """
+        source, target = self.row_of(player_id), self.row_of(other_id)
+        if source is None or target is None:
+            return None
+        if source == target:
+            return [player_id]
+        parents = ({source: None}, {target: None})
+        frontiers = (deque([source]), deque([target]))
+        for _ in range(max_depth):
+            side = 0 if len(frontiers[0]) <= len(frontiers[1]) else 1
+            seen, other = parents[side], parents[1 - side]
+            next_frontier = deque()
+            for row in frontiers[side]:
+                for neighbour in self._neighbours(row).tolist():
+                    if neighbour in seen:
+                        continue
+                    seen[neighbour] = row
+                    if neighbour in other:
+                        return self._path(parents, neighbour)
+                    next_frontier.append(neighbour)
+            if not next_frontier:
+                return None
+            frontiers = (next_frontier, frontiers[1]) if side == 0 else (frontiers[0], next_frontier)
+        return None
+
+    def _path(self, parents, meeting):
+        path = []
+        row = meeting
+        while row is not None:
+            path.append(row)
+            row = parents[0][row]
+        path.reverse()
+        row = parents[1][meeting]
+        while row is not None:
+            path.append(row)
+            row = parents[1][row]
+        return [int(self.player_ids[row]) for row in path]
+
+    def shared(self, player_id, other_id):
+        """(shared matches, minutes together) for two direct teammates, or (0, 0)."""
+        row, other = self.row_of(player_id), self.row_of(other_id)
+        if row is None or other is None:
+            return 0, 0
+        neighbours = self._neighbours(row)
+        i = np.searchsorted(neighbours, other)
+        if i < len(neighbours) and neighbours[i] == other:
+            position = self.indptr[row] + i
+            return int(self.matches[position]), int(self.minutes[position])
+        return 0, 0
+
+
+_graph = None
+
+
+def get_graph(path=TEAMMATES_FILE):
+    """Shared graph for the CLI, loaded on first use."""
+    global _graph
+    if _graph is None or _graph.path != path:
+        _graph = TeammateGraph(path)
+    return _graph
+
+
+def build(conn, path=TEAMMATES_FILE):
+    global _graph
+    started = time.perf_counter()
+    player_ids, indptr, indices, matches, minutes = build_graph(conn)
+    save_graph(path, player_ids, indptr, indices, matches, minutes)
+    _graph = None
+    size = sum(a.nbytes for a in (player_ids, indptr, indices, matches, minutes))
+    print(f"Saved teammate graph: {len(player_ids)} players, {len(indices) // 2} teammate pairs to {path} "
+          f"({size / 1024 / 1024:.1f} MB) in {time.perf_counter() - started:.2f}s.")
+
+
+def _names(conn, player_ids):
+    return dict(conn.execute(
+        f"SELECT Player_ID, Player_Name FROM Player WHERE Player_ID IN ({','.join('?' * len(player_ids))})",
+        list(player_ids)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Teammates and shortest teammate links between players.")
+    parser.add_argument("--file", default=TEAMMATES_FILE,
+                        help="Graph file (default: TEAMMATES_FILE or teammates.npy)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("build", help="Rebuild the teammate graph from the database")
+    query = subparsers.add_parser("teammates", help="A player's most frequent teammates")
+    query.add_argument("player_id", type=int)
+    query.add_argument("-k", type=int, default=10, help="Teammates to list")
+    link = subparsers.add_parser("link", help="Shortest chain of teammates between two players")
+    link.add_argument("player_id", type=int)
+    link.add_argument("other_id", type=int)
+    bench = subparsers.add_parser("bench", help="Time teammate and link queries for random players")
+    bench.add_argument("-n", type=int, default=1000, help="Queries of each kind")
+    args = parser.parse_args()
+
+    if np is None:
+        print("numpy is required for the teammate graph (pip install numpy).")
+        sys.exit(1)
+    try:
+        conn = connect(DB_FILE)
+    except sqlite3.Error as e:
+        print(f"Error connecting to database: {e}")
+        sys.exit(1)
+
+    try:
+        if args.command == "build":
+            build(conn, args.file)
+            return
+        if not os.path.exists(args.file):
+            build(conn, args.file)
+        graph = get_graph(args.file)
+        if args.command == "teammates":
+            teammates = graph.teammates(args.player_id, args.k)
+            if not teammates:
+                print(f"Player {args.player_id} is not in the teammate graph.")
+                return
+            names = _names(conn, [args.player_id] + [pid for pid, _, _ in teammates])
+            print(f"\nMost frequent teammates of {names.get(args.player_id, args.player_id)}:")
+            for other_id, matches, minutes in teammates:
+                print(f"{names.get(other_id, other_id):<30}{other_id:>10}{matches:>8} matches{minutes:>8} min")
+        elif args.command == "link":
+            path = graph.shortest_link(args.player_id, args.other_id)
+            if path is None:
+                print(f"No teammate link between {args.player_id} and {args.other_id}.")
+                return
+            names = _names(conn, path)
+            if len(path) == 1:
+                print(f"{names.get(args.player_id, args.player_id)} is the same player.")
+                return
+            print(f"\n{len(path) - 1} link(s):")
+            for a, b in zip(path, path[1:]):
+                matches, minutes = graph.shared(a, b)
+                print(f"{names.get(a, a)} -> {names.get(b, b)} ({matches} matches, {minutes} min together)")
+        else:
+            rng = np.random.default_rng(0)
+            sample = rng.choice(graph.player_ids, size=(args.n, 2))
+            started = time.perf_counter()
+            for player_id, _ in sample:
+                graph.teammates(int(player_id))
+            teammate_seconds = time.perf_counter() - started
+            started = time.perf_counter()
+            for player_id, other_id in sample:
+                graph.shortest_link(int(player_id), int(other_id))
+            link_seconds = time.perf_counter() - started
+            print(f"{args.n} teammate queries: {teammate_seconds / args.n * 1000:.3f} ms each; "
+                  f"{args.n} shortest links: {link_seconds / args.n * 1000:.3f} ms each.")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+import argparse
+import heapq
+import os
+import sqlite3
+import sys
+import time
+from array import array
+
+from dotenv import load_dotenv
+
+from db_config import connect
+from migrations import apply_migrations
+from query_cache import cached_fetchall
+
+load_dotenv()
+
+DB_FILE = os.getenv("DB_FILE", "soccer_management.db")
+
+# One pass over Team_Player_Season: every player's team stints are ordered by
+# season and, within a season, by their first appearance for that team (falling
+# back to insertion order when no lineups are stored). An appearance counts only
+# for the player's own side: Player_Match_Participation.Team_ID, or for older
+# rows the one team in the fixture the player was registered with that season
+# (none when registered with both). LAG then pairs each stint with the one
+# before it; a change of team is a transfer when the two stints are
+# in the same season (mid-season move) or in consecutive seasons.
+BUILD_TRANSFERS_SQL = """
+    WITH appearances AS (
+        SELECT pmp.Player_ID, m.Season_ID, m.Date,
+               COALESCE(pmp.Team_ID, (
+                   SELECT CASE WHEN COUNT(*) = 1 THEN MAX(tps.Team_ID) END
+                   FROM Team_Player_Season tps
+                   WHERE tps.Player_ID = pmp.Player_ID AND tps.Season_ID = m.Season_ID
+                     AND tps.Team_ID IN (m.Home_Team_ID, m.Away_Team_ID))) AS Team_ID
+        FROM Player_Match_Participation pmp
+        JOIN Match m ON m.Match_ID = pmp.Match_ID
+    ),
+    first_seen AS (
+        SELECT Player_ID, Season_ID, Team_ID, MIN(datetime(Date)) AS First_Seen
+        FROM appearances
+        GROUP BY Player_ID, Season_ID, Team_ID
+    ),
+    stints AS (
+        SELECT tps.Player_ID, tps.Team_ID, tps.Season_ID, s.Year_Start,
+               LAG(tps.Team_ID) OVER w AS Prev_Team_ID,
+               LAG(tps.Season_ID) OVER w AS Prev_Season_ID,
+               LAG(s.Year_Start) OVER w AS Prev_Year_Start
+        FROM Team_Player_Season tps
+        JOIN Season s ON s.Season_ID = tps.Season_ID
+        LEFT JOIN first_seen f ON f.Player_ID = tps.Player_ID
+                              AND f.Season_ID = tps.Season_ID
+                              AND f.Team_ID = tps.Team_ID
+        WINDOW w AS (PARTITION BY tps.Player_ID
+                     ORDER BY s.Year_Start, f.First_Seen IS NULL, f.First_Seen,
+                              tps.Team_Player_Season_ID)
+    )
+    INSERT INTO Player_Transfer (Player_ID, From_Team_ID, To_Team_ID, From_Season_ID, To_Season_ID, Mid_Season)
+    SELECT Player_ID, Prev_Team_ID, Team_ID, Prev_Season_ID, Season_ID, Year_Start = Prev_Year_Start
+    FROM stints
+    WHERE Prev_Team_ID IS NOT NULL
+      AND Prev_Team_ID <> Team_ID
+      AND Year_Start - Prev_Year_Start <= 1
+"""
+
+
+def build_transfers(conn):
+    """Rebuild Player_Transfer from Team_Player_Season in one transaction. Returns the row count."""
+    with conn:
+        conn.execute("DELETE FROM Player_Transfer")
+        conn.execute(BUILD_TRANSFERS_SQL)
+    return conn.execute("SELECT COUNT(*) FROM Player_Transfer").fetchone()[0]
+
+
+def team_transfers(conn, team_id, season_id):
+    """(arrivals, departures) for a team in a season, as (player, other team, mid-season) rows."""
+    arrivals = cached_fetchall(conn, """
+        SELECT p.Player_Name, t.Team_Name, pt.Mid_Season
+        FROM Player_Transfer pt
+        JOIN Player p ON p.Player_ID = pt.Player_ID
+        JOIN Team t ON t.Team_ID = pt.From_Team_ID
+        WHERE pt.To_Team_ID = ? AND pt.To_Season_ID = ?
+        ORDER BY p.Player_Name
+    """, (team_id, season_id))
+    departures = cached_fetchall(conn, """
+        SELECT p.Player_Name, t.Team_Name, pt.Mid_Season
+        FROM Player_Transfer pt
+        JOIN Player p ON p.Player_ID = pt.Player_ID
+        JOIN Team t ON t.Team_ID = pt.To_Team_ID
+        WHERE pt.From_Team_ID = ? AND pt.To_Season_ID = ?
+        ORDER BY p.Player_Name
+    """, (team_id, season_id))
+    return arrivals, departures
+
+
+class TransferGraph:
+    """
+    Club-to-club transfer counts as adjacency arrays (CSR): the clubs that
+    team_ids[i] sold to are targets[offsets[i]:offsets[i + 1]], with the number
+    of players moved along each edge in the matching slice of weights.
+    """
+
+    def __init__(self, edges):
+        # edges: (from_team_id, to_team_id, count), sorted by from_team_id
+        self.team_ids = array("q")
+        self.offsets = array("q", [0])
+        self.targets = array("q")
+        self.weights = array("l")
+        for from_id, to_id, count in edges:
+            if not self.team_ids or self.team_ids[-1] != from_id:
+                if self.team_ids:
+                    self.offsets.append(len(self.targets))
+                self.team_ids.append(from_id)
+            self.targets.append(to_id)
+            self.weights.append(count)
+        if self.team_ids:
+            self.offsets.append(len(self.targets))
+        self.index = {team_id: i for i, team_id in enumerate(self.team_ids)}
+
+    def outgoing(self, team_id):
+        i = self.index.get(team_id)
+        if i is None:
+            return []
+        start, end = self.offsets[i], self.offsets[i + 1]
+        return list(zip(self.targets[start:end], self.weights[start:end]))
+
+    def top_corridors(self, n=10):
+        """The n busiest (from_team_id, to_team_id, count) edges."""
+        def edges():
+            for i, from_id in enumerate(self.team_ids):
+                for j in range(self.offsets[i], self.offsets[i + 1]):
+                    yield from_id, self.targets[j], self.weights[j]
+        return heapq.nlargest(n, edges(), key=lambda edge: edge[2])
+
+
+FLOW_EDGES_SQL = """
+    SELECT From_Team_ID, To_Team_ID, COUNT(*)
+    FROM Player_Transfer
+    {where}
+    GROUP BY From_Team_ID, To_Team_ID
+    ORDER BY From_Team_ID, To_Team_ID
+"""
+
+_graphs = {}
+
+
+def flow_graph(conn, season_id=None):
+    """
+    Transfer graph for all seasons, or the moves into one season. The edge query
+    goes through the query cache, so the graph is only rebuilt after the
+    database changes.
+    """
+    if season_id is None:
+        edges = cached_fetchall(conn, FLOW_EDGES_SQL.format(where=""))
+    else:
+        edges = cached_fetchall(conn, FLOW_EDGES_SQL.format(where="WHERE To_Season_ID = ?"), (season_id,))
+    cached = _graphs.get(season_id)
+    if cached is not None and cached[0] is edges:
+        return cached[1]
+    graph = TransferGraph(edges)
+    _graphs[season_id] = (edges, graph)
+    return graph
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Detect club changes between seasons and summarise the transfer flows.")
+    parser.add_argument("--top", type=int, default=10, help="Corridors to show after the build")
+    args = parser.parse_args()
+
+    try:
+        conn = connect(DB_FILE)
+    except sqlite3.Error as e:
+        print(f"Error connecting to database: {e}")
+        sys.exit(1)
+    apply_migrations(conn)
+
+    started = time.perf_counter()
+    count = build_transfers(conn)
+    mid_season = conn.execute("SELECT COUNT(*) FROM Player_Transfer WHERE Mid_Season").fetchone()[0]
+    print(f"Found {count} transfers ({mid_season} mid-season) in {time.perf_counter() - started:.2f}s.")
+
+    graph = flow_graph(conn)
+    names = dict(conn.execute("SELECT Team_ID, Team_Name FROM Team"))
+    print(f"\nTop {args.top} transfer corridors:")
+    for from_id, to_id, moved in graph.top_corridors(args.top):
+        print(f"{names.get(from_id, from_id):<25} -> {names.get(to_id, to_id):<25}{moved:>5}")
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
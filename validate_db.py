@@ -0,0 +1,280 @@
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import time
+from datetime import datetime, timezone
+
+from dotenv import load_dotenv
+
+from db_config import connect
+from migrations import SCHEMA_VERSION
+
+load_dotenv()
+
+DB_FILE = os.getenv("DB_FILE", "soccer_management.db")
+VALIDATION_REPORT = os.getenv("VALIDATION_REPORT", "validation_report.json")
+SCHEMA_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "schema.sql")
+
+SAMPLE_SIZE = 5
+
+# Keys that must identify at most one row, whether or not a UNIQUE index enforces them yet
+NATURAL_KEYS = {
+    "Season": ["Year_Start", "Year_End"],
+    "Team_Player_Season": ["Team_ID", "Player_ID", "Season_ID"],
+    "Player_Match_Participation": ["Match_ID", "Player_ID"],
+    "Match": ["Home_Team_ID", "Away_Team_ID", "Date"],
+    "Raw_Payload": ["Endpoint", "Params", "Fetched_At"],
+    "Work_Item": ["Endpoint", "Params"],
+}
+
+# (table, description, WHERE clause over the table's rows, severity)
+IMPOSSIBLE_VALUES = [
+    ("Match", "negative score", "Home_Score < 0 OR Away_Score < 0", "error"),
+    ("Match", "only one side has a score", "(Home_Score IS NULL) <> (Away_Score IS NULL)", "error"),
+    ("Match", "implausibly high score", "Home_Score > 20 OR Away_Score > 20", "warning"),
+    ("Match", "team plays itself", "Home_Team_ID = Away_Team_ID", "error"),
+    ("Match", "unparseable kickoff date", "datetime(Date) IS NULL", "error"),
+    ("Match", "kickoff outside its season's years",
+     "CAST(strftime('%Y', Date) AS INTEGER) NOT BETWEEN "
+     "(SELECT Year_Start FROM Season s WHERE s.Season_ID = Match.Season_ID) AND "
+     "(SELECT Year_End FROM Season s WHERE s.Season_ID = Match.Season_ID)", "warning"),
+    ("Season", "season does not span one year", "Year_End <> Year_Start + 1", "error"),
+    ("Player_Match_Participation", "minutes outside 0-130",
+     "Minutes_Played < 0 OR Minutes_Played > 130", "error"),
+    ("Player_Match_Participation", "negative goals or assists", "Goals < 0 OR Assists < 0", "error"),
+    ("Player_Match_Participation", "started flag not 0 or 1", "Started NOT IN (0, 1)", "error"),
+    ("Player_Match_Participation", "season differs from the match's",
+     "Season_ID IS NOT (SELECT m.Season_ID FROM Match m WHERE m.Match_ID = Player_Match_Participation.Match_ID)",
+     "error"),
+    ("Player_Match_Participation", "more goals than the match had",
+     "Goals > (SELECT COALESCE(m.Home_Score, 0) + COALESCE(m.Away_Score, 0) FROM Match m "
+     "WHERE m.Match_ID = Player_Match_Participation.Match_ID)", "error"),
+]
+
+
+def _quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _schemas(conn):
+    """main plus any attached databases, such as the current season's partition during ingestion."""
+    return [name for _, name, _ in conn.execute("PRAGMA database_list") if name != "temp"]
+
+
+def _master(conn, sql):
+    """Run `sql` against sqlite_master of every schema in _schemas."""
+    return [row for schema in _schemas(conn)
+            for row in conn.execute(sql.replace("sqlite_master", f"{_quote(schema)}.sqlite_master"))]
+
+
+def _tables(conn):
+    return sorted({name for (name,) in _master(
+        conn, "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'")})
+
+
+def _result(category, name, table, violations, sample, severity="error", detail=None):
+    result = {"category": category, "check": name, "table": table, "severity": severity,
+              "violations": violations, "sample": sample}
+    if detail:
+        result["detail"] = detail
+    return result
+
+
+def load_expected_schema(schema_file=SCHEMA_FILE):
+    """In-memory database created from schema.sql, the reference for drift and foreign keys."""
+    expected = sqlite3.connect(":memory:")
+    with open(schema_file, encoding="utf-8") as f:
+        expected.executescript(f.read())
+    return expected
+
+
+def check_foreign_keys(conn, expected, sample_size=SAMPLE_SIZE):
+    """
+    One anti-join per foreign key declared in schema.sql: child values with no
+    parent row. Keys come from schema.sql rather than the live database, since
+    databases migrated before migrations 5 and 7 declared their keys lack them.
+    """
+    results = []
+    tables = set(_tables(conn))
+    for table in sorted(tables & set(_tables(expected))):
+        for fk in expected.execute(f"PRAGMA foreign_key_list({_quote(table)})").fetchall():
+            parent, column, parent_column = fk[2], fk[3], fk[4] or fk[3]
+            name = f"{table}.{column} -> {parent}.{parent_column}"
+            if parent not in tables:
+                results.append(_result("orphaned_foreign_key", name, table, None, [],
+                                       detail=f"parent table {parent} is missing"))
+                continue
+            t, c, p, pc = _quote(table), _quote(column), _quote(parent), _quote(parent_column)
+            rows = conn.execute(f"""
+                SELECT {c}, COUNT(*) FROM {t} child
+                WHERE {c} IS NOT NULL
+                  AND NOT EXISTS (SELECT 1 FROM {p} parent WHERE parent.{pc} = child.{c})
+                GROUP BY {c}
+                ORDER BY COUNT(*) DESC
+            """).fetchall()
+            results.append(_result("orphaned_foreign_key", name, table,
+                                   sum(count for _, count in rows),
+                                   [{"value": value, "rows": count} for value, count in rows[:sample_size]]))
+    return results
+
+
+def _describe(conn):
+    """{table: {column: declared type}} plus the set of index names."""
+    tables = {}
+    for table in _tables(conn):
+        tables[table] = {row[1]: (row[2] or "").upper()
+                         for row in conn.execute(f"PRAGMA table_info({_quote(table)})")}
+    indexes = {name for (name,) in _master(
+        conn, "SELECT name FROM sqlite_master WHERE type = 'index' AND sql IS NOT NULL")}
+    return tables, indexes
+
+
+def check_schema_drift(conn, expected):
+    """Compare the live database with what schema.sql would create."""
+    want_tables, want_indexes = _describe(expected)
+    have_tables, have_indexes = _describe(conn)
+
+    problems = []
+    for table in sorted(set(want_tables) - set(have_tables)):
+        problems.append({"table": table, "problem": "missing table"})
+    for table in sorted(set(have_tables) - set(want_tables)):
+        problems.append({"table": table, "problem": "table not in schema.sql"})
+    for table in sorted(set(want_tables) & set(have_tables)):
+        want, have = want_tables[table], have_tables[table]
+        for column in want:
+            if column not in have:
+                problems.append({"table": table, "column": column, "problem": "missing column"})
+            elif want[column] != have[column]:
+                problems.append({"table": table, "column": column, "problem": "type differs",
+                                 "expected": want[column], "actual": have[column]})
+        for column in have:
+            if column not in want:
+                problems.append({"table": table, "column": column, "problem": "column not in schema.sql"})
+    for index in sorted(want_indexes - have_indexes):
+        problems.append({"index": index, "problem": "missing index"})
+
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    if version != SCHEMA_VERSION:
+        problems.append({"problem": "schema version differs", "expected": SCHEMA_VERSION, "actual": version})
+    return [_result("schema_drift", "database matches schema.sql", None, len(problems), problems)]
+
+
+def check_duplicate_keys(conn, sample_size=SAMPLE_SIZE):
+    results = []
+    tables = set(_tables(conn))
+    for table, columns in NATURAL_KEYS.items():
+        if table not in tables:
+            continue
+        cols = ", ".join(_quote(c) for c in columns)
+        rows = conn.execute(f"""
+            SELECT {cols}, COUNT(*) FROM {_quote(table)}
+            GROUP BY {cols}
+            HAVING COUNT(*) > 1
+            ORDER BY COUNT(*) DESC
+        """).fetchall()
+        results.append(_result("duplicate_natural_key", f"({', '.join(columns)}) unique", table,
+                               sum(row[-1] - 1 for row in rows),
+                               [dict(zip(columns + ["rows"], row)) for row in rows[:sample_size]]))
+    return results
+
+
+def check_impossible_values(conn, sample_size=SAMPLE_SIZE):
+    results = []
+    tables = set(_tables(conn))
+    for table, description, condition, severity in IMPOSSIBLE_VALUES:
+        if table not in tables:
+            continue
+        count = conn.execute(f"SELECT COUNT(*) FROM {_quote(table)} WHERE {condition}").fetchone()[0]
+        sample = []
+        if count:
+            cursor = conn.execute(f"SELECT * FROM {_quote(table)} WHERE {condition} LIMIT ?", (sample_size,))
+            names = [d[0] for d in cursor.description]
+            sample = [dict(zip(names, row)) for row in cursor]
+        results.append(_result("impossible_value", description, table, count, sample, severity))
+    return results
+
+
+def validate(conn, sample_size=SAMPLE_SIZE):
+    """Run every check; returns the report as a dict."""
+    started = time.perf_counter()
+    expected = load_expected_schema()
+    checks = []
+    timings = {}
+    for category, run in (("schema_drift", lambda: check_schema_drift(conn, expected)),
+                          ("orphaned_foreign_key", lambda: check_foreign_keys(conn, expected, sample_size)),
+                          ("duplicate_natural_key", lambda: check_duplicate_keys(conn, sample_size)),
+                          ("impossible_value", lambda: check_impossible_values(conn, sample_size))):
+        category_started = time.perf_counter()
+        checks.extend(run())
+        timings[category] = round(time.perf_counter() - category_started, 3)
+    expected.close()
+
+    failed = [c for c in checks if c["violations"] is None or c["violations"] > 0]
+    return {
+        "generated_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "schema_version": conn.execute("PRAGMA user_version").fetchone()[0],
+        "duration_seconds": round(time.perf_counter() - started, 3),
+        "timings": timings,
+        "summary": {
+            "checks": len(checks),
+            "errors": sum(1 for c in failed if c["severity"] == "error"),
+            "warnings": sum(1 for c in failed if c["severity"] == "warning"),
+        },
+        "checks": checks,
+    }
+
+
+def write_report(report, path=VALIDATION_REPORT):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, default=str)
+
+
+def print_summary(report):
+    for check in report["checks"]:
+        if check["violations"] is None or check["violations"] > 0:
+            where = f"{check['table']}: " if check["table"] else ""
+            count = "?" if check["violations"] is None else check["violations"]
+            print(f"  [{check['severity']}] {where}{check['check']} ({count})")
+    summary = report["summary"]
+    print(f"Validation: {summary['errors']} failing error check(s), {summary['warnings']} warning(s) "
+          f"across {summary['checks']} checks in {report['duration_seconds']:.2f}s.")
+
+
+def validate_after_ingest(conn, report_path=VALIDATION_REPORT):
+    """Validation stage run at the end of the ingestion scripts."""
+    report = validate(conn)
+    report["database"] = DB_FILE
+    write_report(report, report_path)
+    print_summary(report)
+    print(f"Full report: {report_path}")
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Check the database for orphaned keys, schema drift, duplicates and impossible values.")
+    parser.add_argument("--db", default=DB_FILE, help="Database to check (default: DB_FILE)")
+    parser.add_argument("--report", default=VALIDATION_REPORT,
+                        help="Where to write the JSON report (default: validation_report.json)")
+    parser.add_argument("--sample", type=int, default=SAMPLE_SIZE, help="Offending rows kept per check")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        print(f"Database not found: {args.db}")
+        sys.exit(1)
+    conn = connect(args.db, read_only=True)
+    try:
+        report = validate(conn, args.sample)
+    finally:
+        conn.close()
+    report["database"] = args.db
+    write_report(report, args.report)
+    print_summary(report)
+    print(f"Full report: {args.report}")
+    sys.exit(1 if report["summary"]["errors"] else 0)
+
+
+if __name__ == "__main__":
+    main()